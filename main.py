@@ -0,0 +1,130 @@
+import os
+import sys
+import argparse
+
+from aiohttp import web
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts", "extractFeatures"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts", "indexing"))
+from queryBatcher import MAX_BATCH, MAX_WAIT_MS, QueryBatcher
+from recommender import PROFILE_PERCENTILE, Recommender, ranked_users
+
+# Files written by scripts/indexing/createIndex.py and scripts/collectFromDump/users.tables.py
+INDEX_FILE = os.path.join(ROOT_DIR, "output", "index", "user_index.faiss")
+PROJECTION_STORE = os.path.join(ROOT_DIR, "output", "index", "tag_projection")
+USERS_TABLE = os.path.join(ROOT_DIR, "output", "dump", "users.table.csv")
+
+DEFAULT_K = 10
+MAX_K = 100
+
+
+def parse_question(query, body):
+    """
+    The question and k of a request: a JSON body {"tags": [...], "text": "...", "k": 10}, or the
+    query string ?tags=a,b&text=...&k=10.
+
+    Raises:
+        ValueError: If the request is malformed.
+    """
+    if body is None:
+        tags = [tag for tag in query.get("tags", "").split(",") if tag]
+        body = {"tags": tags, "text": query.get("text"), "k": query.get("k", DEFAULT_K)}
+    if not isinstance(body, dict):
+        raise ValueError("The request body must be a JSON object")
+    tags = body.get("tags") or []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("'tags' must be a list of tag names")
+    text = body.get("text")
+    if text is not None and not isinstance(text, str):
+        raise ValueError("'text' must be a string")
+    try:
+        k = int(body.get("k", DEFAULT_K))
+    except (TypeError, ValueError):
+        raise ValueError("'k' must be an integer") from None
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"'k' must be between 1 and {MAX_K}")
+    return {"tags": [tag.strip().lower() for tag in tags], "text": text}, k
+
+
+async def recommend_handler(request):
+    """
+    Top-k users for a question: {"users": [{"user_id": ..., "distance": ...}, ...]}, closest first.
+    """
+    try:
+        body = await request.json() if request.method == "POST" else None
+        question, k = parse_question(request.query, body)
+    except ValueError as error:  # Includes invalid JSON
+        return web.json_response({"error": str(error)}, status=400)
+    vector = request.app["recommender"].encode([question])[0]
+    # Concurrent requests are searched together, see QueryBatcher
+    distances, user_ids = await request.app["batcher"].submit(vector, k)
+    return web.json_response({"users": ranked_users(distances, user_ids)})
+
+
+async def health_handler(request):
+    index = request.app["recommender"].index
+    return web.json_response({"users": index.ntotal, "dimension": index.d, "index": type(index).__name__})
+
+
+async def metrics_handler(request):
+    """
+    Batching statistics of the searches (see QueryBatcher.metrics); ?reset=1 starts them over.
+    """
+    return web.json_response(request.app["batcher"].metrics(reset=bool(request.query.get("reset"))))
+
+
+async def close_batcher(app):
+    app["batcher"].close()
+
+
+def create_app(recommender, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, search_threads=1):
+    """
+    Build the query service application around a loaded Recommender.
+
+    Args:
+        recommender (Recommender): From Recommender.load.
+        max_batch (int): Most concurrent queries searched together (1 disables batching).
+        max_wait_ms (float): Longest a query waits for others to join its batch.
+        search_threads (int): Threads running the searches.
+    """
+    app = web.Application()
+    app["recommender"] = recommender
+    app["batcher"] = QueryBatcher(recommender.search, max_batch, max_wait_ms, search_threads)
+    app.on_cleanup.append(close_batcher)
+    app.router.add_post("/recommend", recommend_handler)
+    app.router.add_get("/recommend", recommend_handler)
+    app.router.add_get("/health", health_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Expert recommendation service: POST a question's tags (and "
+                                                 "optionally its text) to /recommend to get the closest users.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--index", default=INDEX_FILE, help="Index from scripts/indexing/createIndex.py")
+    parser.add_argument("--projection", default=PROJECTION_STORE, help="Projection the index was built with")
+    parser.add_argument("--users-table", default=USERS_TABLE, help="Users table, for the behavioral profile of queries")
+    parser.add_argument("--percentile", type=float, default=PROFILE_PERCENTILE,
+                        help="Percentile of the users' behavioral features that queries are matched against")
+    parser.add_argument("--no-mmap", action="store_true", help="Read the index into memory instead of mapping it")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH,
+                        help="Most concurrent queries searched together (1 disables batching)")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="Longest a query waits for others to join its batch")
+    parser.add_argument("--search-threads", type=int, default=1, help="Threads running the searches")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    recommender = Recommender.load(args.index, args.projection, args.users_table, args.percentile, not args.no_mmap)
+    print(f"Serving {recommender.index.ntotal} users on http://{args.host}:{args.port}")
+    app = create_app(recommender, args.max_batch, args.max_wait_ms, args.search_threads)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import zlib
+import time
+import argparse
+
+import requests
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "collectFromAPI")
+sys.path.insert(0, API_DIR)
+from apiFilters import REQUEST_HEADERS, get_filter
+from collectBadges import BADGE_FIELDS, BASE_URL, SITE
+from collectUsers import USER_FIELDS
+from keyScheduler import default_scheduler
+
+
+def fetch_measured(url, params, compressed=True):
+    """
+    Fetch one page and measure it.
+
+    Returns:
+        tuple: (parsed body, bytes on the wire, bytes after decompression, JSON parse seconds).
+    """
+    headers = REQUEST_HEADERS if compressed else {"Accept-Encoding": "identity"}
+    key = default_scheduler().acquire()
+    response = requests.get(url, params={**params, "key": key}, headers=headers, stream=True)
+    wire = response.raw.read(decode_content=False)
+    encoding = response.headers.get("Content-Encoding", "")
+    if encoding in ("gzip", "deflate"):
+        body = zlib.decompress(wire, 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+    else:
+        body = wire
+    start = time.perf_counter()
+    data = json.loads(body)
+    parse_time = time.perf_counter() - start
+    default_scheduler().record(key, data)
+    return data, len(wire), len(body), parse_time
+
+
+def measure(label, url, pages, params, compressed=True):
+    wire_total = body_total = parse_total = 0
+    data = {}
+    for page in range(1, pages + 1):
+        data, wire, body, parse_time = fetch_measured(url, {**params, "page": page}, compressed)
+        wire_total += wire
+        body_total += body
+        parse_total += parse_time
+        if not data.get("has_more"):
+            pages = page
+            break
+    print(f"{label:<34} {wire_total / pages / 1024:>10.1f} {body_total / pages / 1024:>12.1f} "
+          f"{parse_total / pages * 1000:>10.2f}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare API payload size and parse time with and "
+                                                 "without the collectors' field filters.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--site", default=SITE)
+    parser.add_argument("--pages", type=int, default=5, help="Pages fetched per variant")
+    args = parser.parse_args()
+
+    users_url = f"{args.base_url}/users"
+    users_params = {"site": args.site, "pagesize": 100, "order": "desc", "sort": "reputation"}
+    users_filter = get_filter(USER_FIELDS, args.base_url)
+    badges_filter = get_filter(BADGE_FIELDS, args.base_url)
+
+    print(f"{'per page':<34} {'wire (KiB)':>10} {'decoded (KiB)':>12} {'parse (ms)':>10}")
+    users = measure("users, default, uncompressed", users_url, args.pages, users_params, compressed=False)
+    measure("users, default", users_url, args.pages, users_params)
+    measure("users, filtered", users_url, args.pages, {**users_params, "filter": users_filter})
+
+    # Badges of the last page of users fetched, batched as in collectBadges
+    user_ids = ";".join(str(user["user_id"]) for user in users.get("items", []))
+    badges_url = f"{args.base_url}/users/{user_ids}/badges"
+    badges_params = {"site": args.site, "pagesize": 100, "order": "desc", "sort": "rank"}
+    measure("badges, default, uncompressed", badges_url, args.pages, badges_params, compressed=False)
+    measure("badges, default", badges_url, args.pages, badges_params)
+    measure("badges, filtered", badges_url, args.pages, {**badges_params, "filter": badges_filter})
+    default_scheduler().save()
+
+
+if __name__ == "__main__":
+    main()
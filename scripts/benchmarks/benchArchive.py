@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+
+DUMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "collectFromDump")
+sys.path.insert(0, DUMP_DIR)
+from dumpReader import SEVEN_ZIP_COMMANDS
+
+# Root Directory
+ROOT_DIR = "../.."
+
+MEMBERS = ["Posts.xml", "Comments.xml"]
+
+
+def load_tables_module():
+    """
+    Load users.tables.py, whose dotted file name cannot be imported with a plain import.
+    """
+    spec = importlib.util.spec_from_file_location("users_tables", os.path.join(DUMP_DIR, "users.tables.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def extract_then_parse(tables, archive, work_dir):
+    """
+    The current workflow: extract the XML files to disk, then parse them.
+    """
+    command = next(shutil.which(name) for name in SEVEN_ZIP_COMMANDS if shutil.which(name))
+    extract_dir = os.path.join(work_dir, "extracted")
+    start = time.perf_counter()
+    for member in MEMBERS:
+        subprocess.run([command, "e", f"-o{extract_dir}", archive, member],
+                       check=True, stdout=subprocess.DEVNULL)
+    extracted = time.perf_counter()
+    tables.generate_dump_tables(os.path.join(extract_dir, "Posts.xml"), os.path.join(extract_dir, "Comments.xml"),
+                                os.path.join(work_dir, "output"))
+    return extracted - start, time.perf_counter() - start, directory_size(work_dir)
+
+
+def stream_from_archive(tables, archive, work_dir):
+    """
+    Decompress each XML file straight into the parser; nothing but the output touches disk.
+    """
+    start = time.perf_counter()
+    tables.generate_dump_tables(archive, archive, os.path.join(work_dir, "output"))
+    return 0.0, time.perf_counter() - start, directory_size(work_dir)
+
+
+def benchmark(archive):
+    tables = load_tables_module()
+    archive_size = os.path.getsize(archive)
+    results = []
+    for name, run in [("extract-then-parse", extract_then_parse), ("stream", stream_from_archive)]:
+        work_dir = tempfile.mkdtemp(prefix="bench.")
+        try:
+            extract_time, total_time, written = run(tables, archive, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        results.append((name, extract_time, total_time, archive_size + written))
+
+    print(f"\n{'mode':<20}{'extract s':>11}{'total s':>10}{'disk MB':>10}")
+    for name, extract_time, total_time, disk in results:
+        print(f"{name:<20}{extract_time:>11.2f}{total_time:>10.2f}{disk / 2 ** 20:>10.1f}")
+    print("disk = archive + everything written (extracted XML and output tables)")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else f"{ROOT_DIR}/data/genai.stackexchange.com.7z")
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BENCH_DIR, "..", "collectFromAPI")
+sys.path.insert(0, API_DIR)
+import collectBadges
+import collectBadgesAsync
+import collectUsers
+import keyScheduler
+
+
+def start_server(port, server_args):
+    """
+    Start mockStackExchange.py in a subprocess and wait until it answers.
+    """
+    process = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "mockStackExchange.py"),
+                                "--port", str(port), *server_args])
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            requests.get(f"{url}/_stats", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                raise RuntimeError("The mock server exited during startup")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The mock server did not start")
+
+
+def run_collector(name, collect, url, rate):
+    """
+    Run one collector against the mock server and report what the server saw.
+    """
+    requests.get(f"{url}/_stats", params={"reset": 1})
+    keyScheduler._default_scheduler = keyScheduler.KeyScheduler(state_file=None, rate=rate)
+    status = "ok"
+    start = time.perf_counter()
+    with open(os.devnull, mode="w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            collect()
+        except keyScheduler.QuotaExhausted:
+            status = "quota exhausted"
+    seconds = time.perf_counter() - start
+    stats = requests.get(f"{url}/_stats").json()
+    retries = stats["throttled"] + stats["quota_errors"]
+    print(f"{name:<22} {stats['requests']:>9} {seconds:>9.1f} {stats['requests'] / seconds:>8.1f} "
+          f"{retries:>8} {stats['backoffs']:>8}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API collectors against the local mock server and "
+                                                 "report requests/sec, wall time and retries.")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--users", type=int, default=2000, help="Synthetic users served by the mock")
+    parser.add_argument("--latency", type=float, default=50, help="Added latency per request (ms)")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument("--backoff-every", type=int, default=0, help="Add a backoff field to every Nth response")
+    parser.add_argument("--max-rps", type=int, default=30, help="Server-side rate limit")
+    parser.add_argument("--quota", type=int, default=10000, help="Daily quota per key")
+    parser.add_argument("--rate", type=float, default=keyScheduler.REQUESTS_PER_SECOND,
+                        help="Client-side request rate of the key scheduler")
+    parser.add_argument("--concurrency", default="4,16", help="Comma-separated concurrency levels of the async collector")
+    args = parser.parse_args()
+    try:
+        keyScheduler.check_rate(args.rate)
+    except ValueError as error:
+        parser.error(str(error))
+
+    server_args = ["--users", str(args.users), "--latency", str(args.latency), "--throttle-rate", str(args.throttle_rate),
+                   "--backoff-every", str(args.backoff_every), "--max-rps", str(args.max_rps), "--quota", str(args.quota)]
+    process, url = start_server(args.port, server_args)
+    collectUsers.BASE_URL = collectBadges.BASE_URL = url
+
+    # Run from a scratch directory, so that ROOT_DIR-relative outputs (filters, checkpoints) stay out of the repo
+    work_dir = tempfile.mkdtemp(prefix="benchCollectors-")
+    run_dir = os.path.join(work_dir, "scripts", "collectFromAPI")
+    os.makedirs(run_dir)
+    os.chdir(run_dir)
+    output_dir = os.path.join(work_dir, "output", "api")
+    users_file = os.path.join(output_dir, "users.csv")
+
+    print(f"{'collector':<22} {'requests':>9} {'wall (s)':>9} {'req/s':>8} {'retries':>8} {'backoffs':>8}")
+    try:
+        run_collector("collectUsers", lambda: collectUsers.generate_users_table(users_file), url, args.rate)
+        run_collector("collectBadges", lambda: collectBadges.generate_badges_tables(users_file, output_dir),
+                      url, args.rate)
+        for concurrency in map(int, args.concurrency.split(",")):
+            async_dir = os.path.join(output_dir, f"async{concurrency}")
+            run_collector(f"collectBadgesAsync x{concurrency}",
+                          lambda: asyncio.run(collectBadgesAsync.generate_badges_tables_async(
+                              users_file, async_dir, concurrency, url)),
+                          url, args.rate)
+    finally:
+        process.terminate()
+        process.wait()
+    print(f"Outputs written to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import resource
+import subprocess
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "collectFromDump"))
+from dumpReader import iter_rows
+
+# Root Directory
+ROOT_DIR = "../.."
+
+# Attributes each dump script asks for
+FIELDS = {
+    "Posts.xml": ["Id", "PostTypeId", "ParentId", "AcceptedAnswerId", "OwnerUserId", "CreationDate", "Score",
+                  "ViewCount", "CommunityOwnedDate", "Tags", "AnswerCount", "CommentCount", "FavouriteCount"],
+    "Comments.xml": ["Id", "PostId", "UserId", "CreationDate"],
+}
+
+READERS = ["iterparse", "scan", "expat"]
+
+
+def iterparse_rows(file_path, fields):
+    """
+    The loop the dump scripts used before dumpReader: full Element objects, "start"
+    events discarded, elements cleared but still attached to the root.
+    """
+    context = ET.iterparse(file_path, events=("start", "end"))
+    for event, elem in context:
+        if event == "end" and elem.tag == "row":
+            yield tuple(elem.get(field) for field in fields)
+            elem.clear()
+
+
+def run_reader(reader, file_path):
+    """
+    Consume every row with one reader and print "<rows> <seconds> <peak rss kb>".
+    Runs in its own process so that peak RSS is not shared between readers.
+    """
+    fields = FIELDS[os.path.basename(file_path)]
+    rows = iterparse_rows(file_path, fields) if reader == "iterparse" else iter_rows(file_path, fields, reader)
+    start = time.perf_counter()
+    count = sum(1 for _ in rows)
+    elapsed = time.perf_counter() - start
+    print(count, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def benchmark(data_dir):
+    """
+    Compare rows/sec and peak RSS of every reader on Posts.xml and Comments.xml.
+    """
+    print(f"{'file':<14}{'reader':<11}{'rows':>10}{'seconds':>10}{'rows/sec':>12}{'peak RSS MB':>13}")
+    for file_name in FIELDS:
+        file_path = os.path.join(data_dir, file_name)
+        if not os.path.exists(file_path):
+            print(f"{file_name:<14}missing, skipped")
+            continue
+        for reader in READERS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", reader, file_path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            count, elapsed, peak_kb = int(output[0]), float(output[1]), int(output[2])
+            print(f"{file_name:<14}{reader:<11}{count:>10}{elapsed:>10.2f}{count / elapsed:>12.0f}{peak_kb / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_reader(sys.argv[2], sys.argv[3])
+    else:
+        benchmark(sys.argv[1] if len(sys.argv) > 1 else f"{ROOT_DIR}/data/genai.stackexchange.com")
@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extractFeatures"))
+from extractTagMatrices import ACTIVITIES, csr_entries
+from featureStore import FeatureStore, save_feature_store
+
+
+def make_matrices(user_count, tag_count, mean_pairs, seed):
+    """
+    Synthetic user x tag count matrices in the layout of extractTagMatrices, with Zipf-distributed tags.
+    """
+    rng = np.random.default_rng(seed)
+    matrices = {"user_ids": np.arange(1, user_count + 1, dtype=np.int64),
+                "tags": np.array([f"tag-{tag_id}" for tag_id in range(tag_count)])}
+    for activity in ACTIVITIES:
+        pairs = rng.poisson(mean_pairs, user_count)
+        rows = np.repeat(np.arange(user_count), pairs)
+        columns = np.minimum(rng.zipf(1.3, len(rows)) - 1, tag_count - 1)
+        keys = np.unique(rows.astype(np.int64) << 32 | columns)
+        matrices[f"{activity}.indptr"] = np.concatenate(([0], np.cumsum(np.bincount(keys >> 32, minlength=user_count))))
+        matrices[f"{activity}.indices"] = (keys & 0xFFFFFFFF).astype(np.int32)
+        matrices[f"{activity}.data"] = rng.geometric(0.5, len(keys)).astype(np.int32)
+    return matrices
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def write_json(matrices, path):
+    """
+    The format of the old extract*Tags scripts: one file per activity, every occurrence of a tag repeated.
+    """
+    os.makedirs(path)
+    for activity in ACTIVITIES:
+        user_ids, tags, counts = csr_entries(matrices, activity)
+        features = {}
+        for user_id, tag, count in zip(user_ids.tolist(), tags.tolist(), counts.tolist()):
+            features.setdefault(str(user_id), []).extend([tag] * count)
+        with open(os.path.join(path, f"{activity}.json"), mode="w", encoding="utf-8") as file:
+            json.dump(features, file, ensure_ascii=False, indent=4)
+
+
+def load_json(path):
+    features = {}
+    for activity in ACTIVITIES:
+        with open(os.path.join(path, f"{activity}.json"), mode="r", encoding="utf-8") as file:
+            features[activity] = json.load(file)
+    return features
+
+
+def write_npz(matrices, path):
+    np.savez_compressed(path, **matrices)
+
+
+def load_npz(path):
+    with np.load(path) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def open_store(path):
+    """
+    Open the store and read the tags of one user, which maps only the pages involved.
+    """
+    store = FeatureStore(path)
+    row = len(store["user_ids"]) // 2
+    indptr, indices, _ = store.csr("answered")
+    return store["tags"][indices[indptr[row]:indptr[row + 1]]]
+
+
+FORMATS = {
+    "json (indent=4)": ("features", write_json, load_json),
+    "npz (compressed)": ("users_tags.npz", write_npz, load_npz),
+    "feature store": ("users_tags", lambda matrices, path: save_feature_store(matrices, path), open_store),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare writing and opening the user x tag features as "
+                                                 "indented JSON, a compressed npz archive and the feature store.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--tags", type=int, default=20000)
+    parser.add_argument("--pairs", type=float, default=8, help="Mean distinct tags per user and activity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-json", action="store_true", help="Skip the (slow) JSON format")
+    args = parser.parse_args()
+
+    matrices = make_matrices(args.users, args.tags, args.pairs, args.seed)
+    print(f"{args.users} users x {args.tags} tags, "
+          f"{sum(len(matrices[f'{activity}.data']) for activity in ACTIVITIES)} user/tag pairs")
+    print(f"{'format':<18} {'write (s)':>10} {'size (MB)':>10} {'open (s)':>10}")
+    work_dir = tempfile.mkdtemp(prefix="benchFeatureStore-")
+    try:
+        for name, (file_name, write, load) in FORMATS.items():
+            if args.skip_json and name.startswith("json"):
+                continue
+            path = os.path.join(work_dir, file_name)
+            start = time.perf_counter()
+            write(matrices, path)
+            write_time = time.perf_counter() - start
+            start = time.perf_counter()
+            load(path)
+            load_time = time.perf_counter() - start
+            print(f"{name:<18} {write_time:>10.2f} {directory_size(path) / 2 ** 20:>10.1f} {load_time:>10.4f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "extractFeatures"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "indexing"))
+from createIndex import FEATURES_STORE, PROJECTION_STORE, load_users_table, users_to_vectors
+from indexFactory import create_index, factory_string, index_config, train_index
+from tagProjection import TagProjection
+
+# Configurations compared by default: the exact baseline and each approximate type at a
+# cheaper and a more accurate search setting
+CONFIGS = [
+    index_config("flat"),
+    index_config("ivf_flat", nprobe=8),
+    index_config("ivf_flat", nprobe=32),
+    index_config("ivf_pq", nprobe=8),
+    index_config("ivf_pq", nprobe=32),
+    index_config("hnsw", ef_search=32),
+    index_config("hnsw", ef_search=128),
+]
+
+
+def make_clustered_vectors(vector_count, dimension, cluster_count, seed):
+    """
+    Synthetic float32 vectors drawn around random cluster centers, so that neighbors are meaningful.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((cluster_count, dimension), dtype=np.float32)
+    vectors = centers[rng.integers(cluster_count, size=vector_count)]
+    vectors += rng.standard_normal((vector_count, dimension), dtype=np.float32)
+    return vectors
+
+
+def recall(neighbors, truth):
+    k = truth.shape[1]
+    return np.mean([len(np.intersect1d(found, expected)) / k for found, expected in zip(neighbors, truth)])
+
+
+def describe(config):
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        return f"{config['type']} nprobe={config['nprobe']}"
+    if config["type"] == "hnsw":
+        return f"hnsw ef={config['ef_search']}"
+    return config["type"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the index types of indexFactory on synthetic or real user "
+                                                 "vectors: build time, memory, QPS, latency and recall@k against "
+                                                 "the flat index.")
+    parser.add_argument("--users-table", help="Behavioral table to use real user vectors instead of synthetic ones")
+    parser.add_argument("--features", default=FEATURES_STORE, help="Feature store of the real user vectors")
+    parser.add_argument("--projection", nargs="?", const=PROJECTION_STORE,
+                        help="Reduce the real topical features with this fitted projection")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=138, help="Behavioral columns plus a 128-d projection")
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.users_table:
+        projection = TagProjection.load(args.projection) if args.projection else None
+        vectors = users_to_vectors(load_users_table(args.users_table), args.features, projection)
+    else:
+        vectors = make_clustered_vectors(args.vectors, args.dimension, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dimensions, {len(queries)} queries, recall@{args.k}")
+    print(f"{'index':<20} {'factory':<18} {'build (s)':>10} {'memory (MB)':>12} {'QPS':>9} "
+          f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'recall':>7}")
+
+    truth = None
+    for config in CONFIGS:
+        start = time.perf_counter()
+        index = create_index(config, vectors.shape[1], len(vectors))
+        train_index(index, vectors, args.seed)
+        index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+        build_time = time.perf_counter() - start
+        memory = len(faiss.serialize_index(index)) / 2 ** 20
+
+        # Throughput of one batched search, and latency of one query at a time
+        start = time.perf_counter()
+        _, neighbors = index.search(queries, args.k)
+        qps = len(queries) / (time.perf_counter() - start)
+        latencies = []
+        for query in queries[:, None]:
+            start = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+
+        if truth is None:
+            truth = neighbors
+        print(f"{describe(config):<20} {factory_string(config, vectors.shape[1], len(vectors)):<18} "
+              f"{build_time:>10.2f} {memory:>12.1f} {qps:>9.0f} {p50:>9.3f} {p99:>9.3f} "
+              f"{recall(neighbors, truth):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import faiss
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "extractFeatures"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "indexing"))
+from createIndex import extract_topical_features, fit_tag_projection, tag_idf, topical_blocks
+from featureStore import FeatureStore, save_feature_store
+from extractTagMatrices import ACTIVITIES
+
+
+def make_topic_matrices(user_count, tag_count, topic_count, seed):
+    """
+    Synthetic user x tag matrices with topical structure: every tag belongs to a topic, and
+    every user is active in one to three topics, mostly on that topic's popular tags.
+    """
+    rng = np.random.default_rng(seed)
+    tag_topics = rng.integers(topic_count, size=tag_count)
+    topic_tags = [np.flatnonzero(tag_topics == topic) for topic in range(topic_count)]
+    matrices = {"user_ids": np.arange(1, user_count + 1, dtype=np.int64),
+                "tags": np.array([f"tag-{tag_id:06d}" for tag_id in range(tag_count)])}
+    user_topics = [rng.choice(topic_count, size=rng.integers(1, 4), replace=False) for _ in range(user_count)]
+    for activity in ACTIVITIES:
+        keys = []
+        for row, topics in enumerate(user_topics):
+            for topic in topics:
+                tags = topic_tags[topic]
+                if len(tags):
+                    picks = tags[np.minimum(rng.zipf(1.5, rng.poisson(4)) - 1, len(tags) - 1)]
+                    keys.append(np.int64(row) << 32 | picks)
+        keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+        matrices[f"{activity}.indptr"] = np.concatenate(([0], np.cumsum(np.bincount(keys >> 32, minlength=user_count))))
+        matrices[f"{activity}.indices"] = (keys & 0xFFFFFFFF).astype(np.int32)
+        matrices[f"{activity}.data"] = counts.astype(np.int32)
+    return matrices
+
+
+def build_index(vectors):
+    start = time.perf_counter()
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index, time.perf_counter() - start
+
+
+def search(index, queries, k):
+    start = time.perf_counter()
+    _, neighbors = index.search(queries, k)
+    return neighbors, time.perf_counter() - start
+
+
+def recall(neighbors, truth):
+    k = truth.shape[1]
+    return np.mean([len(np.intersect1d(found, expected)) / k for found, expected in zip(neighbors, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare reduced topical user vectors (randomized SVD, sparse "
+                                                 "random projection) with the full tag-space vectors: index size, "
+                                                 "build time and recall@k.")
+    parser.add_argument("--features", help="Feature store to use instead of synthetic data")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--tags", type=int, default=5000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--dimensions", default="32,64,128", help="Comma-separated target dimensions")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="benchProjection-")
+    try:
+        store_dir = args.features
+        if store_dir is None:
+            store_dir = save_feature_store(make_topic_matrices(args.users, args.tags, args.topics, args.seed),
+                                           os.path.join(work_dir, "users_tags"))
+        store = FeatureStore(store_dir)
+        idf = tag_idf(store)
+        vectors = np.vstack(list(topical_blocks(store, idf)))
+        rng = np.random.default_rng(args.seed)
+        query_rows = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+        print(f"{len(vectors)} users x {len(idf)} tags, {len(query_rows)} queries, recall@{args.k}")
+
+        index, build_time = build_index(vectors)
+        truth, search_time = search(index, vectors[query_rows], args.k)
+        print(f"{'vectors':<14} {'dim':>6} {'fit (s)':>8} {'build (s)':>10} {'index (MB)':>11} "
+              f"{'search (ms/q)':>14} {'recall':>7}")
+        print(f"{'full':<14} {len(idf):>6} {0:>8.2f} {build_time:>10.2f} "
+              f"{len(faiss.serialize_index(index)) / 2 ** 20:>11.1f} {search_time / len(query_rows) * 1000:>14.3f} "
+              f"{1:>7.3f}")
+
+        for method in ("svd", "random"):
+            for dimension in map(int, args.dimensions.split(",")):
+                if dimension >= len(idf):
+                    continue
+                start = time.perf_counter()
+                projection = fit_tag_projection(store, dimension, method, args.seed)
+                reduced = np.vstack([projection.transform(block) for block in topical_blocks(store, idf)])
+                fit_time = time.perf_counter() - start
+                index, build_time = build_index(reduced)
+                queries = projection.transform(extract_topical_features(store, query_rows, idf))
+                neighbors, search_time = search(index, queries, args.k)
+                print(f"{method:<14} {dimension:>6} {fit_time:>8.2f} {build_time:>10.2f} "
+                      f"{len(faiss.serialize_index(index)) / 2 ** 20:>11.1f} "
+                      f"{search_time / len(query_rows) * 1000:>14.3f} {recall(neighbors, truth):>7.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
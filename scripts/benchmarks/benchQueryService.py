@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import itertools
+import subprocess
+from collections import Counter
+
+import aiohttp
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "extractFeatures"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "indexing"))
+from createIndex import PROJECTION_STORE
+from tagProjection import TagProjection
+
+MAIN_FILE = os.path.join(BENCH_DIR, "..", "..", "main.py")
+
+# Most the top-k lists of two different tag sets may share on average, and most of the lists a
+# single user may be in, before the results are taken to be decided by the behavioral features
+MAX_OVERLAP = 0.3
+MAX_USER_SHARE = 0.5
+
+
+def start_service(port, service_args):
+    """
+    Start the query service (main.py) in a subprocess and wait until it answers.
+    """
+    process = subprocess.Popen([sys.executable, MAIN_FILE, "--port", str(port), *service_args])
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                raise RuntimeError("The query service exited during startup")
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The query service did not start")
+
+
+def make_questions(projection, question_count, max_tags, seed):
+    """
+    Random questions of 1 to max_tags tags, drawn with the tags' popularity (users with the tag,
+    recovered from the IDF).
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.exp(-projection.idf.astype(np.float64))
+    weights /= weights.sum()
+    tags = np.asarray(projection.tags)
+    return [{"tags": tags[rng.choice(len(tags), size=min(rng.integers(1, max_tags + 1), len(tags)), replace=False,
+                                     p=weights)].tolist()}
+            for _ in range(question_count)]
+
+
+def check_result_overlap(url, questions, k, sample=50):
+    """
+    Recommend for up to `sample` questions with different tag sets, one at a time, and check that
+    the tags decide the users: the top-k lists of two tag sets share few users on average, and no
+    user is in most lists (as when the behavioral features decide the distances).
+
+    Returns:
+        tuple: (mean fraction of the users two lists share, largest fraction of the lists a user is in,
+                number of distinct tag sets).
+    """
+    tag_sets = list({tuple(sorted(question["tags"])): None for question in questions})[:sample]
+    results = [{user["user_id"] for user in requests.post(f"{url}/recommend", json={"tags": list(tags), "k": k})
+                .json()["users"]}
+               for tags in tag_sets]
+    if len(results) < 2:
+        return 0.0, 1.0, len(tag_sets)
+    overlap = float(np.mean([len(first & second) / k for first, second in itertools.combinations(results, 2)]))
+    user_share = Counter(user for result in results for user in result).most_common(1)[0][1] / len(results)
+    if overlap > MAX_OVERLAP or user_share > MAX_USER_SHARE:
+        raise RuntimeError(f"The top-{k} lists of {len(tag_sets)} tag sets share {overlap:.0%} of their users on "
+                           f"average and one user is in {user_share:.0%} of them: the tags do not decide the results")
+    return overlap, user_share, len(tag_sets)
+
+
+async def run_load(url, questions, concurrency, k):
+    """
+    Send every question once from `concurrency` concurrent clients.
+
+    Returns:
+        tuple: (latency of every successful request in seconds, errors, wall time in seconds).
+    """
+    latencies, errors = [], 0
+    pending = iter(questions)
+
+    async def client(session):
+        nonlocal errors
+        for question in pending:
+            start = time.perf_counter()
+            try:
+                async with session.post(f"{url}/recommend", json={**question, "k": k}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
+
+
+def run_levels(url, questions, levels, k, label):
+    """
+    Load one service at every concurrency level, with its batching statistics from /metrics.
+    """
+    for concurrency in levels:
+        requests.get(f"{url}/metrics", params={"reset": 1})
+        latencies, errors, seconds = asyncio.run(run_load(url, questions, concurrency, k))
+        metrics = requests.get(f"{url}/metrics").json()
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies else (float("nan"),) * 2
+        print(f"{label:<10} {concurrency:>8} {len(questions):>9} {errors:>7} {len(latencies) / seconds:>8.0f} "
+              f"{p50:>9.2f} {p99:>9.2f} {metrics['mean_batch_size']:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the expert recommendation service: QPS, p50/p99 "
+                                                 "latency and mean search batch size of /recommend at several "
+                                                 "concurrency levels, with and without query batching.")
+    parser.add_argument("--url", help="URL of a running service (default: start main.py on --port)")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--projection", default=PROJECTION_STORE, help="Projection store, for the tag vocabulary")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated numbers of concurrent clients")
+    parser.add_argument("--max-batch", default="1,64",
+                        help="Comma-separated --max-batch values of the services started (1: no batching)")
+    parser.add_argument("--max-tags", type=int, default=5)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("service_args", nargs=argparse.REMAINDER,
+                        help="Arguments passed to main.py when it is started, after --")
+    args = parser.parse_args()
+
+    questions = make_questions(TagProjection.load(args.projection), args.requests, args.max_tags, args.seed)
+    levels = [int(concurrency) for concurrency in args.concurrency.split(",")]
+    service_args = [arg for arg in args.service_args if arg != "--"]
+    header = (f"{'service':<10} {'clients':>8} {'requests':>9} {'errors':>7} {'QPS':>8} {'p50 (ms)':>9} "
+              f"{'p99 (ms)':>9} {'mean batch':>11}")
+
+    def check(url):
+        overlap, user_share, tag_sets = check_result_overlap(url, questions, args.k)
+        print(f"The top-{args.k} lists of {tag_sets} tag sets share {overlap:.0%} of their users on average, "
+              f"and no user is in more than {user_share:.0%} of them")
+        print(header)
+
+    if args.url:
+        check(args.url)
+        run_levels(args.url, questions, levels, args.k, "running")
+        return
+    for position, max_batch in enumerate(map(int, args.max_batch.split(","))):
+        process, url = start_service(args.port, ["--max-batch", str(max_batch), *service_args])
+        try:
+            if position == 0:
+                check(url)
+            run_levels(url, questions, levels, args.k, f"batch<={max_batch}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
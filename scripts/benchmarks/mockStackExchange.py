@@ -0,0 +1,284 @@
+import time
+import zlib
+import base64
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from aiohttp import web
+
+# Named badges handed out by the mock
+NAMED_BADGES = [("Autobiographer", "bronze"), ("Student", "bronze"), ("Teacher", "bronze"), ("Supporter", "bronze"),
+                ("Editor", "bronze"), ("Commentator", "bronze"), ("Scholar", "bronze"), ("Nice Answer", "bronze"),
+                ("Yearling", "silver"), ("Good Answer", "silver"), ("Enlightened", "silver"), ("Necromancer", "silver"),
+                ("Great Answer", "gold"), ("Famous Question", "gold"), ("Legendary", "gold")]
+TAGS = ["python", "machine-learning", "llm", "prompt-engineering", "chatgpt", "transformers", "stable-diffusion",
+        "fine-tuning", "embeddings", "rag", "openai-api", "image-generation", "tokenization", "gpt-4", "langchain"]
+RANK_ORDER = {"gold": 0, "silver": 1, "bronze": 2}
+
+# Object type of each field that holds an object, for applying filters
+NESTED_TYPES = {("user", "badge_counts"): "badge_count", ("badge", "user"): "shallow_user"}
+
+# Quota of requests sent without a key
+ANONYMOUS_QUOTA = 300
+
+
+def make_users(user_count, seed):
+    """
+    Synthetic users with a heavy-tailed reputation, sorted by reputation like /users?sort=reputation.
+    """
+    rng = random.Random(seed)
+    users = []
+    for user_id in range(1, user_count + 1):
+        reputation = int(rng.paretovariate(1.1) * 10)
+        users.append({
+            "badge_counts": {"bronze": 0, "silver": 0, "gold": 0},
+            "account_id": 100000 + user_id,
+            "is_employee": False,
+            "last_modified_date": 1700000000 + rng.randrange(10 ** 7),
+            "last_access_date": 1710000000 + rng.randrange(10 ** 7),
+            "reputation_change_year": rng.randrange(reputation + 1),
+            "reputation_change_quarter": 0,
+            "reputation_change_month": 0,
+            "reputation_change_week": 0,
+            "reputation_change_day": 0,
+            "reputation": reputation,
+            "creation_date": 1680000000 + rng.randrange(10 ** 7),
+            "user_type": "registered",
+            "user_id": user_id,
+            "accept_rate": rng.randrange(101),
+            "location": rng.choice(["Berlin, Germany", "Bangalore, India", "Seattle, WA", "São Paulo, Brazil"]),
+            "website_url": f"https://example.com/~user{user_id}",
+            "link": f"https://genai.stackexchange.com/users/{user_id}/user{user_id}",
+            "profile_image": f"https://www.gravatar.com/avatar/{user_id:032x}?s=256&d=identicon&r=PG",
+            "display_name": f"user{user_id}",
+        })
+    users.sort(key=lambda user: -user["reputation"])
+    return users
+
+
+def make_badges(user, seed):
+    """
+    Synthetic badges of one user, more for users with more reputation, sorted by rank.
+    """
+    rng = random.Random(seed * 1000003 + user["user_id"])
+    count = min(int(rng.paretovariate(1.3) * (1 + user["reputation"] ** 0.3)), 400)
+    owner = {field: user[field] for field in
+             ("account_id", "reputation", "user_id", "user_type", "profile_image", "display_name", "link")}
+    badges = []
+    for badge_index in range(count):
+        if badge_index < len(NAMED_BADGES) and rng.random() < 0.7:
+            name, rank = NAMED_BADGES[badge_index]
+            badge_type = "named"
+        else:
+            name = f"{rng.choice(TAGS)}-{badge_index}"
+            rank = rng.choice(["bronze", "bronze", "silver", "gold"])
+            badge_type = "tag_based"
+        badge_id = zlib.crc32(name.encode("utf-8")) % 100000
+        badges.append({"badge_id": badge_id, "rank": rank, "name": name, "award_count": 1 + rng.randrange(3),
+                       "badge_type": badge_type, "link": f"https://genai.stackexchange.com/badges/{badge_id}/{name}",
+                       "user": owner})
+        user["badge_counts"][rank] += 1
+    badges.sort(key=lambda badge: RANK_ORDER[badge["rank"]])
+    return badges
+
+
+def encode_filter(include):
+    """
+    Filters are stateless: the name is the compressed list of included fields.
+    """
+    return base64.urlsafe_b64encode(zlib.compress(include.encode("utf-8"))).decode("ascii").rstrip("=")
+
+
+def decode_filter(name):
+    padded = name + "=" * (-len(name) % 4)
+    return set(zlib.decompress(base64.urlsafe_b64decode(padded)).decode("utf-8").split(";"))
+
+
+def apply_filter(value, object_type, include):
+    result = {}
+    for field, field_value in value.items():
+        if f"{object_type}.{field}" in include:
+            nested = NESTED_TYPES.get((object_type, field))
+            result[field] = apply_filter(field_value, nested, include) if nested else field_value
+    return result
+
+
+def error_response(status, error_id, error_name, error_message):
+    return web.json_response({"error_id": error_id, "error_name": error_name, "error_message": error_message},
+                             status=status)
+
+
+def wrap(request, items, object_type, has_more):
+    """
+    Build a response wrapper as the API does: quota and backoff fields, filtering, compression.
+    """
+    state = request.app["state"]
+    config = state["config"]
+    key_quota = state["quota"]
+    data = {"items": items, "has_more": has_more,
+            "quota_max": config.quota if request.query.get("key") else ANONYMOUS_QUOTA,
+            "quota_remaining": key_quota[request.query.get("key")]}
+    if config.backoff_every and state["stats"]["requests"] % config.backoff_every == 0:
+        data["backoff"] = config.backoff
+        state["stats"]["backoffs"] += 1
+
+    filter_name = request.query.get("filter", "default")
+    if filter_name == "total":
+        data = {"total": len(items)}
+    elif filter_name not in ("default", "none"):
+        try:
+            include = decode_filter(filter_name)
+        except (ValueError, zlib.error):
+            return error_response(400, 400, "bad_parameter", "filter is not a valid filter")
+        data = {field: value for field, value in data.items() if f".{field}" in include}
+        if "items" in data:
+            data["items"] = [apply_filter(item, object_type, include) for item in items]
+
+    response = web.json_response(data)
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response.enable_compression(web.ContentCoding.gzip)
+    return response
+
+
+@web.middleware
+async def throttling(request, handler):
+    """
+    Inject latency, 429s and quota exhaustion in front of every API route.
+    """
+    state = request.app["state"]
+    config = state["config"]
+    stats = state["stats"]
+    if request.path.startswith("/_"):
+        return await handler(request)
+
+    stats["requests"] += 1
+    # The rate limit counts requests as they arrive, before the added latency
+    now = time.monotonic()
+    recent = state["recent"]
+    while recent and recent[0] <= now - 1:
+        recent.popleft()
+    recent.append(now)
+    throttled = (config.max_rps and len(recent) > config.max_rps) or state["rng"].random() < config.throttle_rate
+    if config.latency:
+        await asyncio.sleep(config.latency / 1000 * (1 + config.jitter * (2 * state["rng"].random() - 1)))
+    if throttled:
+        stats["throttled"] += 1
+        return web.Response(status=429, text="Too Many Requests")
+
+    key = request.query.get("key")
+    quota = state["quota"]
+    if key not in quota:
+        quota[key] = config.quota if key else ANONYMOUS_QUOTA
+    if quota[key] <= 0:
+        stats["quota_errors"] += 1
+        return error_response(400, 502, "throttle_violation",
+                              "too many requests from this IP, more requests available in 86400 seconds")
+    quota[key] -= 1
+    return await handler(request)
+
+
+def page_arguments(request):
+    page = int(request.query.get("page", 1))
+    page_size = int(request.query.get("pagesize", 30))
+    return page, page_size
+
+
+async def users_handler(request):
+    page, page_size = page_arguments(request)
+    if page_size > 100:
+        return error_response(400, 400, "bad_parameter", "pagesize is out of range")
+    users = request.app["state"]["users"]
+    items = users[(page - 1) * page_size:page * page_size]
+    return wrap(request, items, "user", page * page_size < len(users))
+
+
+async def badges_handler(request):
+    page, page_size = page_arguments(request)
+    ids = request.match_info["ids"].split(";")
+    if len(ids) > 100 or page_size > 100:
+        return error_response(400, 400, "bad_parameter", "ids or pagesize is out of range")
+    badges = request.app["state"]["badges"]
+    items = [badge for user_id in ids if user_id.isdigit() for badge in badges.get(int(user_id), [])]
+    items.sort(key=lambda badge: RANK_ORDER[badge["rank"]])  # sort=rank across the whole batch
+    return wrap(request, items[(page - 1) * page_size:page * page_size], "badge", page * page_size < len(items))
+
+
+async def info_handler(request):
+    state = request.app["state"]
+    info = {"total_users": len(state["users"]),
+            "total_badges": sum(len(badges) for badges in state["badges"].values()),
+            "api_revision": "mock"}
+    return wrap(request, [info], "info", False)
+
+
+async def create_filter_handler(request):
+    include = request.query.get("include", "")
+    return web.json_response({"items": [{"filter": encode_filter(include), "included_fields": include.split(";"),
+                                         "filter_type": "safe"}]})
+
+
+async def stats_handler(request):
+    """
+    Request counters, for the benchmark harness. ?reset=1 zeroes them and restores the quotas.
+    """
+    state = request.app["state"]
+    stats = dict(state["stats"])
+    if request.query.get("reset"):
+        state["stats"].update(requests=0, throttled=0, quota_errors=0, backoffs=0)
+        state["quota"].clear()
+    return web.json_response(stats)
+
+
+def create_app(config):
+    """
+    Build the mock API application.
+
+    Args:
+        config (argparse.Namespace): Data size and fault injection settings, see main().
+    """
+    users = make_users(config.users, config.seed)
+    badges = {user["user_id"]: make_badges(user, config.seed) for user in users}
+    app = web.Application(middlewares=[throttling])
+    app["state"] = {
+        "config": config,
+        "users": users,
+        "badges": badges,
+        "quota": {},
+        "recent": deque(),
+        "rng": random.Random(config.seed),
+        "stats": {"requests": 0, "throttled": 0, "quota_errors": 0, "backoffs": 0},
+    }
+    app.router.add_get("/users", users_handler)
+    app.router.add_get("/users/{ids}/badges", badges_handler)
+    app.router.add_get("/info", info_handler)
+    app.router.add_get("/filters/create", create_filter_handler)
+    app.router.add_get("/_stats", stats_handler)
+    return app
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Stack Exchange API (/users, "
+                                                 "/users/{ids}/badges, /info) serving synthetic data.")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--users", type=int, default=5000, help="Number of synthetic users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=50, help="Added latency per request (ms)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter")
+    parser.add_argument("--backoff-every", type=int, default=0, help="Add a backoff field to every Nth response")
+    parser.add_argument("--backoff", type=int, default=1, help="Value of the injected backoff field (seconds)")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument("--max-rps", type=int, default=30, help="Answer 429 above this many requests per second")
+    parser.add_argument("--quota", type=int, default=10000, help="Daily quota per key")
+    return parser
+
+
+def main():
+    config = build_parser().parse_args()
+    print(f"Serving {config.users} synthetic users on http://127.0.0.1:{config.port}")
+    web.run_app(create_app(config), host="127.0.0.1", port=config.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import json
+import requests
+
+from responseCache import CacheMiss
+
+# Root directory
+ROOT_DIR = "../.."
+
+# Filters created so far, by API root and included fields. A filter never changes once created
+FILTERS_FILE = f"{ROOT_DIR}/output/api/filters.json"
+
+# Ask for compressed responses. The API compresses anyway; this makes it explicit for clients
+# that would not send the header on their own
+REQUEST_HEADERS = {"Accept-Encoding": "gzip, deflate"}
+
+# Response wrapper fields the collectors read
+WRAPPER_FIELDS = [
+    ".items", ".has_more", ".backoff", ".quota_max", ".quota_remaining",
+    ".error_id", ".error_name", ".error_message",
+]
+
+_filters = {}
+
+
+def _load_filters(filters_file):
+    if filters_file and os.path.exists(filters_file):
+        with open(filters_file, mode="r", encoding="utf-8") as file:
+            return json.load(file)
+    return {}
+
+
+def get_filter(fields, base_url, filters_file=FILTERS_FILE, offline=False):
+    """
+    Get a filter that returns only the given fields (plus the wrapper fields the collectors read),
+    creating it through /filters/create the first time.
+
+    Args:
+        fields (list): Object fields to include, e.g. ["user.user_id", "user.reputation"].
+        base_url (str): API root.
+        filters_file (str): JSON file the created filters are kept in between runs.
+        offline (bool): Never go to the network, as with an offline ResponseCache.
+
+    Returns:
+        str: The filter name to pass as the `filter` parameter.
+
+    Raises:
+        CacheMiss: In offline mode, if the filter was never created.
+    """
+    include = ";".join(sorted(set(WRAPPER_FIELDS + list(fields))))
+    name = f"{base_url} {include}"
+    if name in _filters:
+        return _filters[name]
+    saved = _load_filters(filters_file)
+    if name not in saved:
+        if offline:
+            # The cached responses are keyed by the filter, so no other filter would find them
+            raise CacheMiss(f"No filter for {include} in {filters_file} and the cache is in offline mode")
+        response = requests.get(
+            f"{base_url}/filters/create",
+            params={"include": include, "base": "none", "unsafe": "false"},
+            headers=REQUEST_HEADERS
+        )
+        response.raise_for_status()
+        saved[name] = response.json()["items"][0]["filter"]
+        if filters_file:
+            os.makedirs(os.path.dirname(filters_file) or ".", exist_ok=True)
+            with open(filters_file, mode="w", encoding="utf-8") as file:
+                json.dump(saved, file, indent=4)
+    _filters[name] = saved[name]
+    return saved[name]
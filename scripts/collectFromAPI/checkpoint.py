@@ -0,0 +1,85 @@
+import os
+import csv
+import json
+
+
+def checkpoint_path(output_file):
+    """
+    Path of the checkpoint kept next to a collector's output file.
+    """
+    return f"{output_file}.checkpoint.json"
+
+
+def load_checkpoint(path):
+    """
+    Returns:
+        dict: The saved collector state, or None if there is no checkpoint.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_checkpoint(path, state, outputs):
+    """
+    Flush the output files and record their sizes together with the collector state.
+    Written atomically, so a crash leaves either the old or the new checkpoint.
+
+    Args:
+        path (str): Checkpoint path.
+        state (dict): JSON-serializable collector state (next page, finished batches, key index...).
+        outputs (dict): Output path -> open file object.
+    """
+    offsets = {}
+    for file_path, file in outputs.items():
+        file.flush()
+        offsets[os.path.basename(file_path)] = os.fstat(file.fileno()).st_size
+    temp_file = f"{path}.tmp"
+    with open(temp_file, mode="w", encoding="utf-8") as file:
+        json.dump({**state, "offsets": offsets}, file, indent=4)
+    os.replace(temp_file, path)
+
+
+def remove_checkpoint(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def open_output(file_path, header, checkpoint=None):
+    """
+    Open a CSV output file for streaming rows.
+
+    Without a checkpoint the file is created with a header row. When resuming, it is truncated
+    to the size recorded in the checkpoint, dropping rows written after it was saved, and
+    opened for appending.
+
+    Returns:
+        file: The open file object.
+    """
+    if checkpoint is None:
+        file = open(file_path, mode="w", newline="", encoding="utf-8")
+        csv.writer(file).writerow(header)
+        return file
+    os.truncate(file_path, checkpoint["offsets"][os.path.basename(file_path)])
+    return open(file_path, mode="a", newline="", encoding="utf-8")
+
+
+def finish_batch(state, batch_index):
+    """
+    Mark a batch of work items as written. Finished batches are kept as a low-water mark
+    ("next_batch") plus the few finished out of order ("batches_done"), so the checkpoint
+    stays small however many batches there are.
+    """
+    done = set(state.get("batches_done", []))
+    done.add(batch_index)
+    next_batch = state.get("next_batch", 0)
+    while next_batch in done:
+        done.remove(next_batch)
+        next_batch += 1
+    state["next_batch"] = next_batch
+    state["batches_done"] = sorted(done)
+
+
+def is_batch_done(state, batch_index):
+    return batch_index < state.get("next_batch", 0) or batch_index in state.get("batches_done", [])
@@ -1,9 +1,15 @@
 import os
 import csv
 import requests
-import time
+import argparse
+from collections import defaultdict
 from datetime import datetime
-from itertools import cycle
+
+from apiFilters import REQUEST_HEADERS, get_filter
+from checkpoint import (checkpoint_path, finish_batch, is_batch_done, load_checkpoint, open_output,
+                        remove_checkpoint, save_checkpoint)
+from keyScheduler import THROTTLE_VIOLATION, default_scheduler
+from responseCache import add_cache_arguments, cache_from_args
 
 # Base URL for the Stack Exchange API
 BASE_URL = "https://api.stackexchange.com/2.3"
@@ -14,112 +20,196 @@ ROOT_DIR = "../.."
 # Set the Stack Exchange site
 SITE = "genai.stackexchange.com"
 
-# List of API keys
-API_KEYS = ["rl_AcJgSUjNrKYeV8cR7CZX7jXKL",
-            "rl_dR5mDxPc3G6gLj5AQZofBsd6R",
-            "rl_o6qEBMddrQcJi5P8AjvD9oxkD",
-            "rl_WiALEvcddrpyt74t5as3uGzKJ",
-            "rl_6PzmZqnSX4VEZfUmJJnf9uihW",
-            "rl_xin44SwFnyccmjgQU4a9tT7xP",
-            "rl_uUxqzkvKeCMiT3JDtX8fJdvkr"]
-
-api_key_pool = cycle(API_KEYS)  # Rotate API keys
-
 # # Proxies
 # proxies = {
 #     "http": "http://47.90.167.27:8081",
 #     "https": "http://47.90.167.27:8081"
 # }
 
+BADGES_HEADER = ["user id", "badge name", "badge rank", "award count", "creation date"]
+
+# Fields of the badge objects the tables are written from; the owner's id routes batched results
+BADGE_FIELDS = ["badge.name", "badge.rank", "badge.award_count", "badge.badge_type", "badge.user",
+                "shallow_user.user_id"]
+
+# Maximum number of semicolon-separated ids the API accepts per request
+BATCH_SIZE = 100
+
+# Function to fetch one page of badges for a batch of users
+def fetch_badges_page(user_ids, page=1, site=SITE, cache=None, scheduler=None):
+    endpoint = f"/users/{';'.join(user_ids)}/badges"
+    offline = cache is not None and cache.offline
+    params = {
+        "site": site,
+        "order": "desc",
+        "sort": "rank",
+        "page": page,
+        "pagesize": 100,  # Fetch up to 100 badges per request
+        "filter": get_filter(BADGE_FIELDS, BASE_URL, offline=offline)  # Only the fields written to the tables
+    }
+    data = cache.get(endpoint, params) if cache else None
+    if data is not None:
+        return data
+    scheduler = scheduler or default_scheduler()
+    while True:
+        # The scheduler picks the key with the most quota left and waits out backoffs
+        current_key = scheduler.acquire()
+        response = requests.get(
+            f"{BASE_URL}{endpoint}",
+            params={**params, "key": current_key},
+            headers=REQUEST_HEADERS,
+            # proxies=proxies  # Use the specified proxies
+        )
+        if response.status_code == 429:  # Too many requests, retry with another key
+            scheduler.throttled(current_key)
+            continue
+        data = response.json()
+        scheduler.record(current_key, data)
+        if "error_id" not in data:
+            break
+        if data["error_id"] != THROTTLE_VIOLATION:
+            raise RuntimeError(f"Request for {endpoint} failed: {data.get('error_name')} {data.get('error_message')}")
+    if cache:
+        cache.put(endpoint, params, data)
+    return data
+
+# Function to fetch all badges for a batch of users (up to BATCH_SIZE ids), following has_more
+def fetch_users_badges(user_ids, site=SITE, cache=None, scheduler=None):
+    """
+    Returns:
+        tuple: (badges, number of pages that were not served from the cache).
+    """
+    badges = []
+    page = 1
+    hits = cache.hits if cache else 0
+    while True:
+        data = fetch_badges_page(user_ids, page, site, cache, scheduler)
+        badges.extend(data.get("items", []))
+        if not data.get("has_more"):
+            return badges, page - ((cache.hits if cache else 0) - hits)
+        page += 1
+
 # Function to fetch all badges for a specific user
 def fetch_user_badges(user_id, site=SITE):
-    current_key = next(api_key_pool)
-    response = requests.get(
-        f"{BASE_URL}/users/{user_id}/badges",
-        params={
-            "site": site,
-            "order": "desc",
-            "sort": "rank",
-            "key": current_key,
-            "pagesize": 100  # Fetch up to 100 badges per request
-        },
-        # proxies=proxies  # Use the specified proxies
-    )
-    if response.status_code == 429:  # Too many requests
-        print(f"[{datetime.now()}] Rate limit exceeded. Switching API key...")
-        time.sleep(1)  # Short delay before retrying
-        return fetch_user_badges(user_id, site)  # Retry with a new key
-    data = response.json()
-    if "backoff" in data:
-        backoff_time = data["backoff"]
-        print(f"[{datetime.now()}] Backoff received. Waiting for {backoff_time} seconds...")
-        time.sleep(backoff_time)
-    return data.get("items", [])  # Fetch all badges
+    return fetch_users_badges([str(user_id)], site)[0]
+
+def read_user_batches(users_file, batch_size=BATCH_SIZE):
+    """
+    Yield the ids of users.csv in lists of up to `batch_size`.
+    """
+    batch = []
+    with open(users_file, mode="r", encoding="utf-8") as user_csv:
+        for row in csv.DictReader(user_csv):
+            batch.append(row["user id"])
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def group_badges_by_user(badges):
+    """
+    Route the badges of a batched request back to their owners.
+
+    Returns:
+        dict: User id (str) -> list of badges, in response order.
+    """
+    by_user = defaultdict(list)
+    for badge in badges:
+        by_user[str(badge["user"]["user_id"])].append(badge)
+    return by_user
+
+def write_badge_rows(user_id, badges, tag_writer, named_writer):
+    """
+    Write the badges of one user to the tag-based or named badges table.
+    """
+    for badge in badges:
+        row = [user_id, badge["name"], badge["rank"], badge["award_count"], badge.get("creation_date", "null")]
+        if badge["badge_type"] == "tag_based":
+            tag_writer.writerow(row)
+        elif badge["badge_type"] == "named":
+            named_writer.writerow(row)
+
+def load_badges_checkpoint(output_dir, batch_size=BATCH_SIZE, resume=True):
+    """
+    Load the checkpoint of an interrupted badges run in `output_dir`.
+
+    Returns:
+        tuple: (checkpoint file, checkpoint or None, collector state to continue from).
+    """
+    checkpoint_file = checkpoint_path(os.path.join(output_dir, "badges"))
+    checkpoint = load_checkpoint(checkpoint_file) if resume else None
+    if checkpoint is None:
+        return checkpoint_file, None, {"batch_size": batch_size, "request_count": 0}
+    if checkpoint["batch_size"] != batch_size:
+        raise ValueError(f"{checkpoint_file} was written with batch size {checkpoint['batch_size']}, "
+                         f"not {batch_size}")
+    print(f"[{datetime.now()}] Resuming after batch {checkpoint.get('next_batch', 0)} ({checkpoint_file}).")
+    return checkpoint_file, checkpoint, {key: value for key, value in checkpoint.items() if key != "offsets"}
 
 # Main function to fetch badges and write them into two CSV files
-def generate_badges_tables(users_file, output_dir):
+def generate_badges_tables(users_file, output_dir, resume=True, cache=None):
+    """
+    Stream the badges of every user in `users_file` to tag_based_badges.csv and named_badges.csv.
+
+    After every batch the finished batches and output sizes are saved to badges.checkpoint.json
+    in `output_dir`. If that file exists and `resume` is set, finished batches are skipped;
+    the checkpoint is removed once all users are written. Pages found in `cache` are not
+    requested again.
+    """
     os.makedirs(output_dir, exist_ok=True)
 
     # File paths for the two tables
     tag_based_file = os.path.join(output_dir, "tag_based_badges.csv")
     named_file = os.path.join(output_dir, "named_badges.csv")
+    checkpoint_file, checkpoint, state = load_badges_checkpoint(output_dir, BATCH_SIZE, resume)
 
-    # Initialize request counter
-    request_count = 0
-
-    # Open files for writing
-    with open(tag_based_file, mode="w", newline="", encoding="utf-8") as tag_csv, \
-            open(named_file, mode="w", newline="", encoding="utf-8") as named_csv:
+    # Open files for writing (or appending, when resuming)
+    with open_output(tag_based_file, BADGES_HEADER, checkpoint) as tag_csv, \
+            open_output(named_file, BADGES_HEADER, checkpoint) as named_csv:
 
         # CSV writers
         tag_writer = csv.writer(tag_csv)
         named_writer = csv.writer(named_csv)
-
-        # Write headers
-        tag_writer.writerow(["user id", "badge name", "badge rank", "award count", "creation date"])
-        named_writer.writerow(["user id", "badge name", "badge rank", "award count", "creation date"])
-        print(f"[{datetime.now()}] Headers written to both CSV files.")
-
-        # Read users from the users file
-        with open(users_file, mode="r", encoding="utf-8") as user_csv:
-            reader = csv.DictReader(user_csv)
-            for user_index, row in enumerate(reader, start=1):
-                user_id = row["user id"]
-                print(f"[{datetime.now()}] Fetching badges for user ID: {user_id} (User {user_index})...")
-
-                # Fetch badges for the user
-                badges = fetch_user_badges(user_id)
-                request_count += 1
-                print(f"[{datetime.now()}] Fetched {len(badges)} badges for user ID: {user_id}. Total requests so far: {request_count}.")
-
-                # Write badges to the appropriate files
-                for badge_index, badge in enumerate(badges, start=1):
-                    badge_name = badge["name"]
-                    badge_rank = badge["rank"]
-                    award_count = badge["award_count"]
-                    creation_date = badge.get("creation_date", "null")
-
-                    # Write to the appropriate file based on badge type
-                    if badge["badge_type"] == "tag_based":
-                        tag_writer.writerow([user_id, badge_name, badge_rank, award_count, creation_date])
-                    elif badge["badge_type"] == "named":
-                        named_writer.writerow([user_id, badge_name, badge_rank, award_count, creation_date])
-
-                    # Log progress every 10 badges
-                    if badge_index % 10 == 0:
-                        print(f"[{datetime.now()}] Written {badge_index} badges for user ID: {user_id}.")
-
-                # Log progress every 5 users
-                if user_index % 5 == 0:
-                    print(f"[{datetime.now()}] Processed {user_index} users so far.")
-
-                # Rate limiting: Stay below 25 requests per second
-                # time.sleep(0.04)
-
+        outputs = {tag_based_file: tag_csv, named_file: named_csv}
+
+        # Read users from the users file, BATCH_SIZE ids per request
+        user_count = 0
+        for batch_index, user_ids in enumerate(read_user_batches(users_file)):
+            if is_batch_done(state, batch_index):
+                user_count += len(user_ids)
+                continue
+            print(f"[{datetime.now()}] Fetching badges for user IDs {user_ids[0]}..{user_ids[-1]} "
+                  f"(Users {user_count + 1}-{user_count + len(user_ids)})...")
+
+            # Fetch badges for the batch
+            badges, requests_sent = fetch_users_badges(user_ids, cache=cache)
+            state["request_count"] += requests_sent
+            print(f"[{datetime.now()}] Fetched {len(badges)} badges with {requests_sent} requests. "
+                  f"Total requests so far: {state['request_count']}.")
+
+            # Write badges to the appropriate files, grouped by user in input order
+            by_user = group_badges_by_user(badges)
+            for user_id in user_ids:
+                write_badge_rows(user_id, by_user.get(user_id, []), tag_writer, named_writer)
+            finish_batch(state, batch_index)
+            save_checkpoint(checkpoint_file, state, outputs)
+
+            user_count += len(user_ids)
+            print(f"[{datetime.now()}] Processed {user_count} users so far.")
+
+    remove_checkpoint(checkpoint_file)
+    default_scheduler().save()
     print(f"[{datetime.now()}] Tag-based badges written to: {tag_based_file}")
     print(f"[{datetime.now()}] Named badges written to: {named_file}")
-    print(f"[{datetime.now()}] Total requests sent: {request_count}")
+    print(f"[{datetime.now()}] Total requests sent: {state['request_count']}")
 
 # Run the script
 if __name__ == "__main__":
-    generate_badges_tables(users_file=f"{ROOT_DIR}/output/api/users.csv", output_dir=f"{ROOT_DIR}/output/api")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Collect the badges of the users in users.csv.")
+    parser.add_argument("--users-file", default=f"{ROOT_DIR}/output/api/users.csv")
+    parser.add_argument("--output-dir", default=f"{ROOT_DIR}/output/api")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    generate_badges_tables(users_file=args.users_file, output_dir=args.output_dir, cache=cache_from_args(args))
\ No newline at end of file
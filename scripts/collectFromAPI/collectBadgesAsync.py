@@ -0,0 +1,197 @@
+import os
+import csv
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+import aiohttp
+
+from apiFilters import REQUEST_HEADERS, get_filter
+from checkpoint import finish_batch, is_batch_done, open_output, remove_checkpoint, save_checkpoint
+from collectBadges import (BADGE_FIELDS, BADGES_HEADER, BASE_URL, BATCH_SIZE, ROOT_DIR, SITE, group_badges_by_user,
+                           load_badges_checkpoint, read_user_batches, write_badge_rows)
+from keyScheduler import THROTTLE_VIOLATION, default_scheduler
+from responseCache import add_cache_arguments, cache_from_args
+
+# Number of requests kept in flight at once
+CONCURRENCY = 10
+
+
+class BadgeClient:
+    """
+    Fetches user badges over one pooled HTTP session.
+
+    Keys come from a KeyScheduler, which spreads the requests over the keys with quota left,
+    rests keys that received a `backoff` or a 429, and keeps the overall rate under the API limit.
+    The filter is passed in rather than created here, since creating it is a blocking request.
+    """
+
+    def __init__(self, session, filter_name, base_url=BASE_URL, site=SITE, cache=None, scheduler=None):
+        self.session = session
+        self.cache = cache
+        self.scheduler = scheduler or default_scheduler()
+        self.base_url = base_url
+        self.site = site
+        self.filter = filter_name
+        self.request_count = 0
+        self.retry_count = 0
+
+    async def fetch_badges_page(self, user_ids, page=1):
+        endpoint = f"/users/{';'.join(user_ids)}/badges"
+        params = {
+            "site": self.site,
+            "order": "desc",
+            "sort": "rank",
+            "page": page,
+            "pagesize": 100,  # Fetch up to 100 badges per request
+            "filter": self.filter  # Only the fields written to the tables
+        }
+        data = self.cache.get(endpoint, params) if self.cache else None
+        if data is not None:
+            return data
+        while True:
+            current_key, wait = self.scheduler.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self.session.get(f"{self.base_url}{endpoint}", params={**params, "key": current_key}) as response:
+                self.request_count += 1
+                if response.status == 429:  # Too many requests, retry with another key
+                    self.retry_count += 1
+                    self.scheduler.throttled(current_key)
+                    continue
+                data = await response.json(content_type=None)
+
+            self.scheduler.record(current_key, data)
+            if "error_id" not in data:
+                break
+            if data["error_id"] != THROTTLE_VIOLATION:
+                raise RuntimeError(f"Request for {endpoint} failed: {data.get('error_name')} {data.get('error_message')}")
+            self.retry_count += 1
+        if self.cache:
+            self.cache.put(endpoint, params, data)
+        return data
+
+    async def fetch_users_badges(self, user_ids):
+        """
+        Fetch all badges of a batch of up to BATCH_SIZE users, following has_more.
+        """
+        badges = []
+        page = 1
+        while True:
+            data = await self.fetch_badges_page(user_ids, page)
+            badges.extend(data.get("items", []))
+            if not data.get("has_more"):
+                return badges
+            page += 1
+
+
+async def _read_user_ids(users_file, queue, workers, batch_size, state):
+    for batch_index, user_ids in enumerate(read_user_batches(users_file, batch_size)):
+        if not is_batch_done(state, batch_index):  # Finished before a restart
+            await queue.put((batch_index, user_ids))
+    for _ in range(workers):
+        await queue.put(None)  # One stop signal per worker
+
+
+async def _badge_worker(client, queue, run):
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        batch_index, user_ids = item
+        badges = await client.fetch_users_badges(user_ids)
+
+        # Write badges to the appropriate files as soon as they arrive, then record the batch
+        by_user = group_badges_by_user(badges)
+        for user_id in user_ids:
+            write_badge_rows(user_id, by_user.get(user_id, []), run["tag_writer"], run["named_writer"])
+        run["state"]["request_count"] = run["initial_requests"] + client.request_count
+        finish_batch(run["state"], batch_index)
+        save_checkpoint(run["checkpoint_file"], run["state"], run["outputs"])
+
+        run["users"] += len(user_ids)
+        print(f"[{datetime.now()}] Processed {run['users']} users so far. "
+              f"Total requests so far: {client.request_count}.")
+
+
+async def generate_badges_tables_async(users_file, output_dir, concurrency=CONCURRENCY, base_url=BASE_URL,
+                                       site=SITE, batch_size=BATCH_SIZE, resume=True, cache=None):
+    """
+    Fetch the badges of every user in `users_file` with up to `concurrency` requests in flight,
+    writing tag_based_badges.csv and named_badges.csv as results arrive. Each request covers
+    up to `batch_size` users; batches are written in completion order rather than user order.
+    Finished batches are checkpointed as in collectBadges.generate_badges_tables, and a
+    restarted run (of either collector) skips them.
+
+    Args:
+        users_file (str): users.csv written by collectUsers.py.
+        output_dir (str): Directory for the two badge tables.
+        concurrency (int): Number of requests in flight.
+        base_url (str): API root, e.g. a local stand-in server for tests.
+        site (str): Stack Exchange site.
+        batch_size (int): User ids per request, at most 100.
+        resume (bool): Continue from badges.checkpoint.json in `output_dir` if it exists.
+        cache (ResponseCache): Optional response cache; cached pages are not requested again.
+
+    Returns:
+        dict: Users processed and requests sent in this run, throttled retries and wall time.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tag_based_file = os.path.join(output_dir, "tag_based_badges.csv")
+    named_file = os.path.join(output_dir, "named_badges.csv")
+    checkpoint_file, checkpoint, state = load_badges_checkpoint(output_dir, batch_size, resume)
+    start = time.perf_counter()
+
+    with open_output(tag_based_file, BADGES_HEADER, checkpoint) as tag_csv, \
+            open_output(named_file, BADGES_HEADER, checkpoint) as named_csv:
+        run = {
+            "tag_writer": csv.writer(tag_csv),
+            "named_writer": csv.writer(named_csv),
+            "outputs": {tag_based_file: tag_csv, named_file: named_csv},
+            "checkpoint_file": checkpoint_file,
+            "state": state,
+            "initial_requests": state["request_count"],
+            "users": 0,
+        }
+
+        # Loaded or created in a thread, so that the event loop is not blocked on /filters/create
+        filter_name = await asyncio.to_thread(get_filter, BADGE_FIELDS, base_url,
+                                              offline=cache is not None and cache.offline)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector, headers=REQUEST_HEADERS) as session:
+            client = BadgeClient(session, filter_name, base_url, site, cache)
+            queue = asyncio.Queue(maxsize=concurrency * 2)
+            await asyncio.gather(
+                _read_user_ids(users_file, queue, concurrency, batch_size, state),
+                *(_badge_worker(client, queue, run) for _ in range(concurrency))
+            )
+
+    remove_checkpoint(checkpoint_file)
+    client.scheduler.save()
+    stats = {
+        "users": run["users"],
+        "requests": client.request_count,
+        "retries": client.retry_count,
+        "seconds": time.perf_counter() - start,
+    }
+    print(f"[{datetime.now()}] Tag-based badges written to: {tag_based_file}")
+    print(f"[{datetime.now()}] Named badges written to: {named_file}")
+    print(f"[{datetime.now()}] {stats['users']} users, {stats['requests']} requests "
+          f"({stats['retries']} retries) in {stats['seconds']:.1f} s")
+    return stats
+
+
+# Run the script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect user badges with concurrent requests.")
+    parser.add_argument("--users-file", default=f"{ROOT_DIR}/output/api/users.csv")
+    parser.add_argument("--output-dir", default=f"{ROOT_DIR}/output/api")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Requests kept in flight")
+    parser.add_argument("--base-url", default=BASE_URL, help="API root, e.g. a local stand-in server")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="User ids per request (max 100)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    asyncio.run(generate_badges_tables_async(args.users_file, args.output_dir, args.concurrency, args.base_url,
+                                             batch_size=args.batch_size, cache=cache_from_args(args)))
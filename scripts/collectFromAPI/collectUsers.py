@@ -1,9 +1,13 @@
 import os
 import csv
 import requests
-import time
+import argparse
 from datetime import datetime
-from itertools import cycle
+
+from apiFilters import REQUEST_HEADERS, get_filter
+from checkpoint import checkpoint_path, load_checkpoint, open_output, remove_checkpoint, save_checkpoint
+from keyScheduler import THROTTLE_VIOLATION, default_scheduler
+from responseCache import add_cache_arguments, cache_from_args
 
 # Base URL for the Stack Exchange API
 BASE_URL = "https://api.stackexchange.com/2.3"
@@ -14,133 +18,162 @@ ROOT_DIR = "../.."
 # Set the Stack Exchange site
 SITE = "genai.stackexchange.com"
 
-# List of API keys
-API_KEYS = ["rl_AcJgSUjNrKYeV8cR7CZX7jXKL",
-            "rl_dR5mDxPc3G6gLj5AQZofBsd6R",
-            "rl_o6qEBMddrQcJi5P8AjvD9oxkD",
-            "rl_WiALEvcddrpyt74t5as3uGzKJ",
-            "rl_6PzmZqnSX4VEZfUmJJnf9uihW",
-            "rl_xin44SwFnyccmjgQU4a9tT7xP",
-            "rl_uUxqzkvKeCMiT3JDtX8fJdvkr"]
-
-api_key_pool = cycle(API_KEYS)  # Rotate API keys
-
-# Function to fetch all users from genai.stackexchange.com
-def fetch_users(site=SITE, page_size=100):
-    users = []
-    page = 1
-    request_count = 0
-    max_requests_per_key = 10000 // len(API_KEYS)  # Distribute requests across keys
-    current_key = next(api_key_pool)
+USERS_HEADER = [
+    "user id", "user name", "gold badge count", "silver badge count", "bronze badge count",
+    "view_count", "down_vote_count", "up_vote_count", "answer_count", "question_count",
+    "account_id", "last_modified_date", "last_access_date", "reputation_change_year",
+    "reputation_change_quarter", "reputation_change_month", "reputation_change_week",
+    "reputation_change_day", "reputation", "creation_date", "user_type", "accept_rate",
+    "about_me", "location", "display_name", "age"
+]
+
+# Fields of the user objects read by user_row. view_count, up_vote_count, down_vote_count,
+# answer_count, question_count, about_me and age were never returned by the default filter,
+# so their columns have always held the defaults; they stay out (about_me is mostly HTML)
+USER_FIELDS = [
+    "user.user_id", "user.display_name", "user.badge_counts", "badge_count.gold", "badge_count.silver",
+    "badge_count.bronze", "user.account_id", "user.last_modified_date", "user.last_access_date",
+    "user.reputation_change_year", "user.reputation_change_quarter", "user.reputation_change_month",
+    "user.reputation_change_week", "user.reputation_change_day", "user.reputation", "user.creation_date",
+    "user.user_type", "user.accept_rate", "user.location"
+]
+
+# Function to fetch all users from genai.stackexchange.com, one page at a time
+def fetch_users(site=SITE, page_size=100, state=None, cache=None, scheduler=None):
+    """
+    Yield the users of each page as it arrives.
+
+    Args:
+        site (str): Stack Exchange site.
+        page_size (int): Users per page.
+        state (dict): Position to start from ("page", "request_count"), e.g. from a
+                      checkpoint. Updated in place before each page is yielded, so that it always
+                      describes the next request to send.
+        cache (ResponseCache): Optional response cache; cached pages are not requested again.
+        scheduler (KeyScheduler): Picks the API key and paces the requests. Defaults to the
+                                  shared scheduler.
+
+    Returns:
+        iterator: One list of user objects per page.
+    """
+    if state is None:
+        state = {}
+    state.setdefault("page", 1)
+    state.setdefault("request_count", 0)
+    scheduler = scheduler or default_scheduler()
+    users_filter = get_filter(USER_FIELDS, BASE_URL, offline=cache is not None and cache.offline)
 
     while True:
-        print(f"[{datetime.now()}] Sending request {request_count + 1} to fetch page {page} of users...")
-        response = requests.get(
-            f"{BASE_URL}/users",
-            params={
-                "site": site,
-                "pagesize": page_size,
-                "page": page,
-                "order": "desc",
-                "sort": "reputation",
-                "key": current_key
-            }
-        )
-        request_count += 1
-
-        # Handle rate limiting and backoff
-        if response.status_code == 429:  # Too many requests
-            print(f"[{datetime.now()}] Rate limit exceeded. Switching API key...")
-            current_key = next(api_key_pool)
-            time.sleep(1)  # Short delay before retrying
-            continue
-
-        data = response.json()
-
-        # Handle backoff
-        if "backoff" in data:
-            backoff_time = data["backoff"]
-            print(f"[{datetime.now()}] Backoff received. Waiting for {backoff_time} seconds...")
-            time.sleep(backoff_time)
+        page = state["page"]
+        params = {
+            "site": site,
+            "pagesize": page_size,
+            "page": page,
+            "order": "desc",
+            "sort": "reputation",
+            "filter": users_filter  # Only the fields written to the CSV
+        }
+        data = cache.get("/users", params) if cache else None
+        if data is None:
+            # The scheduler picks the key with the most quota left and waits out backoffs
+            current_key = scheduler.acquire()
+            print(f"[{datetime.now()}] Sending request {state['request_count'] + 1} to fetch page {page} of users...")
+            response = requests.get(f"{BASE_URL}/users", params={**params, "key": current_key},
+                                    headers=REQUEST_HEADERS)
+            state["request_count"] += 1
+
+            # Handle rate limiting; the next request goes out with another key
+            if response.status_code == 429:  # Too many requests
+                scheduler.throttled(current_key)
+                continue
+
+            data = response.json()
+            scheduler.record(current_key, data)
+            if "error_id" in data:
+                if data["error_id"] == THROTTLE_VIOLATION:
+                    continue
+                raise RuntimeError(f"Request for page {page} failed: {data.get('error_name')} {data.get('error_message')}")
+            if cache:
+                cache.put("/users", params, data)
 
         if "items" not in data or not data["items"]:
-            print(f"[{datetime.now()}] No more users to fetch. Total requests sent: {request_count}.")
-            break
+            print(f"[{datetime.now()}] No more users to fetch. Total requests sent: {state['request_count']}.")
+            return
 
-        users.extend(data["items"])
-        print(f"[{datetime.now()}] Fetched {len(data['items'])} users from page {page}. Total users so far: {len(users)}.")
+        state["page"] = page + 1
+        print(f"[{datetime.now()}] Fetched {len(data['items'])} users from page {page}.")
+        yield data["items"]
 
         if not data.get("has_more", False):
-            print(f"[{datetime.now()}] No more pages available. Total requests sent: {request_count}.")
-            break
-
-        # Rotate API key if max requests per key are reached
-        if request_count % max_requests_per_key == 0:
-            current_key = next(api_key_pool)
-            print(f"[{datetime.now()}] Switching to next API key...")
-
-        # Rate limiting: Stay below 25 requests per second
-        time.sleep(0.04)
-
-        page += 1
-
-    return users
+            print(f"[{datetime.now()}] No more pages available. Total requests sent: {state['request_count']}.")
+            return
+
+def user_row(user):
+    return [
+        user["user_id"],
+        user.get("display_name", "Unknown"),
+        user.get("badge_counts", {}).get("gold", 0),
+        user.get("badge_counts", {}).get("silver", 0),
+        user.get("badge_counts", {}).get("bronze", 0),
+        user.get("view_count", 0),
+        user.get("down_vote_count", 0),
+        user.get("up_vote_count", 0),
+        user.get("answer_count", 0),
+        user.get("question_count", 0),
+        user.get("account_id", "null"),
+        user.get("last_modified_date", "null"),
+        user.get("last_access_date", "null"),
+        user.get("reputation_change_year", 0),
+        user.get("reputation_change_quarter", 0),
+        user.get("reputation_change_month", 0),
+        user.get("reputation_change_week", 0),
+        user.get("reputation_change_day", 0),
+        user.get("reputation", 0),
+        user.get("creation_date", "null"),
+        user.get("user_type", "null"),
+        user.get("accept_rate", "null"),
+        user.get("about_me", "null"),
+        user.get("location", "null"),
+        user.get("display_name", "Unknown"),
+        user.get("age", "null")
+    ]
 
 # Function to generate a CSV table for users
-def generate_users_table(output_file):
+def generate_users_table(output_file, resume=True, cache=None):
+    """
+    Stream all users to a CSV file, one page at a time.
+
+    After every page the output size and the next page are saved to `<output_file>.checkpoint.json`.
+    If that file exists and `resume` is set, the run continues from it instead of starting over;
+    the checkpoint is removed once the last page is written. Pages found in `cache` are not
+    requested again.
+    """
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    checkpoint_file = checkpoint_path(output_file)
+    checkpoint = load_checkpoint(checkpoint_file) if resume else None
+    state = {key: value for key, value in checkpoint.items() if key != "offsets"} if checkpoint else {}
+    if checkpoint:
+        print(f"[{datetime.now()}] Resuming from page {state['page']} ({checkpoint_file}).")
 
     print(f"[{datetime.now()}] Starting to fetch users...")
-    users = fetch_users()
-    print(f"[{datetime.now()}] Finished fetching users. Total users fetched: {len(users)}.")
-
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csvfile:
+    user_count = 0
+    with open_output(output_file, USERS_HEADER, checkpoint) as csvfile:
         writer = csv.writer(csvfile)
-        # Write header row
-        writer.writerow([
-            "user id", "user name", "gold badge count", "silver badge count", "bronze badge count",
-            "view_count", "down_vote_count", "up_vote_count", "answer_count", "question_count",
-            "account_id", "last_modified_date", "last_access_date", "reputation_change_year",
-            "reputation_change_quarter", "reputation_change_month", "reputation_change_week",
-            "reputation_change_day", "reputation", "creation_date", "user_type", "accept_rate",
-            "about_me", "location", "display_name", "age"
-        ])
-        print(f"[{datetime.now()}] Header row written to CSV.")
-
-        for index, user in enumerate(users, start=1):
-            writer.writerow([
-                user["user_id"],
-                user.get("display_name", "Unknown"),
-                user.get("badge_counts", {}).get("gold", 0),
-                user.get("badge_counts", {}).get("silver", 0),
-                user.get("badge_counts", {}).get("bronze", 0),
-                user.get("view_count", 0),
-                user.get("down_vote_count", 0),
-                user.get("up_vote_count", 0),
-                user.get("answer_count", 0),
-                user.get("question_count", 0),
-                user.get("account_id", "null"),
-                user.get("last_modified_date", "null"),
-                user.get("last_access_date", "null"),
-                user.get("reputation_change_year", 0),
-                user.get("reputation_change_quarter", 0),
-                user.get("reputation_change_month", 0),
-                user.get("reputation_change_week", 0),
-                user.get("reputation_change_day", 0),
-                user.get("reputation", 0),
-                user.get("creation_date", "null"),
-                user.get("user_type", "null"),
-                user.get("accept_rate", "null"),
-                user.get("about_me", "null"),
-                user.get("location", "null"),
-                user.get("display_name", "Unknown"),
-                user.get("age", "null")
-            ])
-            if index % 10 == 0:  # Log progress every 10 users
-                print(f"[{datetime.now()}] Written {index} users to the CSV file.")
-
+        for users in fetch_users(state=state, cache=cache):
+            writer.writerows(user_row(user) for user in users)
+            user_count += len(users)
+            save_checkpoint(checkpoint_file, state, {output_file: csvfile})
+            print(f"[{datetime.now()}] Written {user_count} users to the CSV file.")
+
+    remove_checkpoint(checkpoint_file)
+    default_scheduler().save()
     print(f"[{datetime.now()}] User table generated successfully at '{output_file}'.")
 
 # Run the script
 if __name__ == "__main__":
-    generate_users_table(output_file=f"{ROOT_DIR}/output/api/users.csv")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Collect the users of a Stack Exchange site.")
+    parser.add_argument("--output-file", default=f"{ROOT_DIR}/output/api/users.csv")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    generate_users_table(output_file=args.output_file, cache=cache_from_args(args))
\ No newline at end of file
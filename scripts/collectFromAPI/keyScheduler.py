@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import time
+from datetime import datetime, timezone
+
+# Root directory
+ROOT_DIR = "../.."
+
+# List of API keys
+API_KEYS = ["rl_AcJgSUjNrKYeV8cR7CZX7jXKL",
+            "rl_dR5mDxPc3G6gLj5AQZofBsd6R",
+            "rl_o6qEBMddrQcJi5P8AjvD9oxkD",
+            "rl_WiALEvcddrpyt74t5as3uGzKJ",
+            "rl_6PzmZqnSX4VEZfUmJJnf9uihW",
+            "rl_xin44SwFnyccmjgQU4a9tT7xP",
+            "rl_uUxqzkvKeCMiT3JDtX8fJdvkr"]
+
+STATE_FILE = f"{ROOT_DIR}/output/api/key_state.json"
+
+# Daily quota of a key until the API reports it
+DEFAULT_QUOTA = 10000
+
+# The API rejects more than 30 requests per second from one client.
+# Stay below 25 requests per second, leaving room for network jitter
+MAX_REQUESTS_PER_SECOND = 30
+REQUESTS_PER_SECOND = 25
+
+# Requests the token bucket lets through back to back. Any one-second window then holds at
+# most BURST + REQUESTS_PER_SECOND - 1 requests
+BURST = 1
+
+# How long a key is rested after a 429 or a throttle_violation error
+THROTTLE_DELAY = 1
+
+# Longest wait for a key before giving up; the collectors can be resumed later
+MAX_WAIT = 15 * 60
+
+# The state file is rewritten every this many responses
+SAVE_EVERY = 100
+
+# error_id of a throttle violation (returned with HTTP 400)
+THROTTLE_VIOLATION = 502
+
+
+class QuotaExhausted(RuntimeError):
+    """
+    Raised when every key has used up its daily quota, or none is usable within MAX_WAIT.
+    """
+
+
+def check_rate(rate, burst=BURST):
+    """
+    Check that a token bucket of `rate` requests per second and `burst` capacity stays within
+    MAX_REQUESTS_PER_SECOND in any one-second window.
+
+    Raises:
+        ValueError: If it does not, or the rate is not positive.
+    """
+    if rate <= 0:
+        raise ValueError(f"The request rate must be positive, not {rate}")
+    if rate + burst - 1 > MAX_REQUESTS_PER_SECOND:
+        raise ValueError(f"A rate of {rate} requests per second with a burst of {burst} exceeds the API limit "
+                         f"of {MAX_REQUESTS_PER_SECOND} requests per second")
+
+
+def _today():
+    # Quotas reset at midnight UTC
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class KeyScheduler:
+    """
+    Hands out API keys to the collectors.
+
+    Each key's remaining quota and backoff deadline are taken from the responses sent with it
+    (`quota_remaining`, `quota_max`, `backoff`), and the key with the most quota left among
+    those not backing off is used next. All keys share a token bucket that keeps the request
+    rate under MAX_REQUESTS_PER_SECOND. The per-key state is saved to `state_file`, so a new
+    run neither reuses a key that is still backing off nor assumes a spent quota is full.
+
+    Args:
+        keys (list): API keys.
+        state_file (str): JSON file the per-key state is kept in. None to keep it in memory.
+        rate (float): Requests per second allowed across all keys.
+        burst (int): Capacity of the token bucket.
+
+    Raises:
+        ValueError: If the rate and burst could exceed MAX_REQUESTS_PER_SECOND (see check_rate).
+    """
+
+    def __init__(self, keys=API_KEYS, state_file=STATE_FILE, rate=REQUESTS_PER_SECOND, burst=BURST):
+        check_rate(rate, burst)
+        self.keys = list(keys)
+        self.state_file = state_file
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.unsaved = 0
+
+        saved = {}
+        if state_file and os.path.exists(state_file):
+            with open(state_file, mode="r", encoding="utf-8") as file:
+                saved = json.load(file)
+        self.state = {}
+        for key in self.keys:
+            self.state[key] = {"quota_max": DEFAULT_QUOTA, "quota_remaining": DEFAULT_QUOTA,
+                               "backoff_until": 0, "day": _today()}
+            self.state[key].update(saved.get(key, {}))
+
+    def _take_token(self):
+        """
+        Take one request from the token bucket.
+
+        Returns:
+            float: Seconds to wait before sending it. The bucket may go negative, so that
+                   concurrent callers are spaced out rather than all released at once.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def reserve(self):
+        """
+        Pick the key for the next request.
+
+        Returns:
+            tuple: (key, seconds to wait before sending the request with it).
+
+        Raises:
+            QuotaExhausted: If no key has quota left today or becomes usable within MAX_WAIT.
+        """
+        now = time.time()
+        today = _today()
+        for key_state in self.state.values():
+            if key_state["day"] != today:  # New quota day
+                key_state["day"] = today
+                key_state["quota_remaining"] = key_state["quota_max"]
+
+        usable = [key for key in self.keys if self.state[key]["quota_remaining"] > 0]
+        if not usable:
+            self.save()
+            raise QuotaExhausted(f"All {len(self.keys)} API keys have used up their daily quota")
+        ready = [key for key in usable if self.state[key]["backoff_until"] <= now]
+        if ready:
+            key = max(ready, key=lambda ready_key: self.state[ready_key]["quota_remaining"])
+            wait = 0
+        else:
+            key = min(usable, key=lambda usable_key: self.state[usable_key]["backoff_until"])
+            wait = self.state[key]["backoff_until"] - now
+            if wait > MAX_WAIT:
+                self.save()
+                raise QuotaExhausted(f"No API key is usable for another {wait:.0f} seconds")
+
+        # Count the request now, so that concurrent callers spread over the keys;
+        # the response's quota_remaining corrects it
+        self.state[key]["quota_remaining"] -= 1
+        return key, max(wait, self._take_token())
+
+    def acquire(self):
+        """
+        Blocking version of reserve() for the synchronous collectors.
+
+        Returns:
+            str: The key to send the next request with.
+        """
+        key, wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return key
+
+    def record(self, key, data):
+        """
+        Update a key's state from the body of a response sent with it.
+        """
+        key_state = self.state[key]
+        if "quota_max" in data:
+            key_state["quota_max"] = data["quota_max"]
+        if "quota_remaining" in data:
+            key_state["quota_remaining"] = data["quota_remaining"]
+        if data.get("error_id") == THROTTLE_VIOLATION:
+            # e.g. "too many requests from this IP, more requests available in 82626 seconds"
+            retry_after = re.search(r"available in (\d+) seconds", data.get("error_message") or "")
+            self.throttled(key, int(retry_after.group(1)) if retry_after else THROTTLE_DELAY)
+        if "backoff" in data:
+            print(f"[{datetime.now()}] Backoff received. Resting key ...{key[-4:]} for {data['backoff']} seconds...")
+            key_state["backoff_until"] = max(key_state["backoff_until"], time.time() + data["backoff"])
+
+        self.unsaved += 1
+        if self.unsaved >= SAVE_EVERY:
+            self.save()
+
+    def throttled(self, key, seconds=THROTTLE_DELAY):
+        """
+        Rest a key after a 429 (too many requests) response or a throttle violation.
+        """
+        print(f"[{datetime.now()}] Rate limit exceeded. Resting key ...{key[-4:]} for {seconds} seconds...")
+        self.state[key]["backoff_until"] = max(self.state[key]["backoff_until"], time.time() + seconds)
+
+    def save(self):
+        self.unsaved = 0
+        if not self.state_file:
+            return
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        temp_file = f"{self.state_file}.tmp"
+        with open(temp_file, mode="w", encoding="utf-8") as file:
+            json.dump(self.state, file, indent=4)
+        os.replace(temp_file, self.state_file)
+
+
+_default_scheduler = None
+
+
+def default_scheduler():
+    """
+    Returns:
+        KeyScheduler: The scheduler shared by all collectors in this process.
+    """
+    global _default_scheduler
+    if _default_scheduler is None:
+        _default_scheduler = KeyScheduler()
+    return _default_scheduler
@@ -0,0 +1,152 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+
+# Root directory
+ROOT_DIR = "../.."
+
+CACHE_DIR = f"{ROOT_DIR}/output/api/cache"
+
+# Responses older than this are refetched (seconds)
+DEFAULT_TTL = 24 * 60 * 60
+
+# Least recently used responses are evicted above this total size (bytes)
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Request parameters that identify the caller rather than the data
+IGNORED_PARAMS = ("key", "access_token")
+
+
+class CacheMiss(LookupError):
+    """
+    Raised in offline mode when a response is not in the cache.
+    """
+
+
+class ResponseCache:
+    """
+    Persistent cache of Stack Exchange API responses, one gzipped JSON file per request.
+
+    Entries are keyed by endpoint and normalized parameters, without the API key, so a
+    response fetched with one key is reused with any other.
+
+    Args:
+        cache_dir (str): Directory holding the cached responses.
+        ttl (float): Maximum age of a usable response in seconds. None never expires.
+        max_bytes (int): Size above which least recently used entries are evicted.
+        offline (bool): Never go to the network: serve cached responses regardless of age
+                        and raise CacheMiss for the rest.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._sizes = {}
+        if os.path.isdir(cache_dir):
+            for name in os.listdir(cache_dir):
+                if name.endswith(".json.gz"):
+                    self._sizes[name] = os.path.getsize(os.path.join(cache_dir, name))
+        self._total = sum(self._sizes.values())
+
+    @staticmethod
+    def key(endpoint, params):
+        """
+        Returns:
+            str: Cache key of a request, e.g. for ("/users", {"page": 2, "site": ..., "key": ...}).
+        """
+        normalized = sorted((name, str(value)) for name, value in params.items() if name not in IGNORED_PARAMS)
+        return hashlib.sha256(json.dumps([endpoint, normalized]).encode("utf-8")).hexdigest()
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def get(self, endpoint, params):
+        """
+        Returns:
+            dict: The cached response body, or None if it is missing or older than the TTL.
+        """
+        name = f"{self.key(endpoint, params)}.json.gz"
+        path = self._path(name)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if self.offline or self.ttl is None or age <= self.ttl:
+                with gzip.open(path, mode="rt", encoding="utf-8") as file:
+                    data = json.load(file)
+                os.utime(path, (time.time(), os.path.getmtime(path)))  # Mark as recently used
+                self.hits += 1
+                return data
+        except (OSError, ValueError):  # Missing, or partially written by an interrupted run
+            pass
+        self.misses += 1
+        if self.offline:
+            shown = {name: value for name, value in params.items() if name not in IGNORED_PARAMS}
+            raise CacheMiss(f"{endpoint} {shown} is not cached and the cache is in offline mode")
+        return None
+
+    def put(self, endpoint, params, data):
+        """
+        Store a successful response body. `backoff` is dropped, since it only applies to the
+        request that received it; error responses are not stored.
+        """
+        if "error_id" in data:
+            return
+        data = {field: value for field, value in data.items() if field != "backoff"}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        name = f"{self.key(endpoint, params)}.json.gz"
+        path = self._path(name)
+        temp_file = f"{path}.tmp"
+        with gzip.open(temp_file, mode="wt", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temp_file, path)
+
+        size = os.path.getsize(path)
+        self._total += size - self._sizes.get(name, 0)
+        self._sizes[name] = size
+        if self._total > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """
+        Delete least recently used entries until the cache is back under 90% of max_bytes.
+        """
+        last_used = {}
+        for name in self._sizes:
+            try:
+                last_used[name] = os.path.getatime(self._path(name))
+            except OSError:
+                last_used[name] = 0
+        for name in sorted(last_used, key=last_used.get):
+            if self._total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            self._total -= self._sizes.pop(name)
+
+
+def add_cache_arguments(parser):
+    """
+    Add the response cache options to a collector's argument parser.
+    """
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Directory of the response cache")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Refetch responses older than this (seconds)")
+    parser.add_argument("--max-cache-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Cache size before eviction")
+    parser.add_argument("--offline", action="store_true", help="Only use cached responses")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch from the API")
+
+
+def cache_from_args(args):
+    """
+    Returns:
+        ResponseCache: The cache configured on the command line, or None with --no-cache.
+    """
+    if args.no_cache:
+        return None
+    return ResponseCache(args.cache_dir, args.ttl, args.max_cache_bytes, args.offline)
@@ -0,0 +1,246 @@
+import os
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from dumpReader import iter_rows
+from userActivity import to_score
+
+# Integer stand-in for missing values (Ids and counts are never negative)
+NULL = -1
+# Missing timestamps load as NaT
+TIMESTAMP_NULL = np.iinfo(np.int64).min
+
+# Column types: array typecode used while streaming, numpy dtype once finished.
+# "timestamp" columns hold milliseconds since the epoch and load as datetime64[ms].
+COLUMN_TYPES = {
+    "int8": ("b", np.int8),
+    "int32": ("i", np.int32),
+    "int64": ("q", np.int64),
+    "float32": ("f", np.float32),
+    "bool": ("B", np.bool_),
+    "timestamp": ("q", "datetime64[ms]"),
+}
+
+OUTPUT_FORMATS = ("npz", "parquet")
+
+# Table schemas. Posts holds questions and answers, one row per post. Tag membership is only
+# stored for questions; an answer's tags are those of its ParentId.
+POSTS_COLUMNS = [
+    ("Id", "int32"),
+    ("PostTypeId", "int8"),
+    ("ParentId", "int32"),
+    ("AcceptedAnswerId", "int32"),
+    ("OwnerUserId", "int32"),
+    ("CreationDate", "timestamp"),
+    ("Score", "int32"),
+    ("ViewCount", "int32"),
+    ("AnswerCount", "int32"),
+    ("CommentCount", "int32"),
+    ("FavouriteCount", "int32"),
+    ("IsCommunityOwned", "bool"),
+]
+POST_TAGS_COLUMNS = [("PostId", "int32"), ("TagId", "int32")]
+COMMENTS_COLUMNS = [("Id", "int32"), ("PostId", "int32"), ("UserId", "int32"), ("CreationDate", "timestamp")]
+
+# Attributes read from Posts.xml; Tags is last and goes to the post_tags table
+POSTS_FIELDS = [name for name, _ in POSTS_COLUMNS[:-1]] + ["CommunityOwnedDate", "Tags"]
+COMMENTS_FIELDS = [name for name, _ in COMMENTS_COLUMNS]
+
+EPOCH = datetime(1970, 1, 1)
+MILLISECOND = timedelta(milliseconds=1)
+
+
+def to_int(value):
+    """
+    Convert an attribute value to an int, mapping missing values to NULL.
+    """
+    return NULL if value is None or value == "" else int(value)
+
+
+def to_timestamp(value):
+    """
+    Convert a dump date (e.g. "2008-09-15T08:55:03.923", UTC) to milliseconds since the epoch.
+    """
+    if not value:
+        return TIMESTAMP_NULL
+    return (datetime.fromisoformat(value) - EPOCH) // MILLISECOND
+
+
+class ColumnTable:
+    """
+    Append-only table of typed columns, backed by compact arrays while it is being built.
+
+    Args:
+        columns (list): (name, type) pairs, where type is a key of COLUMN_TYPES.
+    """
+
+    def __init__(self, columns):
+        self.types = dict(columns)
+        self.columns = {name: array(COLUMN_TYPES[kind][0]) for name, kind in columns}
+        self._appenders = [column.append for column in self.columns.values()]
+
+    def append(self, *values):
+        for append, value in zip(self._appenders, values):
+            append(value)
+
+    def to_arrays(self):
+        """
+        Returns:
+            dict: Column name -> numpy array.
+        """
+        arrays = {}
+        for name, column in self.columns.items():
+            typecode, dtype = COLUMN_TYPES[self.types[name]]
+            arrays[name] = np.array(column, dtype=np.dtype(typecode)).astype(dtype, copy=False)
+        return arrays
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise RuntimeError("The parquet output format requires pyarrow (pip install pyarrow)") from error
+    return pyarrow
+
+
+def save_table(arrays, path, output_format="npz"):
+    """
+    Write a table of numpy columns to disk.
+
+    Args:
+        arrays (dict): Column name -> numpy array, all of the same length.
+        path (str): Output path without extension.
+        output_format (str): "npz" (compressed NumPy archive, one member per column)
+                             or "parquet" (requires pyarrow).
+
+    Returns:
+        str: The path of the written file.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+    output_path = f"{path}.{output_format}"
+    if output_format == "npz":
+        np.savez_compressed(output_path, **arrays)
+    else:
+        pyarrow = _import_pyarrow()
+        table = pyarrow.table({name: pyarrow.array(values) for name, values in arrays.items()})
+        pyarrow.parquet.write_table(table, output_path, compression="zstd")
+    return output_path
+
+
+def load_table(path, columns=None):
+    """
+    Load a table written by save_table, reading only the requested columns.
+
+    Args:
+        path (str): Path to a .npz or .parquet file.
+        columns (list): Column names to load. All columns if None.
+
+    Returns:
+        dict: Column name -> numpy array.
+    """
+    if path.endswith(".parquet"):
+        pyarrow = _import_pyarrow()
+        table = pyarrow.parquet.read_table(path, columns=columns)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    with np.load(path) as archive:
+        return {name: archive[name] for name in (columns or archive.files)}
+
+
+def generate_columnar_tables(posts_file_path, comments_file_path, output_dir, output_format="npz", activity=None):
+    """
+    Build typed, dictionary-encoded dump tables in one pass over Posts.xml and one over Comments.xml.
+
+    Writes four tables to `output_dir`:
+        posts:     one row per question/answer with integer and timestamp columns
+                   (missing values are NULL = -1) and an IsAcceptedAnswer flag.
+        post_tags: (PostId, TagId) int32 pairs, one per tag of each question.
+        comments:  one row per comment.
+        tags:      the tag dictionary; TagId is the row number in TagName.
+
+    Args:
+        posts_file_path (str): Path to the Posts.xml file, the site's .7z archive, or "-" for stdin.
+        comments_file_path (str): Path to the Comments.xml file, the site's .7z archive, or "-" for stdin.
+        output_dir (str): Directory to write the tables to.
+        output_format (str): "npz" or "parquet".
+        activity (UserActivity): Optional counters to add every question, answer and comment to.
+
+    Returns:
+        list: Paths of the written tables.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    posts = ColumnTable(POSTS_COLUMNS)
+    post_tags = ColumnTable(POST_TAGS_COLUMNS)
+    comments = ColumnTable(COMMENTS_COLUMNS)
+    tag_ids = {}
+
+    for values in iter_rows(posts_file_path, POSTS_FIELDS, member="Posts.xml"):
+        post_type = values[1]
+        if post_type != "1" and post_type != "2":
+            continue
+        (post_id, _, parent_id, accepted_answer_id, owner_user_id, creation_date, score, view_count,
+         answer_count, comment_count, favourite_count, community_owned_date, tags) = values
+        post_id = int(post_id)
+        posts.append(
+            post_id,
+            int(post_type),
+            to_int(parent_id),
+            to_int(accepted_answer_id),
+            to_int(owner_user_id),
+            to_timestamp(creation_date),
+            to_int(score),
+            to_int(view_count),
+            to_int(answer_count),
+            to_int(comment_count),
+            to_int(favourite_count),
+            community_owned_date is not None
+        )
+        if post_type == "1" and tags:
+            for tag in tags.strip("|").split("|"):
+                tag_id = tag_ids.setdefault(tag, len(tag_ids))
+                post_tags.append(post_id, tag_id)
+        if activity is not None:
+            if post_type == "1":
+                activity.add_question(to_int(owner_user_id), to_score(score))
+            else:
+                activity.add_answer(post_id, to_int(owner_user_id), to_score(score))
+
+    for comment_id, post_id, user_id, creation_date in iter_rows(comments_file_path, COMMENTS_FIELDS,
+                                                                 member="Comments.xml"):
+        comments.append(int(comment_id), int(post_id), to_int(user_id), to_timestamp(creation_date))
+        if activity is not None:
+            activity.add_comment(to_int(user_id))
+
+    posts_arrays = posts.to_arrays()
+    accepted = posts_arrays["AcceptedAnswerId"]
+    posts_arrays["IsAcceptedAnswer"] = (posts_arrays["PostTypeId"] == 2) & np.isin(
+        posts_arrays["Id"], accepted[accepted != NULL])
+    if activity is not None:
+        activity.count_accepted(accepted[accepted != NULL])
+
+    tables = {
+        "posts": posts_arrays,
+        "post_tags": post_tags.to_arrays(),
+        "comments": comments.to_arrays(),
+        "tags": {"TagName": np.array(list(tag_ids), dtype=str)},
+    }
+    return [save_table(arrays, os.path.join(output_dir, name), output_format) for name, arrays in tables.items()]
+
+
+def high_water_mark(path):
+    """
+    The largest Id and CreationDate of a posts or comments table, in the layout of the
+    high-water marks users.tables.py keeps in state.json.
+
+    Returns:
+        dict: {"max_id": int, "max_creation_date": str like "2008-09-15T08:55:03.923", or None}.
+    """
+    table = load_table(path, ["Id", "CreationDate"])
+    dates = table["CreationDate"][~np.isnat(table["CreationDate"])]
+    return {
+        "max_id": int(table["Id"].max()) if len(table["Id"]) else 0,
+        "max_creation_date": str(np.datetime_as_string(dates.max(), unit="ms")) if len(dates) else None,
+    }
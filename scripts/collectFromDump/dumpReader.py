@@ -0,0 +1,208 @@
+import html
+import os
+import shutil
+import subprocess
+import sys
+import xml.parsers.expat
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain
+
+# Size of the blocks fed to the expat parser
+CHUNK_SIZE = 1 << 20
+
+BACKENDS = ("auto", "scan", "expat")
+
+# Command line 7-Zip executables, in order of preference
+SEVEN_ZIP_COMMANDS = ("7z", "7za", "7zr")
+
+
+def is_plain_file(source):
+    """
+    Whether a dump source is a regular file that can be seeked, i.e. not a .7z archive or stdin.
+    """
+    return source != "-" and not source.endswith(".7z")
+
+
+@contextmanager
+def open_dump(source, member=None):
+    """
+    Open a dump file for binary reading.
+
+    Args:
+        source (str): Path to an extracted XML file, path to a .7z archive, or "-" for an
+                      already-decompressed stream on stdin.
+        member (str): File to read from the archive (e.g. "Posts.xml"). Only used for archives.
+
+    Returns:
+        file: A binary file object. Archive members are decompressed on the fly by 7-Zip,
+              so nothing is extracted to disk.
+    """
+    if source == "-":
+        yield sys.stdin.buffer
+        return
+
+    if is_plain_file(source):
+        with open(source, mode="rb") as file:
+            yield file
+        return
+
+    if member is None:
+        raise ValueError(f"A member name (e.g. 'Posts.xml') is required to read from {source}")
+    command = next((shutil.which(name) for name in SEVEN_ZIP_COMMANDS if shutil.which(name)), None)
+    if command is None:
+        raise RuntimeError(f"Reading {source} requires 7-Zip ({', '.join(SEVEN_ZIP_COMMANDS)}) on the PATH")
+
+    process = subprocess.Popen([command, "e", "-so", source, member], stdout=subprocess.PIPE)
+    try:
+        yield process.stdout
+    except BaseException as error:
+        # A parse error on truncated output is usually 7-Zip failing; report that instead
+        try:
+            return_code = process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            return_code = None
+        if return_code:
+            raise RuntimeError(f"7-Zip failed with exit code {return_code} while reading {member} from {source}") \
+                from error
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        return_code = process.wait()
+    if return_code != 0:
+        raise RuntimeError(f"7-Zip failed with exit code {return_code} while reading {member} from {source}")
+
+
+def split_ranges(file_path, parts):
+    """
+    Split a one-row-per-line dump file into byte ranges that start and end on line boundaries.
+
+    Args:
+        file_path (str): Path to the dump file.
+        parts (int): Number of ranges to aim for. Fewer are returned for small files.
+
+    Returns:
+        list: (start, end) byte offsets in file order, covering the whole file.
+    """
+    size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, mode="rb") as file:
+        for part in range(1, parts):
+            file.seek(max(size * part // parts, boundaries[-1]))
+            file.readline()  # Move to the start of the next line
+            position = file.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _range_lines(file_path, byte_range):
+    """
+    Yield the lines of a file that start inside a byte range.
+    """
+    position, end = byte_range
+    with open(file_path, mode="rb") as file:
+        file.seek(position)
+        for line in file:
+            if position >= end:
+                break
+            position += len(line)
+            yield line
+
+
+def _scan_rows(lines, fields):
+    """
+    Line-oriented scanner for dumps written with one <row .../> element per line.
+
+    Escaped attribute values never contain a raw quote, so splitting the line on '" '
+    yields exactly one piece per attribute. Only the requested values are decoded;
+    large Body/Text values are never decoded or unescaped.
+    """
+    keys = [field.encode("ascii") for field in fields]
+    for line in lines:
+        start = line.find(b"<row ")
+        if start < 0:
+            continue
+        attrs = dict(piece.split(b'="', 1) for piece in line[start + 5:line.rindex(b'"')].split(b'" '))
+        values = []
+        for key in keys:
+            value = attrs.get(key)
+            if value is not None:
+                value = value.decode("utf-8")
+                if "&" in value:
+                    value = html.unescape(value)
+            values.append(value)
+        yield tuple(values)
+
+
+def _expat_rows(chunks, fields):
+    """
+    Callback-based parser for arbitrary XML layout. No element tree is built, so memory
+    stays flat regardless of file size.
+    """
+    batch = []
+
+    def start_element(name, attrs):
+        if name == "row":
+            batch.append(tuple(attrs.get(field) for field in fields))
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    for chunk in chunks:
+        parser.Parse(chunk, False)
+        yield from batch
+        batch.clear()
+    parser.Parse(b"", True)
+    yield from batch
+
+
+def _stream_rows(source, fields, backend, member):
+    with open_dump(source, member) as file:
+        # Read up to the first row to pick the backend; those lines are replayed below
+        head = []
+        if backend == "auto":
+            backend = "expat"
+            for line in file:
+                head.append(line)
+                stripped = line.strip()
+                if stripped.startswith(b"<row"):
+                    backend = "scan" if stripped.endswith(b"/>") else "expat"
+                    break
+
+        if backend == "scan":
+            yield from _scan_rows(chain(head, file), fields)
+        else:
+            yield from _expat_rows(chain(head, iter(partial(file.read, CHUNK_SIZE), b"")), fields)
+
+
+def iter_rows(source, fields, backend="auto", byte_range=None, member=None):
+    """
+    Stream the <row> elements of a Stack Exchange dump file, yielding only the requested attributes.
+
+    Args:
+        source (str): Path to the dump file (e.g. Posts.xml, Comments.xml), path to the site's
+                      .7z archive, or "-" to read an already-decompressed file from stdin.
+        fields (list): Attribute names to extract, e.g. ["Id", "PostTypeId", "Tags"].
+        backend (str): "scan" for the line-oriented scanner, "expat" for the callback parser,
+                       or "auto" to use the scanner whenever the file is one row per line.
+        byte_range (tuple): Optional (start, end) offsets from split_ranges. Only rows whose
+                            line starts inside the range are returned. Requires the scanner
+                            and an extracted file.
+        member (str): File to read when `source` is a .7z archive, e.g. "Posts.xml".
+
+    Returns:
+        iterator: One tuple per row with the attribute values in the order of `fields`.
+                  Missing attributes are None.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if byte_range is not None:
+        if backend == "expat" or not is_plain_file(source):
+            raise ValueError("byte_range requires an extracted one-row-per-line dump and the 'scan' backend")
+        return _scan_rows(_range_lines(source, byte_range), fields)
+    return _stream_rows(source, fields, backend, member)
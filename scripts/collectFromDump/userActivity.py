@@ -0,0 +1,235 @@
+import csv
+import os
+from array import array
+
+from dumpReader import iter_rows
+
+# Stand-in for a missing user, as in dumpColumnar
+NULL = -1
+
+# Badges.xml Class -> column of UserActivity.badge_counts
+BADGE_CLASSES = {"1": 0, "2": 1, "3": 2}
+
+# Attributes read from Users.xml
+USERS_FIELDS = ["Id", "AccountId", "Reputation", "CreationDate", "LastAccessDate", "Views", "UpVotes", "DownVotes"]
+
+# Behavioral table schema, typed as in dumpColumnar. The score lists of a user are reduced to
+# their mean; the counts next to them give the sums back.
+USERS_COLUMNS = [
+    ("UserId", "int32"),
+    ("AccountId", "int32"),
+    ("Reputation", "int32"),
+    ("CreationDate", "timestamp"),
+    ("LastAccessDate", "timestamp"),
+    ("Views", "int32"),
+    ("UpVotes", "int32"),
+    ("DownVotes", "int32"),
+    ("GoldBadges", "int32"),
+    ("SilverBadges", "int32"),
+    ("BronzeBadges", "int32"),
+    ("QuestionCount", "int32"),
+    ("AnswerCount", "int32"),
+    ("AcceptedAnswerCount", "int32"),
+    ("AnswerAcceptanceRatio", "float32"),
+    ("CommentCount", "int32"),
+    ("QuestionScoreMean", "float32"),
+    ("AnswerScoreMean", "float32"),
+]
+USERS_HEADER = [name for name, _ in USERS_COLUMNS]
+
+# Columns the user vectors are built from (indexing/createIndex.py USERS_TABLE_COLUMNS)
+BEHAVIORAL_HEADER = ["Reputation", "GoldBadges", "SilverBadges", "BronzeBadges", "AcceptedAnswerCount", "AnswerCount",
+                     "AnswerAcceptanceRatio", "CommentCount", "QuestionScoreMean", "AnswerScoreMean"]
+
+
+def to_id(value):
+    """
+    Convert a user or post Id attribute to an int, mapping missing values to NULL.
+    """
+    return int(value) if value else NULL
+
+
+def to_score(value):
+    """
+    Convert a Score attribute to an int. Posts without one count as 0 in the score means.
+    """
+    return int(value) if value else 0
+
+
+def _zeros(typecode, length):
+    return array(typecode, bytes(length * array(typecode).itemsize))
+
+
+class UserActivity:
+    """
+    Per-user counters gathered while the questions, answers and comments tables are built,
+    so the behavioral table needs no extra pass over Posts.xml or Comments.xml.
+
+    User and post Ids are dense integers, so counters are flat arrays indexed by Id, as in
+    PostTagIndex. Rows without a user (deleted owners) and the Community user (Id -1) are
+    not counted.
+    """
+
+    def __init__(self):
+        self.question_counts = array("i")
+        self.question_score_sums = array("q")
+        self.answer_counts = array("i")
+        self.answer_score_sums = array("q")
+        self.accepted_counts = array("i")
+        self.comment_counts = array("i")
+        self.badge_counts = [array("i"), array("i"), array("i")]  # gold, silver, bronze
+        self.answer_owners = array("i")  # Owner of each answer, by answer Id
+
+    def _grow(self, user_id):
+        missing = user_id + 1 - len(self.question_counts)
+        if missing > 0:
+            for counts in (self.question_counts, self.answer_counts, self.accepted_counts, self.comment_counts,
+                           *self.badge_counts):
+                counts.extend(_zeros("i", missing))
+            self.question_score_sums.extend(_zeros("q", missing))
+            self.answer_score_sums.extend(_zeros("q", missing))
+
+    def add_question(self, user_id, score):
+        """
+        Args:
+            user_id (int): OwnerUserId of the question, or NULL.
+            score (int): Score of the question.
+        """
+        if user_id < 0:
+            return
+        self._grow(user_id)
+        self.question_counts[user_id] += 1
+        self.question_score_sums[user_id] += score
+
+    def add_answer(self, answer_id, user_id, score):
+        """
+        Args:
+            answer_id (int): Id of the answer.
+            user_id (int): OwnerUserId of the answer, or NULL.
+            score (int): Score of the answer.
+        """
+        if user_id < 0:
+            return
+        self._grow(user_id)
+        self.answer_counts[user_id] += 1
+        self.answer_score_sums[user_id] += score
+        missing = answer_id + 1 - len(self.answer_owners)
+        if missing > 0:
+            self.answer_owners.extend(array("i", [NULL]) * missing)
+        self.answer_owners[answer_id] = user_id
+
+    def add_comment(self, user_id):
+        if user_id < 0:
+            return
+        self._grow(user_id)
+        self.comment_counts[user_id] += 1
+
+    def add_badge(self, user_id, badge_class):
+        """
+        Args:
+            user_id (int): UserId of the award.
+            badge_class (str): Class attribute of Badges.xml ("1" gold, "2" silver, "3" bronze).
+        """
+        column = BADGE_CLASSES.get(badge_class)
+        if user_id < 0 or column is None:
+            return
+        self._grow(user_id)
+        self.badge_counts[column][user_id] += 1
+
+    def count_accepted(self, accepted_answer_ids):
+        """
+        Credit accepted answers to their owners. Called once all answers have been added, since
+        a question can be read before or after its accepted answer.
+
+        Args:
+            accepted_answer_ids (iterable): AcceptedAnswerId of every question.
+        """
+        owners = self.answer_owners
+        for answer_id in accepted_answer_ids:
+            answer_id = int(answer_id)
+            if answer_id < len(owners) and owners[answer_id] >= 0:
+                self.accepted_counts[owners[answer_id]] += 1
+
+    def features(self, user_id):
+        """
+        Returns:
+            tuple: The activity columns of USERS_COLUMNS (from GoldBadges on) for a user.
+        """
+        if not 0 <= user_id < len(self.question_counts):
+            return 0, 0, 0, 0, 0, 0, 0.0, 0, 0.0, 0.0
+        questions = self.question_counts[user_id]
+        answers = self.answer_counts[user_id]
+        accepted = self.accepted_counts[user_id]
+        return (
+            self.badge_counts[0][user_id],
+            self.badge_counts[1][user_id],
+            self.badge_counts[2][user_id],
+            questions,
+            answers,
+            accepted,
+            accepted / answers if answers else 0.0,
+            self.comment_counts[user_id],
+            self.question_score_sums[user_id] / questions if questions else 0.0,
+            self.answer_score_sums[user_id] / answers if answers else 0.0,
+        )
+
+
+def count_badges(badges_file_path, activity):
+    """
+    Add the gold, silver and bronze award counts of Badges.xml to the activity counters.
+
+    Args:
+        badges_file_path (str): Path to the Badges.xml file, the site's .7z archive, or "-" for stdin.
+        activity (UserActivity): Counters to update.
+    """
+    for user_id, badge_class in iter_rows(badges_file_path, ["UserId", "Class"], member="Badges.xml"):
+        activity.add_badge(to_id(user_id), badge_class)
+
+
+def generate_users_table(users_file_path, activity, output_dir, output_format="csv", badges_file_path=None):
+    """
+    Stream Users.xml and join every user with their activity counters into the behavioral table
+    read by indexing/createIndex.py.
+
+    Args:
+        users_file_path (str): Path to the Users.xml file, the site's .7z archive, or "-" for stdin.
+        activity (UserActivity): Counters filled by the questions, answers and comments passes.
+        output_dir (str): Directory to write the table to.
+        output_format (str): "csv" for users.table.csv, or "npz"/"parquet" for a typed
+                             dumpColumnar table (`users.npz`, `users.parquet`).
+        badges_file_path (str): Badges.xml to count the badges of each user from. The badge
+                                columns are 0 if not given.
+
+    Returns:
+        str: The path of the written table.
+    """
+    if badges_file_path is not None:
+        count_badges(badges_file_path, activity)
+
+    rows = iter_rows(users_file_path, USERS_FIELDS, member="Users.xml")
+
+    if output_format == "csv":
+        output_path = os.path.join(output_dir, "users.table.csv")
+        with open(output_path, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(USERS_HEADER)
+            for values in rows:
+                user_id = to_id(values[0])
+                if user_id <= 0:
+                    continue
+                *counts, ratio, comment_count, question_score, answer_score = activity.features(user_id)
+                writer.writerow([value or "null" for value in values] + counts + [
+                    round(ratio, 4), comment_count, round(question_score, 4), round(answer_score, 4)])
+        return output_path
+
+    # Columnar output needs numpy, so it is only imported on demand
+    from dumpColumnar import ColumnTable, save_table, to_int, to_timestamp
+    table = ColumnTable(USERS_COLUMNS)
+    for user_id, account_id, reputation, creation_date, last_access_date, views, up_votes, down_votes in rows:
+        user_id = to_id(user_id)
+        if user_id <= 0:
+            continue
+        table.append(user_id, to_int(account_id), to_int(reputation), to_timestamp(creation_date),
+                     to_timestamp(last_access_date), to_int(views), to_int(up_votes), to_int(down_votes),
+                     *activity.features(user_id))
+    return save_table(table.to_arrays(), os.path.join(output_dir, "users"), output_format)
@@ -1,5 +1,8 @@
-import xml.etree.ElementTree as ET
 import csv
+import sys
+
+from dumpReader import iter_rows
+from postIndex import PostTagIndex
 
 # Root Directory
 ROOT_DIR = "../.."
@@ -9,14 +12,14 @@ def generate_answers_table(file_path, output_csv):
     Generate a table for answers provided by users, with one row for each tag associated with a question.
 
     Args:
-        file_path (str): Path to the large XML file (Posts.xml).
+        file_path (str): Path to the large XML file (Posts.xml), the site's .7z archive, or "-" for stdin.
         output_csv (str): Path to output the CSV file.
 
     Returns:
         None
     """
-    # Dictionary to store question tags
-    question_tags = {}
+    # Compact index of question tags
+    question_tags = PostTagIndex()
 
     # Open the output CSV file
     with open(output_csv, mode="w", newline="", encoding="utf-8") as file:
@@ -36,56 +39,47 @@ def generate_answers_table(file_path, output_csv):
             "FavouriteCount"
         ])
 
-        # Use iterparse for efficient XML processing
-        context = ET.iterparse(file_path, events=("start", "end"))
-        for event, elem in context:
-            if event == "end" and elem.tag == "row":  # Process only <row> elements
-                post_type = elem.get("PostTypeId")
-
-                if post_type == "1":  # Question
-                    question_id = elem.get("Id")
-                    tags = elem.get("Tags", "")
-                    question_tags[question_id] = tags.strip('|').split('|')
-
-                elif post_type == "2":  # Answer
-                    # Extract necessary fields
-                    answer_id = elem.get("Id")
-                    owner_user_id = elem.get("OwnerUserId")
-                    parent_id = elem.get("ParentId")
-                    is_accepted = parent_id and elem.get("Id") == elem.get("AcceptedAnswerId")
-                    creation_date = elem.get("CreationDate")
-                    score = elem.get("Score")
-                    view_count = elem.get("ViewCount", "null")
-                    community_owned_date = elem.get("CommunityOwnedDate")
-                    is_community_owned = "true" if community_owned_date else "false"
-                    comment_count = elem.get("CommentCount", "null")
-                    favourite_count = elem.get("FavouriteCount", "null")
+        # Stream only the attributes needed for the table
+        fields = ["PostTypeId", "Id", "Tags", "OwnerUserId", "ParentId", "AcceptedAnswerId", "CreationDate",
+                  "Score", "ViewCount", "CommunityOwnedDate", "CommentCount", "FavouriteCount"]
+        for (post_type, post_id, tags, owner_user_id, parent_id, accepted_answer_id, creation_date, score,
+             view_count, community_owned_date, comment_count, favourite_count) in iter_rows(file_path, fields, member="Posts.xml"):
+            if post_type == "1":  # Question
+                question_tags.add_question(int(post_id), (tags or "").strip('|').split('|'))
 
-                    # Retrieve parent question's tags
-                    tags_for_answer = question_tags.get(parent_id, [])
+            elif post_type == "2":  # Answer
+                # Extract necessary fields
+                answer_id = post_id
+                is_accepted = parent_id and answer_id == accepted_answer_id
+                view_count = view_count or "null"
+                is_community_owned = "true" if community_owned_date else "false"
+                comment_count = comment_count or "null"
+                favourite_count = favourite_count or "null"
 
-                    # Write a row for each tag associated with the answer
-                    for tag in tags_for_answer:
-                        writer.writerow([
-                            owner_user_id,
-                            answer_id,
-                            parent_id,
-                            "true" if is_accepted else "false",
-                            creation_date,
-                            score,
-                            view_count,
-                            is_community_owned,
-                            tag,
-                            comment_count,
-                            favourite_count
-                        ])
+                # Retrieve parent question's tags
+                tags_for_answer = question_tags.question_tag_ids(int(parent_id))
 
-                # Clear element from memory to reduce memory usage
-                elem.clear()
+                # Write a row for each tag associated with the answer
+                for tag_id in tags_for_answer:
+                    tag = question_tags.tag_names[tag_id]
+                    writer.writerow([
+                        owner_user_id,
+                        answer_id,
+                        parent_id,
+                        "true" if is_accepted else "false",
+                        creation_date,
+                        score,
+                        view_count,
+                        is_community_owned,
+                        tag,
+                        comment_count,
+                        favourite_count
+                    ])
 
 
 # File paths
-input_file = f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml"  # Replace with actual file path
+# Posts.xml, the site's .7z archive, or "-" for stdin
+input_file = sys.argv[1] if len(sys.argv) > 1 else f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml"
 output_file = f"{ROOT_DIR}/output/dump/users.answers.table.csv"
 
 # Generate the answers table
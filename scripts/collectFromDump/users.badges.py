@@ -0,0 +1,96 @@
+import os
+import csv
+import argparse
+from datetime import datetime, timezone
+
+from dumpReader import iter_rows
+
+# Root Directory
+ROOT_DIR = "../.."
+
+# Badges.xml Class -> badge rank, as named by the API
+BADGE_RANKS = {"1": "gold", "2": "silver", "3": "bronze"}
+RANK_ORDER = {"gold": 0, "silver": 1, "bronze": 2}
+
+# Same layout as the tables written by collectFromAPI/collectBadges.py
+BADGES_HEADER = ["user id", "badge name", "badge rank", "award count", "creation date"]
+
+
+def to_epoch(date):
+    """
+    Convert a dump date (e.g. "2008-09-15T08:55:03.923", UTC) to Unix seconds, as the API reports dates.
+    """
+    return int(datetime.fromisoformat(date).replace(tzinfo=timezone.utc).timestamp())
+
+
+def aggregate_badges(badges_file_path):
+    """
+    Count the awards of every badge per user. Badges.xml has one row per award, while the API
+    reports one entry per user, badge and rank with an award count.
+
+    Args:
+        badges_file_path (str): Path to the Badges.xml file, the site's .7z archive, or "-" for stdin.
+
+    Returns:
+        dict: (user id, badge name, rank, tag based) -> [award count, first award date].
+    """
+    badges = {}
+    fields = ["UserId", "Name", "Class", "TagBased", "Date"]
+    for user_id, name, badge_class, tag_based, date in iter_rows(badges_file_path, fields, member="Badges.xml"):
+        if not user_id or not name:
+            continue
+        key = (int(user_id), name, BADGE_RANKS.get(badge_class, "null"), tag_based == "True")
+        badge = badges.get(key)
+        if badge is None:
+            badges[key] = [1, date]
+        else:
+            badge[0] += 1
+            if date and (badge[1] is None or date < badge[1]):  # ISO dates compare as strings
+                badge[1] = date
+    return badges
+
+
+def generate_badges_tables(badges_file_path, output_dir):
+    """
+    Build tag_based_badges.csv and named_badges.csv from Badges.xml in a single pass.
+
+    Rows are ordered by user id, then gold, silver and bronze. The creation date column holds
+    the first award of the badge in Unix seconds.
+
+    Args:
+        badges_file_path (str): Path to the Badges.xml file, the site's .7z archive, or "-" for stdin.
+        output_dir (str): Directory to write the two tables to.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    badges = aggregate_badges(badges_file_path)
+
+    tag_based_file = os.path.join(output_dir, "tag_based_badges.csv")
+    named_file = os.path.join(output_dir, "named_badges.csv")
+    with open(tag_based_file, mode="w", newline="", encoding="utf-8") as tag_csv, \
+            open(named_file, mode="w", newline="", encoding="utf-8") as named_csv:
+        tag_writer = csv.writer(tag_csv)
+        named_writer = csv.writer(named_csv)
+        tag_writer.writerow(BADGES_HEADER)
+        named_writer.writerow(BADGES_HEADER)
+
+        for key in sorted(badges, key=lambda key: (key[0], RANK_ORDER.get(key[2], 3), key[1])):
+            user_id, name, rank, tag_based = key
+            award_count, first_award = badges[key]
+            row = [user_id, name, rank, award_count, to_epoch(first_award) if first_award else "null"]
+            if tag_based:
+                tag_writer.writerow(row)
+            else:
+                named_writer.writerow(row)
+
+    print(f"Tag-based badges written to: {tag_based_file}")
+    print(f"Named badges written to: {named_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build tag_based_badges.csv and named_badges.csv from Badges.xml.")
+    parser.add_argument("badges", nargs="?", default=f"{ROOT_DIR}/data/genai.stackexchange.com/Badges.xml",
+                        help="Badges.xml, the site's .7z archive, or - for stdin")
+    parser.add_argument("--output-dir", default=f"{ROOT_DIR}/output/dump")
+    args = parser.parse_args()
+
+    generate_badges_tables(args.badges, args.output_dir)
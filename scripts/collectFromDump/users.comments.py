@@ -1,5 +1,8 @@
-import xml.etree.ElementTree as ET
 import csv
+import sys
+
+from dumpReader import iter_rows
+from postIndex import ANSWER, QUESTION, PostTagIndex
 
 # Root Directory
 ROOT_DIR = "../.."
@@ -9,65 +12,25 @@ def extract_post_data(posts_file_path):
     Extract post information including Tags and PostTypeId, resolving both for questions and answers.
 
     Args:
-        posts_file_path (str): Path to the Posts.xml file.
+        posts_file_path (str): Path to the Posts.xml file, the site's .7z archive, or "-" for stdin.
 
     Returns:
-        dict: Mapping of PostId to a dictionary with Tags and PostTypeId.
-              For example: { "101": {"tags": "neural-networks, deep-learning", "postTypeId": "1"} }
+        PostTagIndex: Tags of every question and PostTypeId of every question and answer.
+                      An answer's tags are resolved through its parent question at lookup
+                      time, so a single pass is enough.
     """
-    question_tags = {}  # Store tags for questions
-    post_mapping = {}  # Final mapping of PostId to its Tags and PostTypeId
-
-    # Helper function to clean and parse Tags
-    def clean_tags(raw_tags):
-        """
-        Cleans and parses the raw Tags string into a human-readable format.
-
-        Args:
-            raw_tags (str): Raw Tags string from Posts.xml (e.g., "|tag1|tag2|tag3|").
-
-        Returns:
-            str: Comma-separated list of tags (e.g., "tag1, tag2, tag3").
-        """
-        if not raw_tags:
-            return "null"
-        # Remove leading and trailing | and split by |
-        return ", ".join(raw_tags.strip("|").split("|"))
-
-    # First Pass: Collect all question tags
-    context = ET.iterparse(posts_file_path, events=("start", "end"))
-    for event, elem in context:
-        if event == "end" and elem.tag == "row":
-            post_id = elem.get("Id")
-            post_type = elem.get("PostTypeId")
-            tags = elem.get("Tags")
-
-            if post_type == "1":  # It's a question
-                # Clean and store question tags
-                cleaned_tags = clean_tags(tags)
-                question_tags[post_id] = cleaned_tags
+    post_index = PostTagIndex()
 
-                # Add to post_mapping with postTypeId
-                post_mapping[post_id] = {"tags": cleaned_tags, "postTypeId": "1"}
+    for post_id, post_type, parent_id, tags in iter_rows(posts_file_path, ["Id", "PostTypeId", "ParentId", "Tags"],
+                                                         member="Posts.xml"):
+        if post_type == "1":  # It's a question
+            # Remove leading and trailing | and split by |
+            post_index.add_question(int(post_id), tags.strip("|").split("|") if tags else [])
 
-            elem.clear()  # Clear memory
+        elif post_type == "2":  # It's an answer
+            post_index.add_answer(int(post_id), int(parent_id))
 
-    # Second Pass: Map answers to questions and finalize mapping
-    context = ET.iterparse(posts_file_path, events=("start", "end"))
-    for event, elem in context:
-        if event == "end" and elem.tag == "row":
-            post_id = elem.get("Id")
-            post_type = elem.get("PostTypeId")
-            parent_id = elem.get("ParentId")
-
-            if post_type == "2":  # It's an answer
-                # Resolve answer tags using the parent question's tags
-                parent_tags = question_tags.get(parent_id, "null")
-                post_mapping[post_id] = {"tags": parent_tags, "postTypeId": "2"}
-
-            elem.clear()  # Clear memory
-
-    return post_mapping
+    return post_index
 
 
 def convert_comments_to_csv(comments_file_path, posts_file_path, output_csv):
@@ -75,15 +38,16 @@ def convert_comments_to_csv(comments_file_path, posts_file_path, output_csv):
     Converts Comments.xml into a CSV file with each tag of a comment stored in a new row. Adds PostTypeId column.
 
     Args:
-        comments_file_path (str): Path to the Comments.xml file.
-        posts_file_path (str): Path to the Posts.xml file.
+        comments_file_path (str): Path to the Comments.xml file, the site's .7z archive, or "-" for stdin.
+        posts_file_path (str): Path to the Posts.xml file or the site's .7z archive.
         output_csv (str): Path to output the CSV file.
 
     Returns:
         None
     """
-    # Build post-to-tags and postTypeId mapping
-    post_mapping = extract_post_data(posts_file_path)
+    # Build post-to-tags and postTypeId index
+    post_index = extract_post_data(posts_file_path)
+    post_type_names = {QUESTION: "1", ANSWER: "2"}
 
     with open(output_csv, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
@@ -98,50 +62,42 @@ def convert_comments_to_csv(comments_file_path, posts_file_path, output_csv):
         ])
 
         # Process Comments.xml
-        context = ET.iterparse(comments_file_path, events=("start", "end"))
-        for event, elem in context:
-            if event == "end" and elem.tag == "row":  # Process each <row> element
-                comment_id = elem.get("Id")
-                post_id = elem.get("PostId")
-                user_id = elem.get("UserId", "null")
-                creation_date = elem.get("CreationDate")
-
-                # Get resolved tags and postTypeId from post_mapping
-                post_data = post_mapping.get(post_id, {"tags": "null", "postTypeId": "null"})
-                tags = post_data["tags"]
-                post_type_id = post_data["postTypeId"]
-
-                # If tags exist, write one row for each tag
-                if tags != "null":
-                    tags_list = tags.split(", ")  # Split tags into a list (comma-separated values)
-                    for tag in tags_list:
-                        writer.writerow([
-                            user_id,
-                            comment_id,
-                            post_id,
-                            post_type_id,
-                            tag,
-                            creation_date
-                        ])
-                else:
-                    # If no tags, write a single row with "null" for the tag
+        fields = ["Id", "PostId", "UserId", "CreationDate"]
+        for comment_id, post_id, user_id, creation_date in iter_rows(comments_file_path, fields, member="Comments.xml"):
+            user_id = user_id or "null"
+
+            # Get resolved tags and postTypeId from post_index
+            tag_ids = post_index.tag_ids_of(int(post_id))
+            post_type_id = post_type_names.get(post_index.post_type(int(post_id)), "null")
+
+            # If tags exist, write one row for each tag
+            if len(tag_ids):
+                for tag_id in tag_ids:
                     writer.writerow([
                         user_id,
                         comment_id,
                         post_id,
                         post_type_id,
-                        "null",
+                        post_index.tag_names[tag_id],
                         creation_date
                     ])
-
-                # Clear element from memory
-                elem.clear()
+            else:
+                # If no tags, write a single row with "null" for the tag
+                writer.writerow([
+                    user_id,
+                    comment_id,
+                    post_id,
+                    post_type_id,
+                    "null",
+                    creation_date
+                ])
 
 
 
 # File paths
-comments_file = f"{ROOT_DIR}/data/genai.stackexchange.com/Comments.xml"  # Replace with actual file path
-posts_file = f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml"  # Replace with actual file path
+# Extracted XML files, the site's .7z archive, or "-" for stdin (for one of the two)
+comments_file = sys.argv[1] if len(sys.argv) > 1 else f"{ROOT_DIR}/data/genai.stackexchange.com/Comments.xml"
+posts_file = sys.argv[2] if len(sys.argv) > 2 else f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml"
 output_file = f"{ROOT_DIR}/output/dump/users.comments.table.csv"
 
 # Generate the comments table with tags
@@ -1,5 +1,7 @@
-import xml.etree.ElementTree as ET
 import csv
+import sys
+
+from dumpReader import iter_rows
 
 # Root Directory
 ROOT_DIR = "../.."
@@ -9,7 +11,7 @@ def generate_questions_table_with_tags(file_path, output_csv):
     Generate a table for questions asked by users, storing one row per tag for each question.
 
     Args:
-        file_path (str): Path to the large XML file (Posts.xml).
+        file_path (str): Path to the large XML file (Posts.xml), the site's .7z archive, or "-" for stdin.
         output_csv (str): Path to output the CSV file.
 
     Returns:
@@ -33,50 +35,44 @@ def generate_questions_table_with_tags(file_path, output_csv):
             "FavouriteCount"
         ])
 
-        # Use iterparse for efficient XML processing
-        context = ET.iterparse(file_path, events=("start", "end"))
-        for event, elem in context:
-            if event == "end" and elem.tag == "row":  # Process only <row> elements
-                post_type = elem.get("PostTypeId")
-
-                if post_type == "1":  # Question
-                    # Extract necessary fields
-                    question_id = elem.get("Id")
-                    owner_user_id = elem.get("OwnerUserId", "null")
-                    accepted_answer_id = elem.get("AcceptedAnswerId", "null")
-                    creation_date = elem.get("CreationDate")
-                    score = elem.get("Score", "null")
-                    view_count = elem.get("ViewCount", "null")
-                    community_owned_date = elem.get("CommunityOwnedDate")
-                    is_community_owned = "true" if community_owned_date else "false"
-                    tags = elem.get("Tags", "").strip('|')
-                    answer_count = elem.get("AnswerCount", "null")
-                    comment_count = elem.get("CommentCount", "null")
-                    favourite_count = elem.get("FavouriteCount", "null")
-
-                    # Split tags by the "|" character and create a row for each tag
-                    tag_list = tags.split('|')
-                    for tag in tag_list:
-                        writer.writerow([
-                            owner_user_id,
-                            question_id,
-                            accepted_answer_id,
-                            creation_date,
-                            score,
-                            view_count,
-                            is_community_owned,
-                            tag,
-                            answer_count,
-                            comment_count,
-                            favourite_count
-                        ])
+        # Stream only the attributes needed for the table
+        fields = ["PostTypeId", "Id", "OwnerUserId", "AcceptedAnswerId", "CreationDate", "Score",
+                  "ViewCount", "CommunityOwnedDate", "Tags", "AnswerCount", "CommentCount", "FavouriteCount"]
+        for (post_type, question_id, owner_user_id, accepted_answer_id, creation_date, score, view_count,
+             community_owned_date, tags, answer_count, comment_count, favourite_count) in iter_rows(file_path, fields, member="Posts.xml"):
+            if post_type == "1":  # Question
+                # Extract necessary fields
+                owner_user_id = owner_user_id or "null"
+                accepted_answer_id = accepted_answer_id or "null"
+                score = score or "null"
+                view_count = view_count or "null"
+                is_community_owned = "true" if community_owned_date else "false"
+                tags = (tags or "").strip('|')
+                answer_count = answer_count or "null"
+                comment_count = comment_count or "null"
+                favourite_count = favourite_count or "null"
 
-                # Clear element from memory to reduce memory usage
-                elem.clear()
+                # Split tags by the "|" character and create a row for each tag
+                tag_list = tags.split('|')
+                for tag in tag_list:
+                    writer.writerow([
+                        owner_user_id,
+                        question_id,
+                        accepted_answer_id,
+                        creation_date,
+                        score,
+                        view_count,
+                        is_community_owned,
+                        tag,
+                        answer_count,
+                        comment_count,
+                        favourite_count
+                    ])
 
 
 # File paths
-input_file = f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml"  # Replace with actual file path
+# Posts.xml, the site's .7z archive, or "-" for stdin
+input_file = sys.argv[1] if len(sys.argv) > 1 else f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml"
 output_file = f"{ROOT_DIR}/output/dump/users.questions.table.csv"
 
 # Generate the questions table
@@ -0,0 +1,787 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+from array import array
+from multiprocessing import Pool
+
+from dumpReader import is_plain_file, iter_rows, split_ranges
+from postIndex import ANSWER, QUESTION, PostTagIndex
+from userActivity import BEHAVIORAL_HEADER, UserActivity, generate_users_table, to_id, to_score
+
+# Root Directory
+ROOT_DIR = "../.."
+
+QUESTIONS_HEADER = [
+    "UserId",
+    "QuestionId",
+    "AcceptedAnswerId",
+    "CreationDate",
+    "Score",
+    "ViewCount",
+    "IsCommunityOwned",
+    "Tag",
+    "AnswerCount",
+    "CommentCount",
+    "FavouriteCount"
+]
+
+ANSWERS_HEADER = [
+    "UserId",
+    "AnswerId",
+    "QuestionId",
+    "IsAcceptedAnswer",
+    "CreationDate",
+    "Score",
+    "ViewCount",
+    "IsCommunityOwned",
+    "Tag",
+    "CommentCount",
+    "FavouriteCount"
+]
+
+# Attributes read from Posts.xml and Comments.xml
+POSTS_FIELDS = ["Id", "PostTypeId", "ParentId", "AcceptedAnswerId", "OwnerUserId", "CreationDate", "Score",
+                "ViewCount", "CommunityOwnedDate", "Tags", "AnswerCount", "CommentCount", "FavouriteCount"]
+COMMENTS_FIELDS = ["Id", "PostId", "UserId", "CreationDate"]
+
+# PostTypeId column of the comments table, by PostTagIndex post type
+POST_TYPE_NAMES = {QUESTION: "1", ANSWER: "2"}
+
+# Byte ranges handed out per worker in parallel mode, for load balancing
+RANGES_PER_WORKER = 4
+
+COMMENTS_HEADER = [
+    "UserId",
+    "CommentId",
+    "PostId",
+    "PostTypeId",
+    "Tag",
+    "CreationDate"
+]
+
+
+def _parse_question(values):
+    """
+    Split a Posts.xml question row into its tags and the table columns around the Tag column.
+    """
+    (post_id, _, _, accepted_answer_id, owner_user_id, creation_date, score, view_count,
+     community_owned_date, tags, answer_count, comment_count, favourite_count) = values
+    tags = (tags or "").strip('|').split('|')
+    head = [
+        owner_user_id or "null",
+        post_id,
+        accepted_answer_id or "null",
+        creation_date,
+        score or "null",
+        view_count or "null",
+        "true" if community_owned_date else "false"
+    ]
+    tail = [answer_count or "null", comment_count or "null", favourite_count or "null"]
+    return post_id, tags, accepted_answer_id, head, tail
+
+
+def _parse_answer(values):
+    """
+    Extract the answer table columns of a Posts.xml answer row, without the tag and acceptance.
+    """
+    (post_id, _, parent_id, _, owner_user_id, creation_date, score, view_count,
+     community_owned_date, _, _, comment_count, favourite_count) = values
+    return post_id, parent_id, [
+        owner_user_id,
+        post_id,
+        parent_id,
+        creation_date,
+        score,
+        view_count or "null",
+        "true" if community_owned_date else "false",
+        comment_count or "null",
+        favourite_count or "null"
+    ]
+
+
+def _answer_rows(answer, post_index, accepted_answers):
+    """
+    Expand an answer into one row for each tag of its parent question.
+    """
+    is_accepted = "true" if answer[1] in accepted_answers else "false"
+    tag_names = post_index.tag_names
+    for tag_id in post_index.question_tag_ids(int(answer[2])):
+        yield answer[:3] + [is_accepted] + answer[3:7] + [tag_names[tag_id]] + answer[7:]
+
+
+def _comment_rows(values, post_index):
+    """
+    Expand a Comments.xml row into one row for each tag of the post it belongs to.
+    """
+    comment_id, post_id, user_id, creation_date = values
+    user_id = user_id or "null"
+    post_type = POST_TYPE_NAMES.get(post_index.post_type(int(post_id)), "null")
+    tag_ids = post_index.tag_ids_of(int(post_id))
+    tag_names = post_index.tag_names
+    # Untagged and unresolved posts get a single row with "null" for the tag
+    if len(tag_ids) == 0 or (len(tag_ids) == 1 and tag_names[tag_ids[0]] == ""):
+        yield [user_id, comment_id, post_id, post_type, "null", creation_date]
+        return
+    for tag_id in tag_ids:
+        yield [user_id, comment_id, post_id, post_type, tag_names[tag_id], creation_date]
+
+
+def _new_high_water():
+    return {"max_id": 0, "max_creation_date": None}
+
+
+def _raise_high_water(high_water, row_id, creation_date):
+    """
+    Raise a high-water mark ({"max_id", "max_creation_date"}) to cover one row.
+    """
+    if row_id > high_water["max_id"]:
+        high_water["max_id"] = row_id
+    if creation_date and (high_water["max_creation_date"] or "") < creation_date:
+        high_water["max_creation_date"] = creation_date
+
+
+def generate_posts_tables(posts_file_path, questions_csv, answers_csv, min_id=0, activity=None, high_water=None):
+    """
+    Generate the questions and answers tables in a single streaming pass over Posts.xml.
+
+    Questions are written as soon as they are read. Answers are written as soon as
+    their parent question has been seen; the few answers that appear before their
+    question (e.g. after a migration) are held back and written right after that
+    question's rows. Answers whose question never appears are dropped at the end.
+
+    Args:
+        posts_file_path (str): Path to the large XML file (Posts.xml), the site's .7z archive, or "-" for stdin.
+        questions_csv (str): Path to output the questions CSV file.
+        answers_csv (str): Path to output the answers CSV file.
+        min_id (int): Only write posts with a larger Id. Older posts are still indexed for the joins.
+        activity (UserActivity): Optional counters to add every question and answer to (older posts included).
+        high_water (dict): Optional high-water mark to raise to cover every question and answer read.
+
+    Returns:
+        PostTagIndex: Tags and PostTypeId of every question and answer, used for the comments join.
+    """
+    post_index = PostTagIndex()  # Tags of every question seen so far
+    accepted_answers = set()  # AcceptedAnswerId of every question seen so far
+    pending_answers = {}  # Parent question Id -> answer rows waiting for that question
+
+    with open(questions_csv, mode="w", newline="", encoding="utf-8") as q_file, \
+            open(answers_csv, mode="w", newline="", encoding="utf-8") as a_file:
+        question_writer = csv.writer(q_file)
+        answer_writer = csv.writer(a_file)
+        question_writer.writerow(QUESTIONS_HEADER)
+        answer_writer.writerow(ANSWERS_HEADER)
+
+        for values in iter_rows(posts_file_path, POSTS_FIELDS, member="Posts.xml"):
+            post_type = values[1]
+
+            if post_type == "1":  # Question
+                post_id, tags, accepted_answer_id, head, tail = _parse_question(values)
+                post_index.add_question(int(post_id), tags)
+                if accepted_answer_id:
+                    accepted_answers.add(accepted_answer_id)
+                if activity is not None:
+                    activity.add_question(to_id(values[4]), to_score(values[6]))
+                if high_water is not None:
+                    _raise_high_water(high_water, int(post_id), values[5])
+                if int(post_id) > min_id:
+                    for tag in tags:
+                        question_writer.writerow(head + [tag] + tail)
+
+                # Flush answers that arrived before this question
+                for answer in pending_answers.pop(post_id, []):
+                    answer_writer.writerows(_answer_rows(answer, post_index, accepted_answers))
+
+            elif post_type == "2":  # Answer
+                post_id, parent_id, answer = _parse_answer(values)
+                post_index.add_answer(int(post_id), int(parent_id))
+                if activity is not None:
+                    activity.add_answer(int(post_id), to_id(values[4]), to_score(values[6]))
+                if high_water is not None:
+                    _raise_high_water(high_water, int(post_id), values[5])
+                if int(post_id) <= min_id:
+                    continue
+                if post_index.post_type(int(parent_id)) == QUESTION:
+                    answer_writer.writerows(_answer_rows(answer, post_index, accepted_answers))
+                else:
+                    pending_answers.setdefault(parent_id, []).append(answer)
+
+        # Answers whose parent question is not in the dump have no tags and
+        # therefore produce no rows, as before.
+        pending_answers.clear()
+
+    if activity is not None:
+        activity.count_accepted(accepted_answers)
+
+    return post_index
+
+
+def generate_comments_table(comments_file_path, post_index, output_csv, min_id=0, activity=None, high_water=None):
+    """
+    Converts Comments.xml into a CSV file with each tag of a comment stored in a new row,
+    using the post index built by generate_posts_tables.
+
+    Args:
+        comments_file_path (str): Path to the Comments.xml file, the site's .7z archive, or "-" for stdin.
+        post_index (PostTagIndex): Index returned by generate_posts_tables.
+        output_csv (str): Path to output the CSV file.
+        min_id (int): Only write comments with a larger Id.
+        activity (UserActivity): Optional counters to add every comment to (older comments included).
+        high_water (dict): Optional high-water mark to raise to cover every comment read.
+
+    Returns:
+        None
+    """
+    with open(output_csv, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(COMMENTS_HEADER)
+        for values in iter_rows(comments_file_path, COMMENTS_FIELDS, member="Comments.xml"):
+            if activity is not None:
+                activity.add_comment(to_id(values[2]))
+            if high_water is not None:
+                _raise_high_water(high_water, int(values[0]), values[3])
+            if int(values[0]) > min_id:
+                writer.writerows(_comment_rows(values, post_index))
+
+
+# Lookup tables shared with pool workers through the pool initializer
+_worker_state = {}
+
+
+def _init_worker(state):
+    _worker_state.update(state)
+
+
+def _posts_chunk(task):
+    """
+    Pass 1 worker: write the questions of one byte range of Posts.xml to a partial table,
+    and its answers (without tags) to a staging file for pass 2.
+
+    Returns:
+        tuple: ((question Id, tags, owner, score, answers staged before it) tuples, accepted
+               answer ids, (answer Id, parent Id, owner, score, parent seen earlier in the range)
+               tuples) for the range, in file order, and the high-water mark of the range.
+    """
+    posts_file_path, byte_range, questions_partial, answers_staging = task
+    questions = []
+    accepted_answers = []
+    answers = []
+    question_ids = set()
+    high_water = _new_high_water()
+
+    with open(questions_partial, mode="w", newline="", encoding="utf-8") as q_file, \
+            open(answers_staging, mode="w", newline="", encoding="utf-8") as a_file:
+        question_writer = csv.writer(q_file)
+        answer_writer = csv.writer(a_file)
+        for values in iter_rows(posts_file_path, POSTS_FIELDS, backend="scan", byte_range=byte_range):
+            post_type = values[1]
+            if post_type == "1":
+                post_id, tags, accepted_answer_id, head, tail = _parse_question(values)
+                questions.append((int(post_id), tags, to_id(values[4]), to_score(values[6]), len(answers)))
+                question_ids.add(int(post_id))
+                _raise_high_water(high_water, int(post_id), values[5])
+                if accepted_answer_id:
+                    accepted_answers.append(accepted_answer_id)
+                for tag in tags:
+                    question_writer.writerow(head + [tag] + tail)
+            elif post_type == "2":
+                post_id, parent_id, answer = _parse_answer(values)
+                answers.append((int(post_id), int(parent_id), to_id(values[4]), to_score(values[6]),
+                                int(parent_id) in question_ids))
+                _raise_high_water(high_water, int(post_id), values[5])
+                answer_writer.writerow(answer)
+
+    return questions, accepted_answers, answers, high_water
+
+
+def _answers_chunk(task):
+    """
+    Pass 2 worker: expand one staging file of answers with the tags of their parent question.
+
+    The answers read before their question (early_ids) are not written but returned, so that
+    they can be merged right after that question like generate_posts_tables does. The output
+    is split into one partial table per segment between the staging row numbers in `positions`,
+    where early answers of later questions go.
+
+    Returns:
+        dict: Answer Id -> table rows of the early answers of the range.
+    """
+    answers_staging, answers_partials, early_ids, positions = task
+    post_index = _worker_state["post_index"]
+    accepted_answers = _worker_state["accepted_answers"]
+    partials = iter(answers_partials)
+    positions = iter(positions)
+    next_position = next(positions, None)
+    early_rows = {}
+
+    with open(answers_staging, mode="r", newline="", encoding="utf-8") as in_file:
+        out_file = open(next(partials), mode="w", newline="", encoding="utf-8")
+        try:
+            writer = csv.writer(out_file)
+            for number, answer in enumerate(csv.reader(in_file)):
+                if number == next_position:
+                    out_file.close()
+                    out_file = open(next(partials), mode="w", newline="", encoding="utf-8")
+                    writer = csv.writer(out_file)
+                    next_position = next(positions, None)
+                if answer[1] in early_ids:
+                    early_rows[answer[1]] = list(_answer_rows(answer, post_index, accepted_answers))
+                else:
+                    writer.writerows(_answer_rows(answer, post_index, accepted_answers))
+        finally:
+            out_file.close()
+    # Segments after the last answer of the range (questions that come after it) stay empty
+    for partial in partials:
+        open(partial, mode="w", encoding="utf-8").close()
+    return early_rows
+
+
+def _comments_chunk(task):
+    """
+    Comments worker: write the comments of one byte range of Comments.xml to a partial table.
+
+    Returns:
+        tuple: The UserId of every comment in the range (array, NULL for deleted users) and the
+               high-water mark of the range.
+    """
+    comments_file_path, byte_range, comments_partial = task
+    post_index = _worker_state["post_index"]
+    user_ids = array("i")
+    high_water = _new_high_water()
+
+    with open(comments_partial, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        for values in iter_rows(comments_file_path, COMMENTS_FIELDS, backend="scan", byte_range=byte_range):
+            user_ids.append(to_id(values[2]))
+            _raise_high_water(high_water, int(values[0]), values[3])
+            writer.writerows(_comment_rows(values, post_index))
+    return user_ids, high_water
+
+
+def _merge_partials(partials, output_csv, header):
+    """
+    Concatenate partial tables in range order. Dumps are written in Id order, so range
+    order is Id order and the merged table matches the serial one.
+    """
+    with open(output_csv, mode="w", newline="", encoding="utf-8") as file:
+        csv.writer(file).writerow(header)
+        for partial in partials:
+            with open(partial, mode="r", newline="", encoding="utf-8") as part:
+                shutil.copyfileobj(part, file)
+
+
+def generate_dump_tables_parallel(posts_file_path, comments_file_path, output_dir, workers, activity=None):
+    """
+    Build the questions, answers and comments tables with a process pool.
+
+    Posts.xml and Comments.xml are split into byte ranges on line boundaries. Pass 1 writes
+    the questions of each range and collects question tags; the answer -> question tag
+    join then runs as pass 2 over the much smaller answer staging files, once every
+    question's tags are known. Partial tables are merged in Id order, with the answers that
+    come before their question moved right after it, so the tables match the serial ones.
+
+    Args:
+        posts_file_path (str): Path to the Posts.xml file.
+        comments_file_path (str): Path to the Comments.xml file.
+        output_dir (str): Directory to write the three CSV files to.
+        workers (int): Number of worker processes.
+        activity (UserActivity): Optional counters to add every question, answer and comment to.
+
+    Returns:
+        dict: The high-water marks of Posts.xml and Comments.xml.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    partial_dir = tempfile.mkdtemp(prefix="partials.", dir=output_dir)
+
+    try:
+        posts_ranges = split_ranges(posts_file_path, workers * RANGES_PER_WORKER)
+        posts_tasks = [
+            (posts_file_path, byte_range,
+             os.path.join(partial_dir, f"questions.{index}.csv"),
+             os.path.join(partial_dir, f"answers.{index}.staging.csv"))
+            for index, byte_range in enumerate(posts_ranges)
+        ]
+
+        # Pass 1: questions, and the post index needed by the answers and comments joins.
+        # Ranges come back in file order, so questions are added in Id order.
+        post_index = PostTagIndex()
+        accepted_answers = set()
+        question_count = answer_count = 0
+        # Answers read before their question, which generate_posts_tables writes right after it:
+        # parent Id -> answer Ids, the early answer Ids of every range, and for every range the
+        # staging row number -> parent Ids of the early answers merged there
+        early_answers = {}
+        early_ids = [set() for _ in posts_tasks]
+        merge_points = [{} for _ in posts_tasks]
+        posts_high_water = _new_high_water()
+        with Pool(workers) as pool:
+            for index, (chunk_questions, chunk_accepted, chunk_answers, chunk_high_water) in enumerate(
+                    pool.imap(_posts_chunk, posts_tasks)):
+                for post_id, parent_id, _, _, parent_seen in chunk_answers:
+                    if not parent_seen and post_index.post_type(parent_id) != QUESTION:
+                        early_answers.setdefault(parent_id, []).append(post_id)
+                        early_ids[index].add(str(post_id))
+                for post_id, tags, owner_user_id, score, answers_before in chunk_questions:
+                    post_index.add_question(post_id, tags)
+                    if post_id in early_answers:
+                        merge_points[index].setdefault(answers_before, []).append(post_id)
+                    if activity is not None:
+                        activity.add_question(owner_user_id, score)
+                for post_id, parent_id, owner_user_id, score, _ in chunk_answers:
+                    post_index.add_answer(post_id, parent_id)
+                    if activity is not None:
+                        activity.add_answer(post_id, owner_user_id, score)
+                accepted_answers.update(chunk_accepted)
+                _raise_high_water(posts_high_water, chunk_high_water["max_id"], chunk_high_water["max_creation_date"])
+                question_count += len(chunk_questions)
+                answer_count += len(chunk_answers)
+        print(f"Pass 1 done: {question_count} questions, {answer_count} answers in {len(posts_ranges)} ranges.")
+        if activity is not None:
+            activity.count_accepted(accepted_answers)
+
+        # Pass 2: join answers with their parent question's tags. Every range's table is cut
+        # into segments at its merge points, and the early answers are merged in between.
+        answers_tasks = [
+            (task[3], [task[3].replace(".staging.csv", f".{segment}.csv")
+                       for segment in range(len(merge_points[index]) + 1)],
+             early_ids[index], sorted(merge_points[index]))
+            for index, task in enumerate(posts_tasks)
+        ]
+        early_rows = {}
+        state = {"post_index": post_index, "accepted_answers": accepted_answers}
+        with Pool(workers, initializer=_init_worker, initargs=(state,)) as pool:
+            for chunk_rows in pool.imap(_answers_chunk, answers_tasks):
+                early_rows.update(chunk_rows)
+
+        answers_partials = []
+        for index, (_, segments, _, positions) in enumerate(answers_tasks):
+            answers_partials.append(segments[0])
+            for segment, position in enumerate(positions, start=1):
+                early_partial = segments[segment].replace(".csv", ".early.csv")
+                with open(early_partial, mode="w", newline="", encoding="utf-8") as file:
+                    writer = csv.writer(file)
+                    for parent_id in merge_points[index][position]:
+                        for post_id in early_answers[parent_id]:
+                            writer.writerows(early_rows[str(post_id)])
+                answers_partials += [early_partial, segments[segment]]
+
+        questions_csv = os.path.join(output_dir, "users.questions.table.csv")
+        answers_csv = os.path.join(output_dir, "users.answers.table.csv")
+        _merge_partials([task[2] for task in posts_tasks], questions_csv, QUESTIONS_HEADER)
+        print(f"Questions table saved to {questions_csv}")
+        _merge_partials(answers_partials, answers_csv, ANSWERS_HEADER)
+        print(f"Answers table saved to {answers_csv}")
+
+        # Comments: join each range against the post index
+        comments_tasks = [
+            (comments_file_path, byte_range, os.path.join(partial_dir, f"comments.{index}.csv"))
+            for index, byte_range in enumerate(split_ranges(comments_file_path, workers * RANGES_PER_WORKER))
+        ]
+        comments_high_water = _new_high_water()
+        with Pool(workers, initializer=_init_worker, initargs=({"post_index": post_index},)) as pool:
+            for user_ids, chunk_high_water in pool.imap(_comments_chunk, comments_tasks):
+                _raise_high_water(comments_high_water, chunk_high_water["max_id"],
+                                  chunk_high_water["max_creation_date"])
+                if activity is not None:
+                    for user_id in user_ids:
+                        activity.add_comment(user_id)
+
+        comments_csv = os.path.join(output_dir, "users.comments.table.csv")
+        _merge_partials([task[2] for task in comments_tasks], comments_csv, COMMENTS_HEADER)
+        print(f"Comments table with tags saved to {comments_csv}")
+    finally:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+    return {"Posts.xml": posts_high_water, "Comments.xml": comments_high_water}
+
+
+TABLE_NAMES = ("questions", "answers", "comments")
+
+
+def _read_state(state_file):
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _write_state(state_file, state):
+    """
+    Replace a JSON state file atomically, so that an interrupted run leaves the previous state.
+    """
+    temp_file = f"{state_file}.tmp"
+    with open(temp_file, mode="w", encoding="utf-8") as file:
+        json.dump(state, file, indent=4)
+    os.replace(temp_file, state_file)
+
+
+def _table_sizes(output_dir):
+    """
+    Byte size of every CSV table, recorded with the high-water marks.
+    """
+    return {name: os.path.getsize(os.path.join(output_dir, f"users.{name}.table.csv")) for name in TABLE_NAMES}
+
+
+def _truncate_table(table_csv, size):
+    """
+    Cut a table back to its size at the last saved state, dropping rows appended by an interrupted update.
+    """
+    if os.path.exists(table_csv) and os.path.getsize(table_csv) > size:
+        with open(table_csv, mode="r+b") as file:
+            file.truncate(size)
+
+
+def _append_table(delta_csv, table_csv):
+    """
+    Append the rows of a delta table to a full table, creating it (with header) if needed.
+    """
+    if not os.path.exists(table_csv):
+        shutil.copyfile(delta_csv, table_csv)
+        return
+    with open(delta_csv, mode="r", newline="", encoding="utf-8") as delta, \
+            open(table_csv, mode="a", newline="", encoding="utf-8") as table:
+        delta.readline()  # Skip the header
+        shutil.copyfileobj(delta, table)
+
+
+def _changed_users(old_table, new_table, changed_file):
+    """
+    Write the UserId of every user whose behavioral columns (BEHAVIORAL_HEADER) differ between two
+    users tables, or who is not in the old one, one per line. Both tables are in UserId order, as
+    Users.xml is, so they are compared in one merge pass.
+
+    Returns:
+        int: The number of users written.
+    """
+    changed = 0
+    with open(new_table, mode="r", newline="", encoding="utf-8") as new_file, \
+            open(changed_file, mode="w", encoding="utf-8") as out_file:
+        new_rows = csv.reader(new_file)
+        new_header = next(new_rows)
+        new_columns = [new_header.index(name) for name in BEHAVIORAL_HEADER]
+        old_file = open(old_table, mode="r", newline="", encoding="utf-8") if os.path.exists(old_table) else None
+        try:
+            old_rows = csv.reader(old_file) if old_file is not None else iter([])
+            old_header = next(old_rows, None)
+            old_columns = [old_header.index(name) for name in BEHAVIORAL_HEADER] if old_header else []
+            old_row = next(old_rows, None)
+            for row in new_rows:
+                user_id = int(row[0])
+                while old_row is not None and int(old_row[0]) < user_id:
+                    old_row = next(old_rows, None)
+                if (old_row is None or int(old_row[0]) != user_id
+                        or [old_row[column] for column in old_columns] != [row[column] for column in new_columns]):
+                    out_file.write(f"{user_id}\n")
+                    changed += 1
+        finally:
+            if old_file is not None:
+                old_file.close()
+    return changed
+
+
+def update_dump_tables(posts_file_path, comments_file_path, output_dir, users_file_path=None, badges_file_path=None):
+    """
+    Incrementally update the questions, answers and comments tables from a newer dump release.
+
+    The high-water mark (max Id and max CreationDate) of Posts.xml and Comments.xml is kept in
+    `output_dir/state.json`, which the full build (generate_dump_tables) writes first. Only posts
+    and comments above it are written: first to delta tables in `output_dir/delta` (which
+    extractFeatures/updateFeatures.py reads), then appended to the full tables. Posts.xml is
+    still read in full so that new answers and comments on old posts get their tags. Rows
+    already in the tables are not revisited, e.g. an old answer that is accepted later keeps
+    IsAcceptedAnswer "false". The users table, if requested, is rebuilt in full from the same passes.
+
+    state.json also records the size of every table. A run that was interrupted while appending
+    is undone by cutting the tables back to those sizes, and state.json is only replaced once all
+    tables are appended, so rerunning the update never duplicates rows. The marks the delta goes
+    from and to are saved last, in `delta/delta.json`.
+
+    The new users table is compared with the previous one before replacing it: users whose
+    behavioral columns changed (reputation, badges, scores, ...) or who are new are listed in
+    `delta/changed_users.txt`, for updateFeatures.py to pass on to the index update.
+
+    Args:
+        posts_file_path (str): Path to the Posts.xml file, the site's .7z archive, or "-" for stdin.
+        comments_file_path (str): Path to the Comments.xml file, the site's .7z archive, or "-" for stdin.
+        output_dir (str): Directory holding the three CSV files and state.json.
+        users_file_path (str): Users.xml to also build users.table.csv from (see generate_dump_tables).
+        badges_file_path (str): Badges.xml for the badge counts of the users table.
+
+    Returns:
+        dict: The new state.
+
+    Raises:
+        ValueError: If output_dir has no state.json from a full build of the CSV tables.
+    """
+    state_file = os.path.join(output_dir, "state.json")
+    delta_dir = os.path.join(output_dir, "delta")
+    state = _read_state(state_file)
+    if not state:
+        raise ValueError(f"{state_file} not found: build the tables once without --incremental first")
+    if state.get("format", "csv") != "csv":
+        raise ValueError(f"The tables in {output_dir} were built with --format {state['format']}; "
+                         f"--incremental only updates csv tables")
+    os.makedirs(delta_dir, exist_ok=True)
+    delta_file = os.path.join(delta_dir, "delta.json")
+    changed_file = os.path.join(delta_dir, "changed_users.txt")
+    for stale_file in (delta_file, changed_file):
+        if os.path.exists(stale_file):
+            os.remove(stale_file)  # The delta is about to be replaced
+    previous = {"Posts.xml": state["Posts.xml"], "Comments.xml": state["Comments.xml"]}
+    print(f"Updating from Posts.xml Id > {previous['Posts.xml']['max_id']} and "
+          f"Comments.xml Id > {previous['Comments.xml']['max_id']}")
+
+    tables = {name: (os.path.join(delta_dir, f"users.{name}.table.csv"),
+                     os.path.join(output_dir, f"users.{name}.table.csv"))
+              for name in TABLE_NAMES}
+    activity = UserActivity() if users_file_path else None
+    posts_high_water = dict(previous["Posts.xml"])
+    comments_high_water = dict(previous["Comments.xml"])
+    post_index = generate_posts_tables(posts_file_path, tables["questions"][0], tables["answers"][0],
+                                       min_id=posts_high_water["max_id"], activity=activity,
+                                       high_water=posts_high_water)
+    generate_comments_table(comments_file_path, post_index, tables["comments"][0],
+                            min_id=comments_high_water["max_id"], activity=activity, high_water=comments_high_water)
+
+    if activity is not None:
+        # Built next to the delta first, so the previous table is still there to compare with
+        new_users_table = generate_users_table(users_file_path, activity, delta_dir, "csv", badges_file_path)
+        users_table = os.path.join(output_dir, "users.table.csv")
+        changed = _changed_users(users_table, new_users_table, changed_file)
+        print(f"{changed} users with new or changed behavioral features listed in {changed_file}")
+
+    sizes = state.get("tables", {})
+    for name, (delta_csv, table_csv) in tables.items():
+        if name in sizes:
+            _truncate_table(table_csv, sizes[name])
+        _append_table(delta_csv, table_csv)
+        print(f"New {name} appended to {table_csv} (delta in {delta_csv})")
+
+    state.update({"Posts.xml": posts_high_water, "Comments.xml": comments_high_water,
+                  "tables": _table_sizes(output_dir)})
+    _write_state(state_file, state)
+    if activity is not None:
+        os.replace(new_users_table, users_table)
+        print(f"Users table saved to {users_table}")
+    _write_state(delta_file, {"from": previous, "to": {"Posts.xml": posts_high_water,
+                                                       "Comments.xml": comments_high_water}})
+    print(f"High-water marks saved to {state_file}")
+    return state
+
+
+def generate_dump_tables(posts_file_path, comments_file_path, output_dir, workers=1, output_format="csv",
+                         users_file_path=None, badges_file_path=None):
+    """
+    Build the questions, answers and comments tables with a single pass over Posts.xml
+    and a single pass over Comments.xml.
+
+    With a Users.xml, the per-user behavioral table (users.table.csv, or users.npz/.parquet)
+    is built too: question, answer, acceptance, comment and score counts are gathered during
+    those same passes and joined with a streaming pass over Users.xml (and Badges.xml).
+
+    The high-water marks of the dump (and the table sizes, for csv) are saved to
+    `output_dir/state.json`, for later runs of update_dump_tables.
+
+    Args:
+        posts_file_path (str): Path to the Posts.xml file, the site's .7z archive, or "-" for stdin.
+        comments_file_path (str): Path to the Comments.xml file, the site's .7z archive, or "-" for stdin.
+        output_dir (str): Directory to write the three CSV files to.
+        workers (int): Number of worker processes. More than one switches to
+                       generate_dump_tables_parallel.
+        output_format (str): "csv" for the per-tag CSV tables, or "npz"/"parquet" for the
+                             typed columnar tables of dumpColumnar (single process).
+        users_file_path (str): Users.xml, the site's .7z archive, or "-" for stdin. No users table if None.
+        badges_file_path (str): Badges.xml for the badge counts of the users table (0 if None).
+
+    Returns:
+        dict: The state saved to state.json.
+    """
+    activity = UserActivity() if users_file_path else None
+    if output_format != "csv":
+        if workers > 1:
+            print(f"The {output_format} format is built by a single process; ignoring --workers.")
+        # Columnar output needs numpy (and pyarrow for parquet), so it is only imported on demand
+        from dumpColumnar import generate_columnar_tables, high_water_mark
+        table_paths = generate_columnar_tables(posts_file_path, comments_file_path, output_dir, output_format,
+                                               activity)
+        for table_path in table_paths:
+            print(f"Table saved to {table_path}")
+        posts_table, _, comments_table, _ = table_paths
+        state = {"Posts.xml": high_water_mark(posts_table), "Comments.xml": high_water_mark(comments_table)}
+    else:
+        if workers > 1 and not (is_plain_file(posts_file_path) and is_plain_file(comments_file_path)):
+            print("Parallel mode needs extracted XML files; reading the archive/stdin with a single process.")
+            workers = 1
+        if workers > 1:
+            state = generate_dump_tables_parallel(posts_file_path, comments_file_path, output_dir, workers, activity)
+        else:
+            state = _generate_dump_tables_serial(posts_file_path, comments_file_path, output_dir, activity)
+        state["tables"] = _table_sizes(output_dir)
+    state["format"] = output_format
+
+    # A delta of an earlier incremental run is not a delta of these tables
+    delta_file = os.path.join(output_dir, "delta", "delta.json")
+    if os.path.exists(delta_file):
+        os.remove(delta_file)
+    state_file = os.path.join(output_dir, "state.json")
+    _write_state(state_file, state)
+    print(f"High-water marks saved to {state_file}")
+
+    if activity is not None:
+        users_table = generate_users_table(users_file_path, activity, output_dir, output_format, badges_file_path)
+        print(f"Users table saved to {users_table}")
+    return state
+
+
+def _generate_dump_tables_serial(posts_file_path, comments_file_path, output_dir, activity):
+    """
+    Single process version of generate_dump_tables for the CSV tables.
+
+    Returns:
+        dict: The high-water marks of Posts.xml and Comments.xml.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    questions_csv = os.path.join(output_dir, "users.questions.table.csv")
+    answers_csv = os.path.join(output_dir, "users.answers.table.csv")
+    comments_csv = os.path.join(output_dir, "users.comments.table.csv")
+    state = {"Posts.xml": _new_high_water(), "Comments.xml": _new_high_water()}
+
+    post_index = generate_posts_tables(posts_file_path, questions_csv, answers_csv, activity=activity,
+                                       high_water=state["Posts.xml"])
+    print(f"Questions table saved to {questions_csv}")
+    print(f"Answers table saved to {answers_csv}")
+
+    generate_comments_table(comments_file_path, post_index, comments_csv, activity=activity,
+                            high_water=state["Comments.xml"])
+    print(f"Comments table with tags saved to {comments_csv}")
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the questions, answers and comments tables from a dump.")
+    parser.add_argument("--posts", default=f"{ROOT_DIR}/data/genai.stackexchange.com/Posts.xml",
+                        help="Posts.xml, the site's .7z archive, or - for stdin")
+    parser.add_argument("--comments", default=f"{ROOT_DIR}/data/genai.stackexchange.com/Comments.xml",
+                        help="Comments.xml, the site's .7z archive, or - for stdin")
+    parser.add_argument("--users", help="Users.xml, the site's .7z archive, or - for stdin: also build the "
+                                        "per-user behavioral table")
+    parser.add_argument("--badges", help="Badges.xml or the site's .7z archive, for the badge counts of the users table")
+    parser.add_argument("--output-dir", default=f"{ROOT_DIR}/output/dump")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1, serial)")
+    parser.add_argument("--format", choices=["csv", "npz", "parquet"], default="csv",
+                        help="csv: one row per tag (default); npz/parquet: typed columnar tables")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only add posts and comments newer than the last run (csv, single process)")
+    args = parser.parse_args()
+
+    if args.incremental:
+        if args.format != "csv":
+            parser.error("--incremental only supports the csv format")
+        try:
+            update_dump_tables(args.posts, args.comments, args.output_dir, args.users, args.badges)
+        except ValueError as error:
+            parser.error(str(error))
+    else:
+        generate_dump_tables(args.posts, args.comments, args.output_dir, args.workers, args.format,
+                             args.users, args.badges)
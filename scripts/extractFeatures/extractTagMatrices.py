@@ -0,0 +1,398 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from array import array
+
+import numpy as np
+
+from featureStore import FeatureStore, save_feature_store
+
+# Root directory
+ROOT_DIR = "../.."
+
+DUMP_DIR = f"{ROOT_DIR}/output/dump"
+# Feature store directory (see featureStore.py)
+FEATURES_STORE = f"{ROOT_DIR}/output/features/users_tags"
+
+# One user x tag count matrix per activity. Tag-based badges are split by rank, so that rank
+# weights can be applied when the matrices are combined.
+ACTIVITIES = ("asked", "answered", "accepted", "commented", "gold_badges", "silver_badges", "bronze_badges")
+BADGE_ACTIVITIES = {"gold": "gold_badges", "silver": "silver_badges", "bronze": "bronze_badges"}
+
+# Entries buffered per activity before they are merged into the running counts
+CHUNK_ENTRIES = 1 << 22
+
+# Entries are buffered as (row << 32 | column) keys
+COLUMN_MASK = (1 << 32) - 1
+
+
+def _sum_duplicates(keys, counts):
+    """
+    Sort (row << 32 | column) keys and add up the counts of equal keys.
+    """
+    if len(keys) == 0:
+        return keys, counts
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    counts = counts[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(counts, starts)
+
+
+class CountMatrix:
+    """
+    Sparse count matrix built from a stream of (row, column) entries in bounded memory.
+
+    Entries go to a small append buffer. Every `chunk_entries` entries the buffer is sorted and
+    folded into the running (key, count) arrays, so memory stays close to the number of
+    distinct entries instead of the number of occurrences.
+    """
+
+    def __init__(self, chunk_entries=CHUNK_ENTRIES):
+        self.chunk_entries = chunk_entries
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._buffer = array("q")
+        self._buffer_counts = array("q")
+        self._pending = []  # Blocks of (keys, counts) added in bulk
+
+    def add(self, row, column, count=1):
+        self._buffer.append(row << 32 | column)
+        self._buffer_counts.append(count)
+        if len(self._buffer) >= self.chunk_entries:
+            self.flush()
+
+    def add_many(self, rows, columns, counts=None):
+        """
+        Add entries from arrays of row and column ids (and counts, 1 if None).
+        """
+        keys = np.asarray(rows, dtype=np.int64) << 32 | np.asarray(columns, dtype=np.int64)
+        counts = np.ones(len(keys), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self._pending.append((keys, counts))
+        if sum(len(block) for block, _ in self._pending) >= self.chunk_entries:
+            self.flush()
+
+    def flush(self):
+        blocks = [(self.keys, self.counts), *self._pending,
+                  (np.frombuffer(self._buffer, dtype=np.int64), np.frombuffer(self._buffer_counts, dtype=np.int64))]
+        keys = np.concatenate([block for block, _ in blocks])
+        counts = np.concatenate([block_counts for _, block_counts in blocks])
+        self.keys, self.counts = _sum_duplicates(keys, counts)
+        self._buffer = array("q")
+        self._buffer_counts = array("q")
+        self._pending = []
+
+    def to_csr(self, row_order, column_order, n_rows):
+        """
+        Convert to CSR arrays, renumbering rows and columns.
+
+        Args:
+            row_order (ndarray): New row id of every row id.
+            column_order (ndarray): New column id of every column id.
+            n_rows (int): Number of rows.
+
+        Returns:
+            tuple: (indptr int64, indices int32, data int32) with sorted column indices per row.
+        """
+        self.flush()
+        rows = row_order[self.keys >> 32]
+        columns = column_order[self.keys & COLUMN_MASK]
+        keys, data = _sum_duplicates(rows << 32 | columns, self.counts)
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys >> 32, minlength=n_rows), out=indptr[1:])
+        return indptr, (keys & COLUMN_MASK).astype(np.int32), data.astype(np.int32)
+
+
+def _column_indices(header, names, csv_file):
+    """
+    Positions of the named columns in a table header.
+    """
+    missing = [name for name in names if name not in header]
+    if missing:
+        raise ValueError(f"{csv_file} has no {', '.join(missing)} column (header: {header})")
+    return [header.index(name) for name in names]
+
+
+def _read_columns(csv_file, names):
+    """
+    Stream the named columns of a CSV table. The header row is only used to find the columns.
+    """
+    with open(csv_file, mode="r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        indices = _column_indices(next(reader, []), names, csv_file)
+        for row in reader:
+            yield [row[index] for index in indices]
+
+
+def _is_user(user_id):
+    # Anonymous, deleted and the Community user (-1) are not indexed
+    return user_id not in ("", "null") and not user_id.startswith("-")
+
+
+def _is_tag(tag):
+    return tag not in ("", "null")
+
+
+class TagMatrixBuilder:
+    """
+    Per-activity user x tag count matrices over one user and one tag vocabulary.
+
+    User ids and tag names are interned to dense row and column ids as they are read; the
+    vocabularies are sorted (users by id, tags by name) when the matrices are built.
+    """
+
+    def __init__(self, chunk_entries=CHUNK_ENTRIES):
+        self.user_rows = {}
+        self.tag_columns = {}
+        self.matrices = {activity: CountMatrix(chunk_entries) for activity in ACTIVITIES}
+
+    def _row(self, user_id):
+        row = self.user_rows.get(user_id)
+        if row is None:
+            row = self.user_rows[user_id] = len(self.user_rows)
+        return row
+
+    def _column(self, tag):
+        column = self.tag_columns.get(tag)
+        if column is None:
+            column = self.tag_columns[tag] = len(self.tag_columns)
+        return column
+
+    def add(self, activity, user_id, tag, count=1):
+        """
+        Args:
+            activity (str): One of ACTIVITIES.
+            user_id (int): Stack Exchange user id.
+            tag (str): Tag name.
+            count (int): Occurrences to add.
+        """
+        self.matrices[activity].add(self._row(user_id), self._column(tag), count)
+
+    def read_questions(self, csv_file):
+        """
+        Count the tags of every question per asker (users.questions.table.csv, one row per tag).
+        """
+        for user_id, tag in _read_columns(csv_file, ["UserId", "Tag"]):
+            if _is_user(user_id) and _is_tag(tag):
+                self.add("asked", int(user_id), tag)
+
+    def read_answers(self, csv_file):
+        """
+        Count the tags of every answer and accepted answer per answerer (users.answers.table.csv),
+        in one pass.
+        """
+        answered = self.matrices["answered"]
+        accepted = self.matrices["accepted"]
+        for user_id, is_accepted, tag in _read_columns(csv_file, ["UserId", "IsAcceptedAnswer", "Tag"]):
+            if _is_user(user_id) and _is_tag(tag):
+                row = self._row(int(user_id))
+                column = self._column(tag)
+                answered.add(row, column)
+                if is_accepted.lower() == "true":
+                    accepted.add(row, column)
+
+    def read_comments(self, csv_file):
+        """
+        Count the tags of the posts every user commented on (users.comments.table.csv).
+        """
+        for user_id, tag in _read_columns(csv_file, ["UserId", "Tag"]):
+            if _is_user(user_id) and _is_tag(tag):
+                self.add("commented", int(user_id), tag)
+
+    def read_tag_badges(self, csv_file):
+        """
+        Count tag-based badge awards per user and rank (tag_based_badges.csv from the API or from
+        collectFromDump/users.badges.py). The badge name is the tag name.
+        """
+        for user_id, name, rank, award_count in _read_columns(
+                csv_file, ["user id", "badge name", "badge rank", "award count"]):
+            activity = BADGE_ACTIVITIES.get(rank)
+            if activity and _is_user(user_id) and _is_tag(name):
+                self.add(activity, int(user_id), name, int(award_count) if award_count.isdigit() else 1)
+
+    def read_columnar(self, dump_dir):
+        """
+        Count asked, answered, accepted and commented tags from the typed tables of
+        `users.tables.py --format npz` (posts, post_tags, comments, tags) with array operations.
+        """
+        # dumpColumnar lives next to the dump scripts and needs numpy, so it is only imported on demand
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "collectFromDump"))
+        from dumpColumnar import load_table
+
+        posts = load_table(os.path.join(dump_dir, "posts.npz"),
+                           ["Id", "PostTypeId", "ParentId", "OwnerUserId", "IsAcceptedAnswer"])
+        post_tags = load_table(os.path.join(dump_dir, "post_tags.npz"))
+        comments = load_table(os.path.join(dump_dir, "comments.npz"), ["PostId", "UserId"])
+        tag_names = load_table(os.path.join(dump_dir, "tags.npz"))["TagName"]
+        columns = np.array([self._column(str(tag)) for tag in tag_names], dtype=np.int64)
+
+        # Tag ranges of every question, in CSR layout by post Id
+        size = int(max(posts["Id"].max(initial=0), post_tags["PostId"].max(initial=0))) + 1
+        order = np.argsort(post_tags["PostId"], kind="stable")
+        tag_ids = post_tags["TagId"][order]
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(post_tags["PostId"], minlength=size), out=offsets[1:])
+        question_of = np.full(size, -1, dtype=np.int64)
+        question_of[posts["Id"]] = np.where(posts["PostTypeId"] == 2, posts["ParentId"], posts["Id"])
+
+        def expand(activity, user_ids, post_ids):
+            # One entry per tag of the question each post belongs to
+            keep = (user_ids > 0) & (post_ids >= 0) & (post_ids < size)
+            user_ids, question_ids = user_ids[keep], question_of[post_ids[keep]]
+            keep = (question_ids >= 0) & (question_ids < size)
+            user_ids, question_ids = user_ids[keep], question_ids[keep]
+            starts = offsets[question_ids]
+            lengths = offsets[question_ids + 1] - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            unique_users = np.unique(user_ids)
+            rows = np.array([self._row(int(user_id)) for user_id in unique_users], dtype=np.int64)
+            row_of = rows[np.searchsorted(unique_users, user_ids)]
+            self.matrices[activity].add_many(np.repeat(row_of, lengths), columns[tag_ids[positions]])
+
+        owners = posts["OwnerUserId"].astype(np.int64)
+        post_ids = posts["Id"].astype(np.int64)
+        is_answer = posts["PostTypeId"] == 2
+        expand("asked", owners[~is_answer], post_ids[~is_answer])
+        expand("answered", owners[is_answer], post_ids[is_answer])
+        is_accepted = is_answer & posts["IsAcceptedAnswer"]
+        expand("accepted", owners[is_accepted], post_ids[is_accepted])
+        expand("commented", comments["UserId"].astype(np.int64), comments["PostId"].astype(np.int64))
+
+    def build(self):
+        """
+        Returns:
+            dict: "user_ids" (int64, one per row, sorted), "tags" (tag names, one per column, sorted)
+                  and f"{activity}.indptr" / ".indices" / ".data" CSR arrays for every activity.
+        """
+        user_ids = np.fromiter(self.user_rows, dtype=np.int64, count=len(self.user_rows))
+        tags = np.array(list(self.tag_columns), dtype=str)
+        user_order = np.argsort(user_ids, kind="stable")
+        tag_order = np.argsort(tags, kind="stable")
+        row_order = np.empty(len(user_ids), dtype=np.int64)
+        row_order[user_order] = np.arange(len(user_ids))
+        column_order = np.empty(len(tags), dtype=np.int64)
+        column_order[tag_order] = np.arange(len(tags))
+
+        matrices = {"user_ids": user_ids[user_order], "tags": tags[tag_order]}
+        for activity, matrix in self.matrices.items():
+            indptr, indices, data = matrix.to_csr(row_order, column_order, len(user_ids))
+            matrices[f"{activity}.indptr"] = indptr
+            matrices[f"{activity}.indices"] = indices
+            matrices[f"{activity}.data"] = data
+        return matrices
+
+
+def csr_entries(matrices, activity):
+    """
+    Expand one activity's CSR arrays to (user id, tag name, count) arrays.
+    """
+    indptr = matrices[f"{activity}.indptr"]
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return matrices["user_ids"][rows], matrices["tags"][matrices[f"{activity}.indices"]], matrices[f"{activity}.data"]
+
+
+def merge_tag_matrices(base, delta):
+    """
+    Add the counts of one set of matrices to another, over the union of their vocabularies.
+
+    Returns:
+        dict: The merged matrices, in the layout of TagMatrixBuilder.build.
+    """
+    builder = TagMatrixBuilder()
+    for matrices in (base, delta):
+        rows = np.array([builder._row(int(user_id)) for user_id in matrices["user_ids"]], dtype=np.int64)
+        columns = np.array([builder._column(str(tag)) for tag in matrices["tags"]], dtype=np.int64)
+        for activity in ACTIVITIES:
+            indptr = matrices[f"{activity}.indptr"]
+            entry_rows = rows[np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))]
+            builder.matrices[activity].add_many(entry_rows, columns[matrices[f"{activity}.indices"]],
+                                                matrices[f"{activity}.data"])
+    return builder.build()
+
+
+def save_tag_matrices(matrices, store_dir=FEATURES_STORE, delta=None):
+    """
+    Write the matrices to a feature store, replacing the previous one atomically.
+
+    Args:
+        delta (dict): The high-water marks of the dump the matrices cover: those of the dump's
+                      state.json for a full build (see dump_high_water), or of the last delta
+                      merged in (see updateFeatures.py). Saved in the manifest.
+    """
+    os.makedirs(os.path.dirname(os.path.normpath(store_dir)) or ".", exist_ok=True)
+    metadata = {"activities": list(ACTIVITIES), "users": len(matrices["user_ids"]), "tags": len(matrices["tags"])}
+    if delta is not None:
+        metadata["delta"] = delta
+    return save_feature_store(matrices, store_dir, metadata)
+
+
+def dump_high_water(dump_dir):
+    """
+    The Posts.xml and Comments.xml high-water marks of the tables in dump_dir, from the
+    state.json written by collectFromDump/users.tables.py; None if it has none.
+    """
+    state_file = os.path.join(dump_dir, "state.json")
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, mode="r", encoding="utf-8") as file:
+        state = json.load(file)
+    return {"Posts.xml": state["Posts.xml"], "Comments.xml": state["Comments.xml"]}
+
+
+def load_tag_matrices(store_dir=FEATURES_STORE, mmap_mode="r"):
+    """
+    Open the matrices of a feature store. Arrays are memory mapped, not read, unless mmap_mode is None.
+
+    Returns:
+        FeatureStore: Read-only mapping with the layout of TagMatrixBuilder.build.
+    """
+    return FeatureStore(store_dir, mmap_mode)
+
+
+def extract_tag_matrices(dump_dir=DUMP_DIR, tag_badges_file=None, columnar=False):
+    """
+    Build the per-activity user x tag count matrices, reading every source table once.
+
+    Args:
+        dump_dir (str): Directory of the tables written by collectFromDump/users.tables.py.
+        tag_badges_file (str): tag_based_badges.csv, from the API or from users.badges.py.
+                               The badge matrices are empty if None.
+        columnar (bool): Read the typed npz tables (`--format npz`) instead of the CSV tables.
+
+    Returns:
+        dict: The matrices, see TagMatrixBuilder.build.
+    """
+    builder = TagMatrixBuilder()
+    if columnar:
+        builder.read_columnar(dump_dir)
+    else:
+        builder.read_questions(os.path.join(dump_dir, "users.questions.table.csv"))
+        builder.read_answers(os.path.join(dump_dir, "users.answers.table.csv"))
+        builder.read_comments(os.path.join(dump_dir, "users.comments.table.csv"))
+    if tag_badges_file:
+        builder.read_tag_badges(tag_badges_file)
+    return builder.build()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the per-activity user x tag count matrices "
+                                                 "(asked, answered, accepted, commented, tag badges).")
+    parser.add_argument("--dump-dir", default=DUMP_DIR, help="Tables written by collectFromDump/users.tables.py")
+    parser.add_argument("--columnar", action="store_true", help="Read the npz tables instead of the CSV tables")
+    parser.add_argument("--tag-badges", default=f"{ROOT_DIR}/output/api/tag_based_badges.csv",
+                        help="tag_based_badges.csv from the API or from collectFromDump/users.badges.py")
+    parser.add_argument("--output", default=FEATURES_STORE, help="Feature store directory")
+    args = parser.parse_args()
+
+    tag_badges_file = args.tag_badges if os.path.exists(args.tag_badges) else None
+    if tag_badges_file is None:
+        print(f"{args.tag_badges} not found, the badge matrices are left empty.")
+    matrices = extract_tag_matrices(args.dump_dir, tag_badges_file, args.columnar)
+    for activity in ACTIVITIES:
+        data = matrices[f"{activity}.data"]
+        print(f"{activity}: {len(data)} user/tag pairs, {int(data.sum())} occurrences")
+    # Marks the dump the store covers, so that updateFeatures.py does not merge older deltas again
+    print(f"{len(matrices['user_ids'])} users x {len(matrices['tags'])} tags saved to "
+          f"{save_tag_matrices(matrices, args.output, dump_high_water(args.dump_dir))}")
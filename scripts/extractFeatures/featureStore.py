@@ -0,0 +1,103 @@
+import os
+import json
+import shutil
+from collections.abc import Mapping
+
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def save_feature_store(arrays, store_dir, metadata=None):
+    """
+    Write arrays as a feature store: one uncompressed .npy file per array plus a manifest.
+
+    The store is written next to `store_dir` and then swapped in, so readers never see a
+    partly written store.
+
+    Args:
+        arrays (dict): Array name -> numpy array. Names become file names, e.g. "asked.indptr".
+        store_dir (str): Directory of the store.
+        metadata (dict): Extra JSON-serializable entries for the manifest.
+
+    Returns:
+        str: The store directory.
+    """
+    store_dir = os.path.normpath(store_dir)
+    temp_dir = f"{store_dir}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    entries = {}
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        if values.dtype.hasobject:
+            raise ValueError(f"Array '{name}' has dtype object, which cannot be memory mapped")
+        file_name = f"{name}.npy"
+        np.save(os.path.join(temp_dir, file_name), values, allow_pickle=False)
+        entries[name] = {"file": file_name, "dtype": values.dtype.str, "shape": list(values.shape)}
+
+    manifest = {"version": FORMAT_VERSION, **(metadata or {}), "arrays": entries}
+    with open(os.path.join(temp_dir, MANIFEST_FILE), mode="w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=4)
+
+    old_dir = f"{store_dir}.old"
+    if os.path.exists(store_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(store_dir, old_dir)
+    os.replace(temp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return store_dir
+
+
+class FeatureStore(Mapping):
+    """
+    Read-only view of a feature store written by save_feature_store.
+
+    Arrays are memory mapped on first access: opening a store only reads the manifest, and
+    pages of an array are read from disk when they are touched. The store behaves as a dict of
+    arrays, so it can be passed wherever the in-memory matrices are expected.
+
+    Args:
+        store_dir (str): Directory of the store.
+        mmap_mode (str): Passed to np.load. "r" (default) maps read-only; None reads into memory.
+    """
+
+    def __init__(self, store_dir, mmap_mode="r"):
+        manifest_file = os.path.join(store_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_file):
+            raise FileNotFoundError(f"No feature store at {store_dir} ({MANIFEST_FILE} is missing)")
+        with open(manifest_file, mode="r", encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{store_dir} has feature store version {self.manifest.get('version')}, "
+                             f"expected {FORMAT_VERSION}")
+        self.store_dir = store_dir
+        self.mmap_mode = mmap_mode
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        values = self._arrays.get(name)
+        if values is None:
+            entry = self.manifest["arrays"][name]
+            values = np.load(os.path.join(self.store_dir, entry["file"]), mmap_mode=self.mmap_mode,
+                             allow_pickle=False)
+            if values.dtype.str != entry["dtype"] or list(values.shape) != entry["shape"]:
+                raise ValueError(f"{entry['file']} does not match the manifest of {self.store_dir}")
+            self._arrays[name] = values
+        return values
+
+    def __iter__(self):
+        return iter(self.manifest["arrays"])
+
+    def __len__(self):
+        return len(self.manifest["arrays"])
+
+    def csr(self, name):
+        """
+        Returns:
+            tuple: The (indptr, indices, data) arrays of a CSR matrix stored as
+                   f"{name}.indptr", f"{name}.indices" and f"{name}.data".
+        """
+        return self[f"{name}.indptr"], self[f"{name}.indices"], self[f"{name}.data"]
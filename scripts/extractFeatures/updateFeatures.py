@@ -0,0 +1,126 @@
+import argparse
+import os
+import json
+
+import numpy as np
+
+from extractTagMatrices import (ACTIVITIES, FEATURES_STORE, TagMatrixBuilder, load_tag_matrices, merge_tag_matrices,
+                                save_tag_matrices)
+
+# Root directory
+ROOT_DIR = "../.."
+
+# Delta tables written by collectFromDump/users.tables.py --incremental
+DELTA_DIR = f"{ROOT_DIR}/output/dump/delta"
+FEATURES_DIR = f"{ROOT_DIR}/output/features"
+
+
+def read_delta_matrices(delta_dir):
+    """
+    Count the new tags per user and activity from the delta tables.
+
+    Returns:
+        dict: The delta matrices, in the layout of extractTagMatrices.TagMatrixBuilder.build.
+    """
+    builder = TagMatrixBuilder()
+    builder.read_questions(os.path.join(delta_dir, "users.questions.table.csv"))
+    builder.read_answers(os.path.join(delta_dir, "users.answers.table.csv"))
+    builder.read_comments(os.path.join(delta_dir, "users.comments.table.csv"))
+    return builder.build()
+
+
+def read_delta_marks(delta_dir):
+    """
+    The high-water marks the delta tables go from and to, saved by users.tables.py --incremental.
+
+    Raises:
+        ValueError: If delta.json is missing, i.e. there is no complete delta in delta_dir.
+    """
+    delta_file = os.path.join(delta_dir, "delta.json")
+    if not os.path.exists(delta_file):
+        raise ValueError(f"{delta_file} not found: run collectFromDump/users.tables.py --incremental "
+                         f"(again, if it was interrupted)")
+    with open(delta_file, mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_changed_users(delta_dir):
+    """
+    Ids of the users whose behavioral columns changed in the delta's users table, listed by
+    users.tables.py --incremental in changed_users.txt. Empty if it was run without --users.
+    """
+    changed_file = os.path.join(delta_dir, "changed_users.txt")
+    if not os.path.exists(changed_file):
+        return np.array([], dtype=np.int64)
+    return np.loadtxt(changed_file, dtype=np.int64, ndmin=1)
+
+
+def update_features(delta_dir=DELTA_DIR, features_dir=FEATURES_DIR):
+    """
+    Fold the delta tables of an incremental dump run into the user x tag count matrices.
+
+    The delta's high-water marks are saved in the store's manifest, like the dump's marks by a
+    full build (extractTagMatrices.py), so a delta the store already covers is not counted twice.
+
+    The users whose tags changed are listed together with those whose behavioral columns changed
+    (the delta's changed_users.txt).
+
+    Returns:
+        list: Ids of the users whose features changed, also written to changed_users.txt
+              so that only their index entries need to be refreshed. None if the delta was
+              already merged; changed_users.txt then still lists its users.
+
+    Raises:
+        ValueError: If the store already covers part of the delta, or the delta does not start
+                    where the store ends.
+    """
+    store_dir = os.path.join(features_dir, os.path.basename(FEATURES_STORE))
+    marks = read_delta_marks(delta_dir)
+    store = load_tag_matrices(store_dir) if os.path.exists(store_dir) else None
+    applied = store.manifest.get("delta") if store is not None else None
+    no_new_rows = marks["from"] == marks["to"]  # Only the users table changed
+    if applied == marks["to"] and not no_new_rows:
+        print(f"The delta in {delta_dir} is already merged into {store_dir}.")
+        return None
+    if applied is not None and applied != marks["to"] and all(marks["to"][name]["max_id"] <= applied[name]["max_id"] for name in applied):
+        raise ValueError(f"{store_dir} already covers the delta in {delta_dir} (up to {marks['to']}): it was "
+                         f"built or updated up to {applied}")
+    if applied is not None and applied != marks["from"]:
+        raise ValueError(f"The delta in {delta_dir} starts at {marks['from']}, but {store_dir} was last updated "
+                         f"to {applied}")
+
+    delta = read_delta_matrices(delta_dir)
+    changed = np.zeros(len(delta["user_ids"]), dtype=bool)
+    for activity in ACTIVITIES:
+        new_entries = np.diff(delta[f"{activity}.indptr"]) > 0
+        changed |= new_entries
+        print(f"Updated {activity}: {int(new_entries.sum())} users with new tags.")
+
+    behavioral = read_changed_users(delta_dir)
+    print(f"{len(behavioral)} users with changed behavioral features.")
+
+    # Written before the store, so that an interrupted update is simply run again
+    changed_users = [int(user_id) for user_id in np.union1d(delta["user_ids"][changed], behavioral)]
+    os.makedirs(features_dir, exist_ok=True)
+    with open(os.path.join(features_dir, "changed_users.txt"), mode='w', encoding='utf-8') as file:
+        file.writelines(f"{user_id}\n" for user_id in changed_users)
+    print(f"{len(changed_users)} changed users written to {features_dir}/changed_users.txt")
+
+    if not no_new_rows or store is None:
+        matrices = merge_tag_matrices(store, delta) if store is not None else delta
+        save_tag_matrices(matrices, store_dir, delta=marks["to"])
+    return changed_users
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold the delta tables of users.tables.py --incremental into the "
+                                                 "user x tag count matrices.")
+    parser.add_argument("--delta-dir", default=DELTA_DIR, help="Delta tables and delta.json of the incremental run")
+    parser.add_argument("--features-dir", default=FEATURES_DIR,
+                        help="Directory of the feature store (users_tags/) and changed_users.txt")
+    args = parser.parse_args()
+
+    try:
+        update_features(args.delta_dir, args.features_dir)
+    except ValueError as error:
+        parser.error(str(error))
@@ -1,12 +1,100 @@
+import os
+import sys
+import time
+import argparse
 import faiss
 import numpy as np
-import pickle
-import json
-from functools import reduce
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extractFeatures"))
+from featureStore import FeatureStore
+from tagProjection import METHODS, TagProjection, random_projection, randomized_svd
+from indexFactory import (DEFAULT_CONFIG, INDEX_TYPES, create_index, index_config, index_ids, load_index_config,
+                          reserve, save_index_config, set_search_params, supports_removal, training_sample)
+
 # File paths
 ROOT_DIR = "../.."  # Adjust the root directory as needed
+FEATURES_STORE = f"{ROOT_DIR}/output/features/users_tags"
+PROJECTION_STORE = f"{ROOT_DIR}/output/index/tag_projection"
+INDEX_FILE = f"{ROOT_DIR}/output/index/user_index.faiss"
+
+# float32 values per dense block of topical features (64 MiB)
+BLOCK_VALUES = 1 << 24
+
+# Length of extract_behavioral_features, the first columns of every user vector
+BEHAVIORAL_DIMENSION = 10
+
+# Norm of the scaled behavioral part of a vector next to the unit topical part, and the
+# percentile the behavioral features are capped at (see behavioral_scaling)
+BEHAVIORAL_WEIGHT = 0.2
+BEHAVIORAL_CAP_PERCENTILE = 90
+
+# Seconds between two progress lines of the index build
+PROGRESS_INTERVAL = 5
+
+# Weight of every user x tag activity matrix in the topical features: tag badges 3 (times the
+# badge rank: gold 3, silver 2, bronze 1), answered 3, accepted 5, commented 1, asked 1
+TOPICAL_WEIGHTS = {
+    "gold_badges": 3 * 3,
+    "silver_badges": 3 * 2,
+    "bronze_badges": 3 * 1,
+    "answered": 3,
+    "accepted": 5,
+    "commented": 1,
+    "asked": 1,
+}
+
+# Columns of the users table built by collectFromDump/users.tables.py --users, by user_data key
+USERS_TABLE_COLUMNS = {
+    "UserId": "user_id",
+    "Reputation": "reputation",
+    "GoldBadges": "gold_badges",
+    "SilverBadges": "silver_badges",
+    "BronzeBadges": "bronze_badges",
+    "AcceptedAnswerCount": "accepted_answers_count",
+    "AnswerCount": "total_answers_count",
+    "AnswerAcceptanceRatio": "answer_acceptance_ratio",
+    "CommentCount": "comment_count",
+    "QuestionScoreMean": "question_score_mean",
+    "AnswerScoreMean": "answer_score_mean",
+}
+
+# Behavioral columns of load_users_table, in the order of extract_behavioral_features
+BEHAVIORAL_COLUMNS = [key for key in USERS_TABLE_COLUMNS.values() if key != "user_id"]
+
+# Step 0: Load user data
+def load_users_table(users_table):
+    """
+    Load the per-user behavioral table written from the dump (users.table.csv, users.npz or
+    users.parquet) as a DataFrame, with the columns renamed to the user_data keys.
+
+    The table stays columnar: an int64 user_id column and float32 BEHAVIORAL_COLUMNS, about
+    48 bytes per user. The index build slices it block by block.
+    """
+    columns = list(USERS_TABLE_COLUMNS)
+    dtypes = {column: np.int64 if key == "user_id" else np.float32 for column, key in USERS_TABLE_COLUMNS.items()}
+    if users_table.endswith(".npz"):
+        with np.load(users_table) as archive:
+            df = pd.DataFrame({column: archive[column].astype(dtypes[column], copy=False) for column in columns})
+    elif users_table.endswith(".parquet"):
+        df = pd.read_parquet(users_table, columns=columns).astype(dtypes)
+    else:
+        df = pd.read_csv(users_table, usecols=columns, dtype=dtypes)
+    return df.rename(columns=USERS_TABLE_COLUMNS)
+
+
+def load_user_data(users_table):
+    """
+    Load the per-user behavioral table as user_data dicts for extract_behavioral_features and
+    user_to_vector. The index build uses the columnar load_users_table instead.
+
+    Args:
+        users_table (str): Path to the users table.
+
+    Returns:
+        list: One dict per user, keyed like the user_data of extract_behavioral_features.
+    """
+    return load_users_table(users_table).to_dict("records")
 
 # Step 1: Extract behavioral features
 def extract_behavioral_features(user_data):
@@ -22,163 +110,454 @@ def extract_behavioral_features(user_data):
         user_data.get("total_answers_count", 0),
         user_data.get("answer_acceptance_ratio", 0.0),
         user_data.get("comment_count", 0),
-        np.mean(user_data.get("question_scores", [0])),
-        np.mean(user_data.get("answer_scores", [0])),
+        user_data.get("question_score_mean", np.mean(user_data.get("question_scores", [0]))),
+        user_data.get("answer_score_mean", np.mean(user_data.get("answer_scores", [0]))),
     ]
 
 # Step 2: Extract topical features
-def extract_topical_features():
-    """
-    Extract topical features for a user by reading data from JSON files.
-    """
-    # File paths for the JSON files
-    accepted_answers_file = f"{ROOT_DIR}/output/features/users_accepted_answers_tags.json"
-    answers_file = f"{ROOT_DIR}/output/features/users_answers_tags.json"
-    comments_file = f"{ROOT_DIR}/output/features/users_comments_tags.json"
-    questions_file = f"{ROOT_DIR}/output/features/users_questions_tags.json"
-    tag_badges_file = f"{ROOT_DIR}/output/features/users_tag_badges.json"
-
-    # Load data from JSON files
-    with open(accepted_answers_file, "r", encoding="utf-8") as f:
-        accepted_answers_tags_data = json.load(f)
-    with open(answers_file, "r", encoding="utf-8") as f:
-        answers_tags_data = json.load(f)
-    with open(comments_file, "r", encoding="utf-8") as f:
-        comments_tags_data = json.load(f)
-    with open(questions_file, "r", encoding="utf-8") as f:
-        questions_tags_data = json.load(f)
-    with open(tag_badges_file, "r", encoding="utf-8") as f:
-        tag_badges_data = json.load(f)
-
-    # Define weights for "badge name", "badge rank", and "award count"
-    weights = {"badge_name": 0.4, "badge_rank": 0.3, "award_count": 0.3}
-
-    # Flatten the JSON structure and calculate the weighted sum
-    flattened_data = []
-    for user_id, badge_info in tag_badges_data.items():
-        weighted_sum = 0
-        for badge in badge_info:
-            badge_name_weight = len(badge[0]) * weights["badge_name"]  # Example: weight by string length
-            badge_rank_weight = {"gold": 3, "silver": 2, "bronze": 1}.get(badge[1].lower(), 0) * weights["badge_rank"]
-            award_count_weight = int(badge[2]) * weights["award_count"]
-            weighted_sum += badge_name_weight + badge_rank_weight + award_count_weight
-        flattened_data.append({"user_id": user_id, "weighted_value": weighted_sum})
-
-    # Convert the data to dataframes
-    df_tag_badges = pd.DataFrame(tag_badges_data).T.reset_index()
-    df_tag_badges.columns = ["user_id", "tag_badges"]
-    df_tags_answered = pd.DataFrame(answers_tags_data).T.reset_index()
-    df_tags_answered.columns = ["user_id", "tags_answered"]
-    df_tags_accepted = pd.DataFrame(accepted_answers_tags_data).T.reset_index()
-    df_tags_accepted.columns = ["user_id", "tags_accepted"]
-    df_tags_commented = pd.DataFrame(comments_tags_data).T.reset_index()
-    df_tags_commented.columns = ["user_id", "tags_commented"]
-    df_tags_asked = pd.DataFrame(questions_tags_data).T.reset_index()
-    df_tags_asked.columns = ["user_id", "tags_asked"]
-
-    # Add a weight column to each DataFrame
-    weights = {
-        "tag_badges": 3,
-        "tags_answered": 3,
-        "tags_accepted": 5,
-        "tags_commented": 1,
-        "tags_asked": 1,
-    }
-    df_tag_badges["weight"] = weights["tag_badges"]
-    df_tags_answered["weight"] = weights["tags_answered"]
-    df_tags_accepted["weight"] = weights["tags_accepted"]
-    df_tags_commented["weight"] = weights["tags_commented"]
-    df_tags_asked["weight"] = weights["tags_asked"]
-
-    # List of DataFrames
-    frames = [df_tag_badges, df_tags_answered, df_tags_accepted, df_tags_commented, df_tags_asked]
-
-    # Merge all DataFrames using reduce
-    merged_df = reduce(lambda left, right: pd.concat([left, right], ignore_index=True), frames)
-
-    # Print the merged DataFrame for debugging
-    print("Merged DataFrame:")
-    print(merged_df)
+def tag_idf(store):
+    """
+    Smoothed inverse document frequency of every tag: log((1 + users) / (1 + users with the tag)) + 1,
+    where a user has a tag if any activity matrix has an entry for it.
+
+    Args:
+        store (FeatureStore): User x tag matrices written by extractFeatures/extractTagMatrices.py.
+
+    Returns:
+        ndarray: float32 weight per tag column.
+    """
+    user_count = len(store["user_ids"])
+    keys = []
+    for activity in TOPICAL_WEIGHTS:
+        indptr, indices, _ = store.csr(activity)
+        rows = np.repeat(np.arange(user_count, dtype=np.int64), np.diff(indptr))
+        keys.append(rows << 32 | indices)
+    tag_users = np.bincount(np.unique(np.concatenate(keys)) & 0xFFFFFFFF, minlength=len(store["tags"]))
+    return (np.log((1 + user_count) / (1 + tag_users)) + 1).astype(np.float32)
+
+
+def extract_topical_features(store, rows, idf, out=None):
+    """
+    Weighted TF-IDF tag profiles of a batch of users, as one dense block.
+
+    The activity matrices are combined with TOPICAL_WEIGHTS (tag badges 3, answered 3, accepted 5,
+    commented 1, asked 1; badges further weighted by rank), damped with log(1 + count), scaled
+    by the tag IDF and L2-normalized per user.
+
+    Args:
+        store (FeatureStore): User x tag matrices written by extractFeatures/extractTagMatrices.py.
+        rows (ndarray): Row numbers in the store (i.e. positions in store["user_ids"]). Rows of -1
+                        (users without any tagged activity) get a zero profile.
+        idf (ndarray): Tag weights from tag_idf.
+        out (ndarray): Optional preallocated float32 block (or view) of that shape to write into.
+
+    Returns:
+        ndarray: float32 array of shape (len(rows), number of tags).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if out is None:
+        features = np.zeros((len(rows), len(idf)), dtype=np.float32)
+    else:
+        features = out
+        features.fill(0)
+    batch_rows = np.flatnonzero(rows >= 0)
+    for activity, weight in TOPICAL_WEIGHTS.items():
+        indptr, indices, data = store.csr(activity)
+        starts = indptr[rows[batch_rows]]
+        lengths = indptr[rows[batch_rows] + 1] - starts
+        # Positions of the entries of every selected row, in row order
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        # Each activity has at most one entry per (user, tag), so the fancy-index add has no duplicates
+        features[np.repeat(batch_rows, lengths), indices[positions]] += weight * data[positions]
+    np.log1p(features, out=features)
+    features *= idf
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    np.divide(features, norms, out=features, where=norms > 0)
+    return features
+
+
+def topical_blocks(store, idf, block_values=BLOCK_VALUES):
+    """
+    Topical features of every user in the store, as consecutive dense blocks of rows.
+    """
+    user_count = len(store["user_ids"])
+    batch_size = max(1, block_values // max(len(idf), 1))
+    for start in range(0, user_count, batch_size):
+        yield extract_topical_features(store, np.arange(start, min(start + batch_size, user_count)), idf)
+
+
+def encode_tags(tag_sets, tags, idf):
+    """
+    Topical features of query tag sets (e.g. the tags of a new question), in the same space as
+    extract_topical_features: each tag counts once, scaled by its IDF, L2-normalized.
+
+    Args:
+        tag_sets (list): One list of tag names per query. Unknown tags are ignored.
+        tags (ndarray): Sorted tag vocabulary, e.g. store["tags"] or TagProjection.tags.
+        idf (ndarray): Tag weights over `tags`.
+
+    Returns:
+        ndarray: float32 array of shape (len(tag_sets), len(tags)).
+    """
+    features = np.zeros((len(tag_sets), len(tags)), dtype=np.float32)
+    for row, tag_set in enumerate(tag_sets):
+        # Not cast to the vocabulary's dtype, which would truncate longer names into false matches
+        tag_set = np.array(sorted(set(tag_set)), dtype=str)
+        if len(tag_set) == 0 or len(tags) == 0:
+            continue
+        columns = np.minimum(np.searchsorted(tags, tag_set), len(tags) - 1)
+        columns = columns[tags[columns] == tag_set]
+        features[row, columns] = np.log1p(1) * idf[columns]
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    np.divide(features, norms, out=features, where=norms > 0)
+    return features
+
+
+def fit_tag_projection(store, dimension, method="svd", seed=0):
+    """
+    Fit a projection of the topical features to `dimension` columns.
+
+    Args:
+        store (FeatureStore): User x tag matrices.
+        dimension (int): Target dimension.
+        method (str): "svd" for a randomized truncated SVD of the users x tags TF-IDF matrix (streamed
+                      in blocks), or "random" for a sparse random projection (no pass over the data).
+        seed (int): Random seed.
+
+    Returns:
+        TagProjection: The projection, with the tag vocabulary and IDF it was fitted with.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown reduction method '{method}', expected one of {METHODS}")
+    idf = tag_idf(store)
+    if method == "svd":
+        components = randomized_svd(lambda: topical_blocks(store, idf), len(idf), dimension, seed)
+    else:
+        components = random_projection(len(idf), dimension, seed)
+    return TagProjection(components, np.asarray(store["tags"]), idf, method)
+
+
+def store_rows(store, user_ids):
+    """
+    Row numbers of user ids in a feature store, -1 for users it does not have.
+    """
+    store_user_ids = store["user_ids"]  # Sorted
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    if len(store_user_ids) == 0:
+        return np.full(len(user_ids), -1, dtype=np.int64)
+    rows = np.minimum(np.searchsorted(store_user_ids, user_ids), len(store_user_ids) - 1)
+    return np.where(store_user_ids[rows] == user_ids, rows, -1)
 
 # Step 3: Convert user to vector
-def user_to_vector(user_data):
+def behavioral_scaling(users, weight=BEHAVIORAL_WEIGHT, cap_percentile=BEHAVIORAL_CAP_PERCENTILE):
+    """
+    Cap, mean and scale of the behavioral features, saved with the index's projection.
+
+    Every feature is capped at its cap_percentile over the users, then standardized and divided by
+    sqrt(BEHAVIORAL_DIMENSION) / weight, so that the behavioral part of a vector has an expected
+    squared norm of weight ** 2 next to the L2-normalized topical part. The tags then decide which
+    users a question gets, and the behavioral features only order users of similar topics.
+    The queries' profile is the same percentile (recommender.PROFILE_PERCENTILE), so the users
+    above it are not pushed back for being more active than the profile.
+
+    Args:
+        users (DataFrame): Users table, from load_users_table.
+        weight (float): Norm of the behavioral part relative to the topical part.
+        cap_percentile (float): Percentile of every feature it is capped at.
+
+    Returns:
+        tuple: (mean, scale, cap) float32 arrays in the order of extract_behavioral_features.
+    """
+    mean = np.zeros(BEHAVIORAL_DIMENSION)
+    std = np.ones(BEHAVIORAL_DIMENSION)
+    cap = np.full(BEHAVIORAL_DIMENSION, np.inf)
+    for column, key in enumerate(BEHAVIORAL_COLUMNS):
+        values = users[key].to_numpy(dtype=np.float64)
+        if len(values):
+            cap[column] = np.percentile(values, cap_percentile)
+            values = np.minimum(values, cap[column])
+            mean[column] = values.mean()
+            std[column] = values.std() or 1.0  # Constant features stay at 0
+    scale = std * np.sqrt(BEHAVIORAL_DIMENSION) / weight
+    return mean.astype(np.float32), scale.astype(np.float32), cap.astype(np.float32)
+
+
+def user_to_vector(user_data, topical_features, projection=None):
     """
     Combine behavioral and topical features into a dense vector.
+
+    Args:
+        user_data (dict): Behavioral fields of the user, see extract_behavioral_features.
+        topical_features (ndarray): The user's row of extract_topical_features (projected, if
+                                    the index has a projection).
+        projection (TagProjection): The index's projection, for its behavioral scaling.
+    """
+    behavioral_features = np.asarray(extract_behavioral_features(user_data), dtype=np.float32)
+    if projection is not None:
+        projection.scale_behavioral(behavioral_features)
+    return np.concatenate([behavioral_features, topical_features]).astype(np.float32, copy=False)
+
+def vector_dimension(store, projection=None):
+    """
+    Dimension of the user vectors: the behavioral features, then one topical feature per tag
+    of the store (or projection.dimension of them).
+    """
+    return BEHAVIORAL_DIMENSION + (len(store["tags"]) if projection is None else projection.dimension)
+
+
+def topical_idf(store, projection=None):
+    """
+    Tag weights of the topical features: the store's own, or those the projection was fitted with.
+    """
+    return tag_idf(store) if projection is None else projection.idf_over(store["tags"])
+
+
+def fill_user_vectors(out, users, store, rows, idf, projection=None):
+    """
+    Write the vectors of a batch of users into a preallocated block, as user_to_vector.
+
+    Args:
+        out (ndarray): float32 block of shape (len(users), vector_dimension(store, projection)).
+        users (DataFrame): Rows of load_users_table for the batch.
+        store (FeatureStore): Feature store with the user x tag matrices.
+        rows (ndarray): Store rows of the users, from store_rows.
+        idf (ndarray): Tag weights, from topical_idf.
+        projection (TagProjection): Optional reduction of the topical features, and scaling of
+                                    the behavioral ones.
+
+    Returns:
+        ndarray: out.
+    """
+    for column, key in enumerate(BEHAVIORAL_COLUMNS):
+        out[:, column] = users[key].to_numpy()
+    if projection is not None:
+        projection.scale_behavioral(out[:, :BEHAVIORAL_DIMENSION])
+    if projection is None:
+        extract_topical_features(store, rows, idf, out[:, BEHAVIORAL_DIMENSION:])
+    else:
+        out[:, BEHAVIORAL_DIMENSION:] = projection.transform(extract_topical_features(store, rows, idf), store["tags"])
+    return out
+
+
+def user_vector_blocks(users, store, idf, projection=None, out=None, block_values=BLOCK_VALUES):
     """
-    behavioral_features = extract_behavioral_features(user_data)
-    topical_features = extract_topical_features(user_data)
-    return np.array(behavioral_features + topical_features, dtype=np.float32)
+    The vectors of many users, as consecutive blocks of rows. A block holds about block_values
+    floats of dense topical features, so memory does not grow with the number of users.
+
+    Args:
+        users (DataFrame): Users table, from load_users_table.
+        store (FeatureStore): Feature store with the user x tag matrices.
+        idf (ndarray): Tag weights, from topical_idf.
+        projection (TagProjection): Optional reduction of the topical features.
+        out (ndarray): Optional preallocated float32 array of shape (len(users), dimension), e.g.
+                       a np.lib.format.open_memmap; the blocks are then views of it. Otherwise every
+                       block is written into the same buffer and is only valid until the next one.
+
+    Yields:
+        tuple: (position of the block's first user in users, float32 block of vectors).
+    """
+    dimension = vector_dimension(store, projection)
+    batch_size = max(1, block_values // max(len(store["tags"]), dimension))
+    rows = store_rows(store, users["user_id"].to_numpy())
+    buffer = np.empty((min(batch_size, len(users)), dimension), dtype=np.float32) if out is None else out
+    for start in range(0, len(users), batch_size):
+        stop = min(start + batch_size, len(users))
+        block = buffer[:stop - start] if out is None else out[start:stop]
+        yield start, fill_user_vectors(block, users.iloc[start:stop], store, rows[start:stop], idf, projection)
+
+
+def users_to_vectors(users, store_dir=FEATURES_STORE, projection=None, out=None):
+    """
+    The vectors of many users at once, as user_to_vector.
+
+    Args:
+        users (DataFrame): Users table, from load_users_table.
+        store_dir (str): Feature store with the user x tag matrices.
+        projection (TagProjection): Optional reduction of the topical features to
+                                    projection.dimension columns (see fit_tag_projection).
+        out (ndarray): Optional preallocated float32 array to write into, e.g. a memory map.
+
+    Returns:
+        ndarray: float32 array with one row per user.
+    """
+    store = FeatureStore(store_dir)
+    if out is None:
+        out = np.empty((len(users), vector_dimension(store, projection)), dtype=np.float32)
+    for _ in user_vector_blocks(users, store, topical_idf(store, projection), projection, out):
+        pass  # Every block is written into out
+    return out
 
 # Step 4: Create FAISS index
-def create_faiss_index(user_data):
+def add_user_vectors(index, users, store, idf, projection=None, progress=True):
+    """
+    Add the vectors of users to an index under their user ids, one block at a time.
+
+    Args:
+        index (faiss.Index): Trained index from indexFactory.create_index.
+        users (DataFrame): Users table, from load_users_table.
+        store (FeatureStore): Feature store with the user x tag matrices.
+        idf (ndarray): Tag weights, from topical_idf.
+        projection (TagProjection): Optional reduction of the topical features.
+        progress (bool): Print the number of users added and the throughput every few seconds.
+    """
+    user_ids = users["user_id"].to_numpy(dtype=np.int64)
+    start_time = last_report = time.perf_counter()
+    for start, block in user_vector_blocks(users, store, idf, projection):
+        index.add_with_ids(block, user_ids[start:start + len(block)])
+        now = time.perf_counter()
+        added = start + len(block)
+        if progress and (now - last_report >= PROGRESS_INTERVAL or added == len(users)):
+            print(f"Added {added}/{len(users)} users ({added / max(now - start_time, 1e-9):.0f} users/s)")
+            last_report = now
+
+
+def create_faiss_index(users, store_dir=FEATURES_STORE, projection=None, config=None, progress=True):
     """
-    Create a FAISS index for user data.
+    Create a FAISS index for user data. Every vector is stored under its Stack Exchange user id,
+    which searches return in place of positions.
+
+    The vectors are built block by block into a reused buffer and added to the index as they
+    come, so memory stays close to the size of the index itself.
+
+    Args:
+        users (DataFrame): Users table, from load_users_table.
+        store_dir (str): Feature store with the user x tag matrices.
+        projection (TagProjection): Optional reduction of the topical features (see users_to_vectors).
+                                    Pass TagProjection.identity to fix the tag vocabulary without
+                                    reducing it, so that the index can be updated later. Set its
+                                    behavioral scaling (see behavioral_scaling) before building.
+        config (dict): Index type and parameters from indexFactory.index_config. Flat by default.
+        progress (bool): Print the number of users added and the throughput every few seconds.
     """
-    user_vectors = []
-    user_ids = []
-    for user in user_data:
-        user_id = user["user_id"]
-        user_vector = user_to_vector(user)
-        user_vectors.append(user_vector)
-        user_ids.append(user_id)
+    store = FeatureStore(store_dir)
+    idf = topical_idf(store, projection)
 
     # Create FAISS index
-    dimension = len(user_vectors[0])  # Vector dimension
-    index = faiss.IndexFlatL2(dimension)  # L2 distance metric
-    index.add(np.array(user_vectors))  # Add vectors to the index
+    dimension = vector_dimension(store, projection)  # Vector dimension
+    index = create_index(config or index_config(), dimension, len(users))  # L2 distance metric
+    sample = training_sample(index, len(users))
+    if sample is not None:
+        # IVF and PQ indexes are trained on a sample; only the sampled users' vectors are built for it
+        train_vectors = np.empty((len(sample), dimension), dtype=np.float32)
+        for _ in user_vector_blocks(users.iloc[sample], store, idf, projection, train_vectors):
+            pass
+        index.train(train_vectors)
+        del train_vectors
+
+    reserve(index, len(users))
+    add_user_vectors(index, users, store, idf, projection, progress)
+    return index
+
 
-    return index, user_ids
+def update_faiss_index(index, users, store_dir=FEATURES_STORE, projection=None, progress=True):
+    """
+    Update an index in place: the vectors of users it already has are removed and re-added, and
+    the other users are added. The cost grows with the number of users given, not with the index.
+
+    Args:
+        index (faiss.Index): From create_faiss_index or load_faiss_index.
+        users (DataFrame): Rows of load_users_table for the changed and new users.
+        store_dir (str): Feature store, with the new activity folded in (extractFeatures/updateFeatures.py).
+        projection (TagProjection): The projection the index was built with (see TagProjection.load),
+                                    so that the new vectors keep its columns after the store's tag
+                                    vocabulary has grown.
+
+    Returns:
+        tuple: (number of users replaced, number of users added).
+    """
+    store = FeatureStore(store_dir)
+    if vector_dimension(store, projection) != index.d:
+        raise ValueError(f"The vectors have {vector_dimension(store, projection)} dimensions but the index has "
+                         f"{index.d}; pass the projection the index was built with")
+    user_ids = users["user_id"].to_numpy(dtype=np.int64)
+    existing = np.isin(user_ids, index_ids(index))
+    if existing.any():
+        if not supports_removal(index):
+            raise ValueError("Vectors cannot be removed from an HNSW index; rebuild it with create_faiss_index")
+        index.remove_ids(faiss.IDSelectorBatch(user_ids[existing]))
+    add_user_vectors(index, users, store, topical_idf(store, projection), projection, progress)
+    return int(existing.sum()), int(len(user_ids) - existing.sum())
 
-# Step 5: Save FAISS index and user IDs
-def save_faiss_index(index, user_ids, index_file, ids_file):
+# Step 5: Save FAISS index
+def save_faiss_index(index, index_file, config=None):
     """
-    Save the FAISS index and user IDs to disk.
+    Save the FAISS index (with the user ids of its vectors) to disk, and the index configuration
+    (with its search-time parameters) to `<index_file>.json`.
     """
+    os.makedirs(os.path.dirname(os.path.abspath(index_file)), exist_ok=True)
     faiss.write_index(index, index_file)
-    with open(ids_file, "wb") as f:
-        pickle.dump(user_ids, f)
+    save_index_config(index_file, config or index_config())
 
-# Step 6: Load FAISS index and user IDs
-def load_faiss_index(index_file, ids_file):
+# Step 6: Load FAISS index
+def load_faiss_index(index_file, mmap=False):
     """
-    Load the FAISS index and user IDs from disk.
+    Load the FAISS index from disk, with the search-time parameters it was saved with. Searches
+    return user ids; indexFactory.index_ids lists all of them.
+
+    Args:
+        index_file (str): Index file written by save_faiss_index.
+        mmap (bool): Memory map the vectors of flat and HNSW indexes instead of reading them, for
+                     serving. The index is then read-only and cannot be updated.
     """
-    index = faiss.read_index(index_file)
-    with open(ids_file, "rb") as f:
-        user_ids = pickle.load(f)
-    return index, user_ids
+    index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mmap else 0)
+    set_search_params(index, load_index_config(index_file))
+    return index
 
 # Main function to orchestrate the process
 if __name__ == "__main__":
-    # Example user data
-    user_data = [
-        {
-            "user_id": 1,
-            "reputation": 100,
-            "gold_badges": 2,
-            "silver_badges": 5,
-            "bronze_badges": 10,
-            "accepted_answers_count": 15,
-            "total_answers_count": 20,
-            "answer_acceptance_ratio": 0.75,
-            "comment_count": 50,
-            "question_scores": [5, 10, 15],
-            "answer_scores": [10, 20, 30],
-            "tag_badges": {"python": 5, "keras": 3},
-            "tags_answered": [1, 2],
-            "tags_accepted_answers": [1],
-            "tags_commented": [2],
-            "tags_asked": [3],
-        },
-        # Add more user data here
-    ]
+    parser = argparse.ArgumentParser(description="Build the FAISS index of user vectors.")
+    parser.add_argument("--users-table", default=f"{ROOT_DIR}/output/dump/users.table.csv",
+                        help="Behavioral table from collectFromDump/users.tables.py --users")
+    parser.add_argument("--features", default=FEATURES_STORE, help="Feature store from extractTagMatrices.py")
+    parser.add_argument("--dimension", type=int, default=0,
+                        help="Reduce the topical features to this many dimensions (default: no reduction)")
+    parser.add_argument("--reduction", choices=METHODS, default="svd")
+    parser.add_argument("--projection", default=PROJECTION_STORE,
+                        help="Where the projection (or the tag vocabulary, without --dimension) is saved, "
+                             "for encoding queries and updates the same way")
+    parser.add_argument("--index", default=INDEX_FILE, help="Index file")
+    parser.add_argument("--update", metavar="CHANGED_USERS",
+                        help="Update the existing index instead of rebuilding it: replace the users listed in "
+                             "this file (e.g. output/features/changed_users.txt) and add users it does not have")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=DEFAULT_CONFIG["type"],
+                        help="Exact flat index, or an approximate one (see benchmarks/benchIndexes.py)")
+    parser.add_argument("--nlist", type=int, default=DEFAULT_CONFIG["nlist"],
+                        help="Inverted lists of the IVF indexes (default: about 4 * sqrt(users))")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_CONFIG["nprobe"], help="Lists visited per IVF search")
+    parser.add_argument("--pq-m", type=int, default=DEFAULT_CONFIG["pq_m"],
+                        help="Sub-quantizers of IVF-PQ; must divide the dimension (default: about dimension / 4)")
+    parser.add_argument("--hnsw-m", type=int, default=DEFAULT_CONFIG["hnsw_m"], help="Neighbors per HNSW node")
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_CONFIG["ef_search"], help="HNSW search depth")
+    args = parser.parse_args()
 
-    # File paths
-    index_file = "user_index.faiss"
-    ids_file = "user_ids.pkl"
+    users = load_users_table(args.users_table)
 
-    # Create and save FAISS index
-    index, user_ids = create_faiss_index(user_data)
-    save_faiss_index(index, user_ids, index_file, ids_file)
+    if args.update:
+        # Update the saved index with the projection it was built with
+        index = load_faiss_index(args.index)
+        projection = TagProjection.load(args.projection)
+        with open(args.update, mode="r", encoding="utf-8") as file:
+            changed_users = np.array([int(line) for line in file if line.strip()], dtype=np.int64)
+        user_ids = users["user_id"].to_numpy()
+        users = users[np.isin(user_ids, changed_users) | ~np.isin(user_ids, index_ids(index))]
+        replaced, added = update_faiss_index(index, users, args.features, projection)
+        save_faiss_index(index, args.index, load_index_config(args.index))
+        print(f"FAISS index {args.index} updated: {replaced} users replaced, {added} users added")
+    else:
+        store = FeatureStore(args.features)
+        if args.dimension:
+            projection = fit_tag_projection(store, args.dimension, args.reduction)
+        else:
+            projection = TagProjection.identity(store["tags"], tag_idf(store))
+        (projection.behavioral_mean, projection.behavioral_scale,
+         projection.behavioral_cap) = behavioral_scaling(users)
+        os.makedirs(os.path.dirname(os.path.normpath(args.projection)), exist_ok=True)
+        print(f"{projection.method} projection to {projection.dimension} dimensions saved to "
+              f"{projection.save(args.projection)}")
 
-    print(f"FAISS index saved to {index_file} and user IDs saved to {ids_file}")
\ No newline at end of file
+        # Create and save FAISS index
+        config = index_config(args.index_type, nlist=args.nlist, nprobe=args.nprobe, pq_m=args.pq_m,
+                              hnsw_m=args.hnsw_m, ef_search=args.ef_search)
+        index = create_faiss_index(users, args.features, projection, config)
+        save_faiss_index(index, args.index, config)
+        print(f"FAISS index of {index.ntotal} users saved to {args.index}")
@@ -0,0 +1,197 @@
+import os
+import json
+import math
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Defaults of the index parameters. nlist 0 picks about 4 * sqrt(vectors) lists; pq_m 0 picks
+# the largest divisor of the dimension that is at most dimension / 4 (and at most 64).
+DEFAULT_CONFIG = {
+    "type": "flat",
+    "nlist": 0,
+    "nprobe": 16,
+    "pq_m": 0,
+    "pq_nbits": 8,
+    "hnsw_m": 32,
+    "ef_construction": 40,
+    "ef_search": 64,
+}
+
+# Training vectors per inverted list (faiss warns below 39), and the overall cap
+TRAIN_PER_LIST = 64
+MAX_TRAIN_SAMPLE = 1 << 18
+
+
+def index_config(index_type="flat", **params):
+    """
+    A complete index configuration: DEFAULT_CONFIG updated with the given parameters.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    unknown = set(params) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown index parameters: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_CONFIG, **params, "type": index_type}
+
+
+def _nlist(config, vector_count):
+    return config["nlist"] or max(1, min(int(4 * math.sqrt(vector_count)), vector_count // 39 or 1))
+
+
+def _pq_m(config, dimension):
+    if config["pq_m"]:
+        if dimension % config["pq_m"]:
+            raise ValueError(f"pq_m={config['pq_m']} does not divide the dimension {dimension}")
+        return config["pq_m"]
+    return max(m for m in range(1, min(64, max(dimension // 4, 1)) + 1) if dimension % m == 0)
+
+
+def factory_string(config, dimension, vector_count):
+    """
+    The faiss.index_factory description of a configuration, e.g. "IVF1024,PQ16x8" or "IDMap,HNSW32".
+
+    Flat and HNSW indexes are wrapped in an IDMap so that, like the IVF indexes, they store the
+    Stack Exchange user id of every vector and return it from searches.
+    """
+    index_type = config["type"]
+    if index_type == "flat":
+        return "IDMap,Flat"
+    if index_type == "hnsw":
+        return f"IDMap,HNSW{config['hnsw_m']}"
+    nlist = _nlist(config, vector_count)
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    # Each codebook of 2 ** nbits centroids needs about 39 training vectors per centroid
+    nbits = min(config["pq_nbits"], max(1, int(math.log2(max(vector_count // 39, 2)))))
+    return f"IVF{nlist},PQ{_pq_m(config, dimension)}x{nbits}"
+
+
+def unwrap(index):
+    """
+    The index inside an IDMap (or the index itself), as its concrete faiss class.
+    """
+    index = faiss.downcast_index(index)
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def supports_removal(index):
+    """
+    Whether vectors can be removed from an index (faiss cannot remove them from an HNSW graph).
+    """
+    return not isinstance(unwrap(index), faiss.IndexHNSW)
+
+
+def index_ids(index):
+    """
+    Returns:
+        ndarray: int64 ids of all the vectors of an index, in no particular order.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map).astype(np.int64, copy=False)
+    invlists = faiss.extract_index_ivf(index).invlists
+    return np.concatenate([np.zeros(0, dtype=np.int64)] + [
+        faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+        for list_no in range(invlists.nlist) if invlists.list_size(list_no)
+    ])
+
+
+def set_search_params(index, config):
+    """
+    Apply the search-time knobs of a configuration (nprobe for IVF, efSearch for HNSW) to an index.
+    """
+    index = unwrap(index)
+    if config["type"] in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = config["nprobe"]
+    elif config["type"] == "hnsw":
+        index.hnsw.efSearch = config["ef_search"]
+
+
+def create_index(config, dimension, vector_count):
+    """
+    Create an empty (untrained) L2 index for a configuration. Vectors are added with their ids
+    (index.add_with_ids), and searches return those ids.
+
+    Args:
+        config (dict): From index_config.
+        dimension (int): Vector dimension.
+        vector_count (int): Expected number of vectors, used to size the IVF lists.
+    """
+    index = faiss.index_factory(dimension, factory_string(config, dimension, vector_count), faiss.METRIC_L2)
+    if config["type"] == "hnsw":
+        unwrap(index).hnsw.efConstruction = config["ef_construction"]
+    set_search_params(index, config)
+    return index
+
+
+def reserve(index, vector_count):
+    """
+    Allocate the storage of a flat index (or of the flat storage of an HNSW index) for vector_count
+    vectors up front, so that adding them in blocks does not repeatedly grow and copy it. Other
+    index types are left as they are.
+    """
+    if index.ntotal:
+        return
+    # The underlying std::vectors keep their capacity when shrunk back
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index.id_map.resize(vector_count)
+        index.id_map.resize(0)
+    storage = unwrap(index)
+    storage = faiss.downcast_index(storage.storage) if isinstance(storage, faiss.IndexHNSW) else storage
+    if isinstance(storage, faiss.IndexFlatCodes):
+        storage.codes.resize(vector_count * storage.code_size)
+        storage.codes.resize(0)
+
+
+def training_sample(index, vector_count, seed=0):
+    """
+    Rows to train an index on (IVF coarse quantizer, PQ codebooks): a sorted random sample, sized
+    from the number of inverted lists. None if the index needs no training.
+    """
+    if index.is_trained:
+        return None
+    ivf = faiss.extract_index_ivf(index)
+    sample_size = min(vector_count, max(ivf.nlist * TRAIN_PER_LIST, 1 << 16), MAX_TRAIN_SAMPLE)
+    return np.sort(np.random.default_rng(seed).choice(vector_count, size=sample_size, replace=False))
+
+
+def train_index(index, vectors, seed=0):
+    """
+    Train an index on a random sample of the vectors, if it needs training.
+
+    Args:
+        index (faiss.Index): From create_index.
+        vectors (ndarray): float32 vectors of shape (n, dimension), or a memory map of them.
+        seed (int): Seed of the sample.
+    """
+    rows = training_sample(index, len(vectors), seed)
+    if rows is not None:
+        index.train(np.ascontiguousarray(vectors[rows], dtype=np.float32))
+
+
+def config_file(index_file):
+    return f"{index_file}.json"
+
+
+def save_index_config(index_file, config):
+    """
+    Save a configuration next to its index (`<index_file>.json`), so that the search-time knobs
+    are restored with it.
+    """
+    with open(config_file(index_file), mode="w", encoding="utf-8") as file:
+        json.dump(config, file, indent=4)
+
+
+def load_index_config(index_file):
+    """
+    Returns:
+        dict: The configuration saved next to an index, or the flat default if there is none.
+    """
+    if not os.path.exists(config_file(index_file)):
+        return index_config()
+    with open(config_file(index_file), mode="r", encoding="utf-8") as file:
+        return {**DEFAULT_CONFIG, **json.load(file)}
@@ -0,0 +1,124 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Defaults of the coalescing window: a batch is searched when it has MAX_BATCH queries, or
+# MAX_WAIT_MS after its first query arrived
+MAX_BATCH = 64
+MAX_WAIT_MS = 2.0
+
+
+def size_bucket(size):
+    """
+    Power-of-two bucket of a batch size for the histogram: "1", "2-3", "4-7", ...
+    """
+    low = 1 << (size.bit_length() - 1)
+    return str(low) if low == 1 else f"{low}-{2 * low - 1}"
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent nearest-neighbor queries into batched searches.
+
+    Queries submitted while a batch is open join it; the batch is searched as one matrix when it
+    reaches max_batch queries or max_wait_ms after it opened, and every caller gets its own rows
+    back. Searches run in a thread pool (faiss releases the GIL), so the event loop keeps
+    accepting queries meanwhile.
+
+    Args:
+        search (callable): search(vectors, k) -> (distances, ids), e.g. Recommender.search.
+        max_batch (int): Largest batch; 1 searches every query on its own.
+        max_wait_ms (float): Longest time a query waits for others to join its batch.
+        workers (int): Threads running searches. faiss already parallelizes a batched search.
+    """
+
+    def __init__(self, search, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, workers=1):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.search = search
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self._metrics = {"queries": 0, "batches": 0, "search_seconds": 0.0, "batch_sizes": {}}
+        self._started = time.perf_counter()
+
+    def submit(self, vector, k):
+        """
+        Queue one query vector.
+
+        Returns:
+            asyncio.Future: Resolves to the (distances, ids) arrays of its k nearest neighbors.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((np.asarray(vector, dtype=np.float32).reshape(-1), k, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif len(self._pending) == 1:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._search(batch))
+            self._tasks.add(task)  # Keep a reference until it is done
+            task.add_done_callback(self._tasks.discard)
+
+    async def _search(self, batch):
+        vectors = np.vstack([vector for vector, _, _ in batch])
+        k = max(k for _, k, _ in batch)
+        start = time.perf_counter()
+        try:
+            distances, ids = await asyncio.get_running_loop().run_in_executor(self._executor, self.search, vectors, k)
+        except Exception as error:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        metrics = self._metrics
+        metrics["queries"] += len(batch)
+        metrics["batches"] += 1
+        metrics["search_seconds"] += time.perf_counter() - start
+        bucket = size_bucket(len(batch))
+        metrics["batch_sizes"][bucket] = metrics["batch_sizes"].get(bucket, 0) + 1
+
+        # Scatter the rows back to the callers, cut to the k each asked for
+        for row, (_, query_k, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((distances[row, :query_k], ids[row, :query_k]))
+
+    def metrics(self, reset=False):
+        """
+        Batching statistics: queries and batches searched, batch size histogram, mean batch
+        size, time spent searching and queries per second of it and of wall time.
+        """
+        metrics = self._metrics
+        elapsed = time.perf_counter() - self._started
+        summary = {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queries": metrics["queries"],
+            "batches": metrics["batches"],
+            "batch_sizes": dict(sorted(metrics["batch_sizes"].items(), key=lambda item: int(item[0].split("-")[0]))),
+            "mean_batch_size": metrics["queries"] / metrics["batches"] if metrics["batches"] else 0.0,
+            "search_seconds": metrics["search_seconds"],
+            "queries_per_search_second": (metrics["queries"] / metrics["search_seconds"]
+                                          if metrics["search_seconds"] else 0.0),
+            "queries_per_second": metrics["queries"] / elapsed if elapsed else 0.0,
+        }
+        if reset:
+            self._metrics = {"queries": 0, "batches": 0, "search_seconds": 0.0, "batch_sizes": {}}
+            self._started = time.perf_counter()
+        return summary
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,136 @@
+import re
+
+import numpy as np
+
+from createIndex import (BEHAVIORAL_CAP_PERCENTILE, BEHAVIORAL_COLUMNS, BEHAVIORAL_DIMENSION, INDEX_FILE,
+                         PROJECTION_STORE, ROOT_DIR, encode_tags, load_faiss_index, load_users_table)
+from tagProjection import TagProjection
+
+USERS_TABLE = f"{ROOT_DIR}/output/dump/users.table.csv"
+
+# Percentile of the users' behavioral features a question is matched against: questions look
+# for users as active and reputable as the top 10%. The index caps the features at the same
+# percentile, so the users above it are all as close to the profile.
+PROFILE_PERCENTILE = BEHAVIORAL_CAP_PERCENTILE
+
+# Words of a question text, and the longest run of words joined with "-" tried as a tag
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+MAX_TAG_WORDS = 3
+
+
+def behavioral_profile(users_table, percentile=PROFILE_PERCENTILE):
+    """
+    The behavioral part of the query vectors: a percentile of every behavioral feature over all users.
+
+    Returns:
+        ndarray: float32 array in the order of extract_behavioral_features, before the scaling
+                 of the index (see TagProjection.scale_behavioral).
+    """
+    values = load_users_table(users_table)[BEHAVIORAL_COLUMNS].to_numpy(dtype=np.float32)
+    if len(values) == 0:
+        return np.zeros(BEHAVIORAL_DIMENSION, dtype=np.float32)
+    return np.percentile(values, percentile, axis=0).astype(np.float32)
+
+
+def text_tags(text, tags):
+    """
+    Tags of a vocabulary mentioned in a text: its words, and runs of up to MAX_TAG_WORDS words
+    joined with "-" (e.g. "machine learning" matches the tag machine-learning).
+
+    Args:
+        text (str): Question title and/or body (plain text).
+        tags (ndarray): Sorted tag vocabulary.
+    """
+    if not text or len(tags) == 0:
+        return []
+    words = WORD_PATTERN.findall(text.lower())
+    words = [word.rstrip(".") for word in words]
+    candidates = {"-".join(words[start:start + length]) for length in range(1, MAX_TAG_WORDS + 1)
+                  for start in range(len(words) - length + 1)}
+    if not candidates:
+        return []
+    candidates = np.array(sorted(candidates))
+    columns = np.minimum(np.searchsorted(tags, candidates), len(tags) - 1)
+    return candidates[tags[columns] == candidates].tolist()
+
+
+class Recommender:
+    """
+    Recommends answerers for questions from a saved user index.
+
+    A question is encoded into the space of createIndex.user_to_vector: the behavioral part is a
+    fixed profile (see behavioral_profile), capped and scaled like the users' behavioral features,
+    so that it only orders users of similar topics; the topical part is the question's tags encoded with the tag vocabulary, IDF and projection the
+    index was built with.
+
+    Args:
+        index (faiss.Index): Index from createIndex.load_faiss_index; searches return user ids.
+        projection (TagProjection): The projection the index was built with.
+        profile (ndarray): Behavioral part of the query vectors, unscaled.
+    """
+
+    def __init__(self, index, projection, profile):
+        if BEHAVIORAL_DIMENSION + projection.dimension != index.d:
+            raise ValueError(f"The projection gives {BEHAVIORAL_DIMENSION + projection.dimension}-dimensional "
+                             f"vectors but the index has {index.d} dimensions")
+        self.index = index
+        self.projection = projection
+        self.profile = projection.scale_behavioral(np.array(profile, dtype=np.float32))
+
+    @classmethod
+    def load(cls, index_file=INDEX_FILE, projection_dir=PROJECTION_STORE, users_table=USERS_TABLE,
+             percentile=PROFILE_PERCENTILE, mmap=True):
+        """
+        Load the index (memory mapped where the index type allows it), its projection and the
+        behavioral profile once, for serving many queries.
+        """
+        return cls(load_faiss_index(index_file, mmap), TagProjection.load(projection_dir),
+                   behavioral_profile(users_table, percentile))
+
+    def question_tags(self, question):
+        """
+        The tags of a question: its "tags", plus the known tags mentioned in its "text" if given.
+        """
+        return list(question.get("tags") or []) + text_tags(question.get("text"), self.projection.tags)
+
+    def encode(self, questions):
+        """
+        Query vectors of a batch of questions.
+
+        Args:
+            questions (list): Dicts with "tags" (list of tag names) and optionally "text".
+
+        Returns:
+            ndarray: float32 array of shape (len(questions), index dimension).
+        """
+        topical_features = encode_tags([self.question_tags(question) for question in questions],
+                                       self.projection.tags, self.projection.idf)
+        vectors = np.empty((len(questions), self.index.d), dtype=np.float32)
+        vectors[:, :BEHAVIORAL_DIMENSION] = self.profile
+        vectors[:, BEHAVIORAL_DIMENSION:] = self.projection.transform(topical_features)
+        return vectors
+
+    def search(self, vectors, k):
+        """
+        Returns:
+            tuple: (distances, user ids) arrays of shape (len(vectors), k); missing results have id -1.
+        """
+        return self.index.search(vectors, k)
+
+    def recommend(self, questions, k=10):
+        """
+        The k closest users of every question.
+
+        Returns:
+            list: One list of {"user_id", "distance"} dicts per question, closest first.
+        """
+        distances, user_ids = self.search(self.encode(questions), k)
+        return [ranked_users(row_distances, row_ids) for row_distances, row_ids in zip(distances, user_ids)]
+
+
+def ranked_users(distances, user_ids):
+    """
+    One row of search results as {"user_id", "distance"} dicts, without the missing (-1) results.
+    """
+    return [{"user_id": user_id, "distance": distance}
+            for user_id, distance in zip(user_ids.tolist(), distances.tolist()) if user_id >= 0]
@@ -0,0 +1,190 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extractFeatures"))
+from featureStore import FeatureStore, save_feature_store
+
+METHODS = ("svd", "random")
+
+# Extra random directions and power iterations of the randomized SVD (Halko, Martinsson and Tropp)
+OVERSAMPLING = 10
+POWER_ITERATIONS = 2
+
+
+class TagProjection:
+    """
+    Linear map from the tag space (one column per tag) to a small fixed dimension.
+
+    The tag vocabulary and IDF the projection was fitted with are kept with it, so that query
+    tag sets are encoded against the same columns even after the feature store has grown. So is
+    the scaling of the behavioral features of the index the projection was saved with.
+
+    Args:
+        components (ndarray): float32 array of shape (number of tags, dimension), or None for the
+                              identity (see TagProjection.identity).
+        tags (ndarray): Tag name of every row of `components`.
+        idf (ndarray): Tag IDF the topical features were computed with.
+        method (str): "svd", "random" or "identity".
+        behavioral_mean (ndarray): Mean of every behavioral feature over the indexed users, or None
+                                   to leave the behavioral features unscaled.
+        behavioral_scale (ndarray): What the centered behavioral features are divided by (see
+                                    createIndex.behavioral_scaling).
+        behavioral_cap (ndarray): Value every behavioral feature is capped at before scaling, or None.
+    """
+
+    def __init__(self, components, tags, idf, method, behavioral_mean=None, behavioral_scale=None,
+                 behavioral_cap=None):
+        self.components = components
+        self.tags = tags
+        self.idf = idf
+        self.method = method
+        self.behavioral_mean = behavioral_mean
+        self.behavioral_scale = behavioral_scale
+        self.behavioral_cap = behavioral_cap
+
+    @classmethod
+    def identity(cls, tags, idf):
+        """
+        No reduction: one column per tag of the vocabulary. It still fixes the vocabulary and IDF,
+        so that vectors built later (index updates, queries) keep the columns of the index.
+        """
+        return cls(None, np.asarray(tags), np.asarray(idf, dtype=np.float32), "identity")
+
+    @property
+    def dimension(self):
+        return len(self.tags) if self.components is None else self.components.shape[1]
+
+    def _align(self, tags):
+        """
+        Positions in `tags` (a sorted vocabulary) of the projection's tags, and which of them it has.
+        """
+        if len(tags) == 0:
+            return np.zeros(len(self.tags), dtype=np.int64), np.zeros(len(self.tags), dtype=bool)
+        columns = np.minimum(np.searchsorted(tags, self.tags), len(tags) - 1)
+        return columns, tags[columns] == self.tags
+
+    def idf_over(self, tags):
+        """
+        The projection's IDF laid out over another sorted vocabulary; tags it was not fitted with get 0.
+        """
+        columns, found = self._align(tags)
+        idf = np.zeros(len(tags), dtype=np.float32)
+        idf[columns[found]] = self.idf[found]
+        return idf
+
+    def transform(self, features, tags=None):
+        """
+        Project a block of topical features to `dimension` columns.
+
+        Args:
+            features (ndarray): Rows over the projection's tags, or over `tags` if given.
+            tags (ndarray): Sorted vocabulary of the columns of `features`, e.g. of a feature store
+                            that has grown since the projection was fitted. Tags the projection was
+                            not fitted with are ignored.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        if tags is None or (len(tags) == len(self.tags) and np.array_equal(tags, self.tags)):
+            return features if self.components is None else features @ self.components
+        columns, found = self._align(tags)
+        if self.components is None:
+            projected = np.zeros((len(features), len(self.tags)), dtype=np.float32)
+            projected[:, found] = features[:, columns[found]]
+            return projected
+        return features[:, columns[found]] @ self.components[found]
+
+    def scale_behavioral(self, features):
+        """
+        Cap, center and scale a block of behavioral features in place, as in the index. Projections
+        saved without a behavioral scaling leave them as they are.
+
+        Returns:
+            ndarray: features.
+        """
+        if self.behavioral_cap is not None:
+            np.minimum(features, self.behavioral_cap, out=features)
+        if self.behavioral_mean is not None:
+            features -= self.behavioral_mean
+            features /= self.behavioral_scale
+        return features
+
+    def save(self, store_dir):
+        arrays = {"tags": self.tags, "idf": self.idf}
+        if self.components is not None:
+            arrays["components"] = self.components
+        if self.behavioral_mean is not None:
+            arrays["behavioral_mean"] = self.behavioral_mean
+            arrays["behavioral_scale"] = self.behavioral_scale
+        if self.behavioral_cap is not None:
+            arrays["behavioral_cap"] = self.behavioral_cap
+        return save_feature_store(arrays, store_dir, {"method": self.method, "dimension": self.dimension})
+
+    @classmethod
+    def load(cls, store_dir):
+        store = FeatureStore(store_dir)
+        components = store["components"] if "components" in store else None
+        scaling = ((store["behavioral_mean"], store["behavioral_scale"]) if "behavioral_mean" in store
+                   else (None, None))
+        cap = store["behavioral_cap"] if "behavioral_cap" in store else None
+        return cls(components, store["tags"], store["idf"], store.manifest["method"], *scaling, cap)
+
+
+def random_projection(tag_count, dimension, seed=0):
+    """
+    Sparse random projection (Li, Hastie and Church): each entry is +-sqrt(1 / (density * dimension))
+    with probability density / 2 each and 0 otherwise, with density 1 / sqrt(number of tags).
+    Distances are preserved in expectation; nothing is fitted.
+
+    Returns:
+        ndarray: float32 components of shape (tag_count, dimension).
+    """
+    rng = np.random.default_rng(seed)
+    density = 1 / np.sqrt(tag_count)
+    signs = rng.choice(np.array([-1, 0, 1], dtype=np.float32), size=(tag_count, dimension),
+                       p=[density / 2, 1 - density, density / 2])
+    return signs * np.float32(np.sqrt(1 / (density * dimension)))
+
+
+def randomized_svd(row_blocks, tag_count, dimension, seed=0, oversampling=OVERSAMPLING,
+                   power_iterations=POWER_ITERATIONS):
+    """
+    Top right singular vectors of a users x tags matrix that is only available as row blocks.
+
+    Every pass over the matrix streams the blocks once, so memory is one block plus a few
+    (users x dimension) and (tags x dimension) arrays; the full matrix is never materialized.
+
+    Args:
+        row_blocks (callable): Returns an iterable of dense float32 row blocks, in row order, covering
+                               the whole matrix. Called once per pass (power_iterations + 2 passes).
+        tag_count (int): Number of columns.
+        dimension (int): Number of components.
+        seed (int): Seed of the random test matrix.
+
+    Returns:
+        ndarray: float32 components of shape (tag_count, dimension).
+    """
+    if dimension > tag_count:
+        raise ValueError(f"Cannot reduce {tag_count} tags to {dimension} dimensions")
+    rng = np.random.default_rng(seed)
+    width = min(dimension + oversampling, tag_count)
+
+    def times(matrix):
+        # A @ matrix, one block of rows at a time
+        return np.vstack([block @ matrix for block in row_blocks()])
+
+    def transposed_times(matrix):
+        # A.T @ matrix, accumulated over the row blocks
+        result = np.zeros((tag_count, matrix.shape[1]), dtype=np.float32)
+        start = 0
+        for block in row_blocks():
+            result += block.T @ matrix[start:start + len(block)]
+            start += len(block)
+        return result
+
+    basis, _ = np.linalg.qr(times(rng.standard_normal((tag_count, width), dtype=np.float32)))
+    for _ in range(power_iterations):
+        basis, _ = np.linalg.qr(times(np.linalg.qr(transposed_times(basis))[0]))
+    # B = Q.T @ A is small (width x tags); its right singular vectors are those of A
+    _, _, vt = np.linalg.svd(transposed_times(basis).T, full_matrices=False)
+    return np.ascontiguousarray(vt[:dimension].T, dtype=np.float32)